@@ -0,0 +1,118 @@
+"""
+Benchmark: batched agent runs (several universities per run) vs one run per university.
+
+    python bench_agent_batch.py --universities 200 --batch-sizes 1 5 10 25 --agent-latency-ms 800 --token-ms 10
+
+The real Runner runs on the deterministic LocalModelProvider, answering with catalog
+pages on bench_catalog's local server, so the agent orchestration, guardrails, output
+parsing and URL verification are all included. The model's latency is a fixed cost per
+run plus a cost per output token, which is what batching amortizes; --drop-rate makes it
+leave that share of names out of batched answers, exercising the individual retries.
+--concurrency bounds agent runs in flight, as an API's rate limit would.
+
+Per batch size it reports throughput, the latency from the start of the job until each
+university's result arrives, agent runs, prompt (input) and output tokens per
+university, and how many universities had to be retried on their own.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import List
+
+import catalog_fetch
+import get_uni_courses
+from bench_catalog import CatalogServer, percentile
+from catalog_fetch import HostPolicy
+from catalog_local_model import LocalCatalogModel, LocalModelProvider
+from catalog_metrics import metrics
+
+class DroppingModel(LocalCatalogModel):
+    """Local model that leaves a deterministic share of the names out of batched answers"""
+
+    def __init__(self, drop_rate: float, **kwargs):
+        super().__init__(**kwargs)
+        self.drop_rate = drop_rate
+
+    def _dropped(self, university_name: str) -> bool:
+        digest = hashlib.blake2b(university_name.encode('utf-8'), digest_size=4).digest()
+        return int.from_bytes(digest, 'big') / 0xFFFFFFFF < self.drop_rate
+
+    def _output_text(self, text, output_schema):
+        output = super()._output_text(text, output_schema)
+        if not self.drop_rate or '\n' not in text:
+            return output
+        answer = json.loads(output)
+        answer['catalogs'] = [item for item in answer['catalogs'] if not self._dropped(item['university_name'])]
+        return json.dumps(answer)
+
+def run_job(names: List[str], concurrency: int, batch_size: int) -> List[float]:
+    async def main() -> List[float]:
+        start = time.perf_counter()
+        latencies = []
+        try:
+            async for result in get_uni_courses.iter_university_catalogs(names, concurrency, True, batch_size):
+                assert result.catalog is not None, result.error_message
+                latencies.append(time.perf_counter() - start)
+        finally:
+            await catalog_fetch.get_fetcher().aclose()
+        return latencies
+
+    return asyncio.run(main())
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--universities', type=int, default=200)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 5, 10, 25])
+    parser.add_argument('--concurrency', type=int, default=8, help='agent runs in flight')
+    parser.add_argument('--agent-latency-ms', type=float, default=800.0, help='model latency per run')
+    parser.add_argument('--token-ms', type=float, default=10.0, help='model latency per output token')
+    parser.add_argument('--drop-rate', type=float, default=0.05, help='share of names left out of batched answers')
+    parser.add_argument('--page-kb', type=int, default=50, help='synthetic catalog page size')
+    parser.add_argument('--latency-ms', type=float, default=10.0, help='server delay before each response')
+    args = parser.parse_args()
+
+    os.environ['CATALOG_CACHE_DIR'] = tempfile.mkdtemp(prefix='bench_agent_batch_')
+    os.environ['CATALOG_VERIFY_TTL'] = '0'
+    catalog_fetch.configure(HostPolicy(
+        requests_per_second=1e9,
+        burst=10 ** 9,
+        max_concurrency=max(args.batch_sizes) * args.concurrency,
+        respect_robots=False
+    ))
+    metrics.enabled = True
+
+    with CatalogServer(args.page_kb * 1024, args.latency_ms / 1000, 'coursestext') as server:
+        model = DroppingModel(
+            args.drop_rate,
+            latency=args.agent_latency_ms / 1000,
+            token_latency=args.token_ms / 1000,
+            url_template=server.base_url + '/catalog/{slug}'
+        )
+        get_uni_courses.set_model_provider(LocalModelProvider(model))
+        names = [f"Benchmark University {i}" for i in range(args.universities)]
+
+        print(f"{'batch':>5} {'items/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'runs':>5} "
+              f"{'in tok/item':>11} {'out tok/item':>12} {'retried':>7}")
+        for batch_size in args.batch_sizes:
+            metrics.reset()
+            start = time.perf_counter()
+            latencies = sorted(run_job(names, args.concurrency, batch_size))
+            elapsed = time.perf_counter() - start
+            counters = metrics.snapshot()['counters']
+            count = len(latencies)
+            runs = counters.get('agent_requests_total', 0)
+            input_tokens = counters.get('agent_tokens_total{kind="input"}', 0)
+            output_tokens = counters.get('agent_tokens_total{kind="output"}', 0)
+            retried = counters.get('batch_items_total{result="retried"}', 0)
+            print(
+                f"{batch_size:>5} {count / elapsed:>8.1f} {percentile(latencies, 0.5) * 1000:>8.0f} "
+                f"{percentile(latencies, 0.99) * 1000:>8.0f} {runs:>5.0f} {input_tokens / count:>11.0f} "
+                f"{output_tokens / count:>12.0f} {retried:>7.0f}"
+            )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark: page analysis (the CPU half of verify_url) inline on the event loop vs on an AnalysisPool.
+
+    python bench_analysis.py --pages 400 --page-kb 200 --workers 1 2 4 8
+
+Synthetic catalog pages (see bench_catalog.synthetic_page) are analyzed from asyncio,
+first inline on the loop, then in a thread (what verify_url_async does without a pool)
+and then on process pools of each size, so no network is involved. Per run it reports
+throughput, the speedup over inline analysis, and the event loop's p99 lag (how late a
+1 ms timer fires), which is what analysis on the loop costs the fetches sharing it.
+Throughput should grow with workers up to the number of cores; on a single core the
+pool only adds its round trips. Bodies from --shared-kb on go to the workers through
+shared memory, and bodies under --min-kb are analyzed in a thread instead.
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import List, Optional, Tuple
+
+from bench_catalog import LAYOUTS, percentile, synthetic_page
+from catalog_analysis import DEFAULT_MIN_BODY_BYTES, DEFAULT_SHARED_MEMORY_THRESHOLD, AnalysisPool
+from get_uni_courses import analyze_page
+
+CONTENT_TYPE = 'text/html; charset=utf-8'
+
+async def watch_loop(lags: List[float], interval: float = 0.001) -> None:
+    """Record how late each interval-long sleep wakes up"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+async def analyze_all(
+    pages: List[Tuple[str, bytes]],
+    pool: Optional[AnalysisPool],
+    in_flight: int,
+    threaded: bool = False
+) -> List[float]:
+    lags = []
+    watcher = asyncio.ensure_future(watch_loop(lags))
+    await asyncio.sleep(0)
+    pages = iter(pages)
+    pending = set()
+    try:
+        while True:
+            for url, body in pages:
+                args = (url, CONTENT_TYPE, 'Benchmark University', True)
+                if pool is None and not threaded:
+                    analyze_page(body, *args)
+                    # Let the watcher run between pages, as fetches would
+                    await asyncio.sleep(0)
+                    continue
+                if pool is None or not pool.worth_running(body):
+                    pending.add(asyncio.ensure_future(asyncio.to_thread(analyze_page, body, *args)))
+                else:
+                    pending.add(asyncio.ensure_future(pool.run(analyze_page, body, *args)))
+                if len(pending) >= in_flight:
+                    break
+            if not pending:
+                return sorted(lags)
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+    finally:
+        watcher.cancel()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=400)
+    parser.add_argument('--page-kb', type=int, default=200, help='synthetic catalog page size')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}), help='pool sizes to compare')
+    parser.add_argument('--in-flight', type=int, default=2, help='pages queued per worker')
+    parser.add_argument('--shared-kb', type=int, default=DEFAULT_SHARED_MEMORY_THRESHOLD // 1024,
+                        help='body size from which bodies go through shared memory')
+    parser.add_argument('--min-kb', type=int, default=DEFAULT_MIN_BODY_BYTES // 1024,
+                        help='body size from which bodies go to the pool at all')
+    args = parser.parse_args()
+
+    pages = [
+        (f"https://catalog.benchmark.edu/page/{i}", synthetic_page(args.page_kb * 1024, LAYOUTS[i % len(LAYOUTS)], seed=i))
+        for i in range(args.pages)
+    ]
+    total_mb = sum(len(body) for _, body in pages) / 1e6
+    print(f"{args.pages} pages, {total_mb:.1f} MB, {os.cpu_count()} cores")
+    print(f"{'workers':>7} {'pages/s':>8} {'MB/s':>7} {'speedup':>7} {'loop lag p99 ms':>15}")
+
+    start = time.perf_counter()
+    lags = asyncio.run(analyze_all(pages, None, 1))
+    inline = time.perf_counter() - start
+    print(f"{'inline':>7} {args.pages / inline:>8.0f} {total_mb / inline:>7.1f} {1.0:>7.2f} "
+          f"{percentile(lags, 0.99) * 1000:>15.1f}")
+
+    start = time.perf_counter()
+    lags = asyncio.run(analyze_all(pages, None, args.in_flight, threaded=True))
+    elapsed = time.perf_counter() - start
+    print(f"{'thread':>7} {args.pages / elapsed:>8.0f} {total_mb / elapsed:>7.1f} {inline / elapsed:>7.2f} "
+          f"{percentile(lags, 0.99) * 1000:>15.1f}")
+
+    for workers in args.workers:
+        pool = AnalysisPool(workers, shared_memory_threshold=args.shared_kb * 1024, min_body_bytes=args.min_kb * 1024)
+        try:
+            # Start every worker and let it import the analysis code before timing
+            asyncio.run(analyze_all(pages[:2 * workers], pool, 2 * workers))
+            start = time.perf_counter()
+            lags = asyncio.run(analyze_all(pages, pool, args.in_flight * workers))
+            elapsed = time.perf_counter() - start
+        finally:
+            pool.close()
+        print(f"{workers:>7} {args.pages / elapsed:>8.0f} {total_mb / elapsed:>7.1f} {inline / elapsed:>7.2f} "
+              f"{percentile(lags, 0.99) * 1000:>15.1f}")
+
+if __name__ == '__main__':
+    main()
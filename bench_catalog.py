@@ -0,0 +1,418 @@
+"""
+Offline benchmark of verify_url and get_university_catalog against a local stand-in for catalog sites.
+
+    python bench_catalog.py --requests 100 --concurrency 16 --page-kb 200 --latency-ms 20 --output bench.json
+
+A threaded local HTTP server serves synthetic catalog pages of the requested size,
+latency and anchor layout, and the agent Runner is replaced by a stub that returns
+a canned UniversityCatalogOutput pointing at that server, so neither university
+sites nor the OpenAI API are contacted. With --agent local the real Runner runs
+instead, on the deterministic LocalModelProvider, so agent orchestration and the
+guardrails are included in the catalog scenarios. Each scenario reports throughput, p50/p95/p99
+latency and peak traced memory (measured in a second pass under tracemalloc, so the
+timing pass is not slowed down). Results are printed and optionally written as JSON.
+
+The verify_flaky scenario points at pages that answer 503 with --fail-rate probability
+and stall for --stall-ms with --stall-rate probability, and also reports how many
+verifications came back inaccessible. Compare --retries 1 with the default, and --hedge:
+
+    python bench_catalog.py --scenarios verify_flaky --requests 500 --retries 1
+    python bench_catalog.py --scenarios verify_flaky --requests 500 --hedge
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import math
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Awaitable, Callable, Dict, List
+from urllib.parse import parse_qs, quote, urlparse
+
+import catalog_fetch
+import get_uni_courses
+from catalog_fetch import HostPolicy
+from catalog_local_model import LocalCatalogModel, LocalModelProvider
+from catalog_metrics import metrics
+from get_uni_courses import UniversityCatalogOutput, URLVerificationResult
+
+LAYOUTS = ('coursestext', 'acalog', 'none')
+
+FILLER_WORDS = (
+    "the of and to in student program students faculty department engineering "
+    "mathematics research campus offered semester major minor lecture laboratory"
+).split()
+
+def synthetic_page(size: int, layout: str, seed: int = 0) -> bytes:
+    """
+    HTML page of roughly `size` bytes.
+
+    'coursestext' is a courseleaf page (#coursestext anchor, courseblock divs),
+    'acalog' an acalog listing (no section anchor), 'none' a page without CS courses.
+    """
+    rng = random.Random(seed)
+    parts = ['<html><head><title>Catalog</title></head><body>']
+    if layout == 'coursestext':
+        parts.append('<a href="#coursestext">Courses</a><div id="coursestext">')
+    elif layout == 'acalog':
+        parts.append('<h2>Computer Science Courses</h2><ul>')
+    total = sum(map(len, parts))
+    number = 100
+    while total < size:
+        if layout == 'coursestext' and rng.random() < 0.3:
+            part = (
+                f'<div class="courseblock"><p class="courseblocktitle"><strong>CS {number}. '
+                f'Topic {number}. 3 Units.</strong></p><p class="courseblockdesc">'
+                f'Prerequisites: CS {number - 1}.</p></div>\n'
+            )
+            number += 1
+        elif layout == 'acalog' and rng.random() < 0.3:
+            part = (
+                f'<li class="acalog-course"><a href="preview_course_nopop.php?coid={number}">'
+                f'CSC {number} - Topic {number}</a></li>\n'
+            )
+            number += 1
+        else:
+            part = '<p>' + ' '.join(rng.choice(FILLER_WORDS) for _ in range(30)) + '</p>\n'
+        parts.append(part)
+        total += len(part)
+    parts.append('</div></body></html>' if layout == 'coursestext' else '</body></html>')
+    return ''.join(parts).encode('utf-8')
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connection bursts and adds 1 s SYN retries to the latencies
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Streaming verification hangs up mid-body once its verdict is decided
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+class CatalogServer:
+    """
+    Local stand-in for university catalog sites.
+
+    GET /catalog/<name>?size=<bytes>&latency=<seconds>&layout=<layout> returns a synthetic
+    page after the given delay; missing parameters use the server defaults. Pages are
+    generated once per (size, layout) and reused. Faults can be injected per request:
+    fail=<probability> answers 503, stall=<probability> adds stall_latency=<seconds>.
+    """
+
+    def __init__(self, size: int, latency: float, layout: str):
+        self.size = size
+        self.latency = latency
+        self.layout = layout
+        self._pages: Dict = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+        self._server = _QuietServer(('127.0.0.1', 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def page(self, size: int, layout: str) -> bytes:
+        with self._lock:
+            page = self._pages.get((size, layout))
+            if page is None:
+                page = self._pages[(size, layout)] = synthetic_page(size, layout)
+            return page
+
+    def chance(self, probability: float) -> bool:
+        with self._lock:
+            return self._rng.random() < probability
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if not parsed.path.startswith('/catalog/'):
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                latency = float(params.get('latency', server.latency))
+                if server.chance(float(params.get('stall', 0))):
+                    latency += float(params.get('stall_latency', 0))
+                if latency:
+                    time.sleep(latency)
+                if server.chance(float(params.get('fail', 0))):
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = server.page(int(params.get('size', server.size)), params.get('layout', server.layout))
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', f'"{len(body)}"')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self) -> "CatalogServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+class StubRunner:
+    """Stands in for agents.Runner: returns a canned catalog on the local server after a fixed delay"""
+
+    def __init__(self, base_url: str, latency: float):
+        self.base_url = base_url
+        self.latency = latency
+        self.calls = 0
+
+    def catalog_url(self, university_name: str) -> str:
+        return f"{self.base_url}/catalog/{quote(university_name)}"
+
+    async def run(self, starting_agent, input, **kwargs):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        output = UniversityCatalogOutput(
+            university_name=input,
+            catalog_url=self.catalog_url(input),
+            verification_status=URLVerificationResult(
+                url=self.catalog_url(input),
+                is_valid=False,
+                domain_verified=False,
+                is_accessible=False,
+                contains_cs_courses=False
+            )
+        )
+        return SimpleNamespace(final_output=output)
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(latencies: List[float], elapsed: float, peak_bytes: int) -> Dict:
+    latencies = sorted(latencies)
+    return {
+        'operations': len(latencies),
+        'seconds': round(elapsed, 4),
+        'throughput_per_s': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'peak_memory_kb': peak_bytes // 1024,
+    }
+
+def run_sync(operation: Callable[[int], object], count: int) -> List[float]:
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def run_async(operation: Callable[[int], Awaitable], count: int, concurrency: int) -> List[float]:
+    async def main() -> List[float]:
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def timed(i: int) -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                await operation(i)
+                latencies.append(time.perf_counter() - start)
+
+        try:
+            await asyncio.gather(*(timed(i) for i in range(count)))
+        finally:
+            await catalog_fetch.get_fetcher().aclose()
+        return latencies
+
+    return asyncio.run(main())
+
+def run_batch(names: List[str], concurrency: int) -> List[float]:
+    """Time from the start of the batch until each result arrives"""
+    async def main() -> List[float]:
+        start = time.perf_counter()
+        latencies = []
+        try:
+            async for result in get_uni_courses.iter_university_catalogs(names, concurrency, refresh=True):
+                latencies.append(time.perf_counter() - start)
+        finally:
+            await catalog_fetch.get_fetcher().aclose()
+        return latencies
+
+    return asyncio.run(main())
+
+def measure(scenario: Callable[[], List[float]]) -> Dict:
+    start = time.perf_counter()
+    latencies = scenario()
+    elapsed = time.perf_counter() - start
+    # Second pass under tracemalloc for the memory figure only, kept out of the stage metrics
+    collecting, metrics.enabled = metrics.enabled, False
+    tracemalloc.start()
+    try:
+        scenario()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        metrics.enabled = collecting
+    return summarize(latencies, elapsed, peak)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=50, help='operations per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--page-kb', type=int, default=100, help='synthetic page size')
+    parser.add_argument('--latency-ms', type=float, default=10.0, help='server delay before each response')
+    parser.add_argument('--agent', choices=('stub', 'local'), default='stub',
+                        help='stub Runner, or the real Runner on the local model provider')
+    parser.add_argument('--agent-latency-ms', type=float, default=0.0, help='agent delay per lookup')
+    parser.add_argument('--layout', choices=LAYOUTS, default='coursestext')
+    parser.add_argument('--scenarios', nargs='+', help='run only these scenarios')
+    parser.add_argument('--metrics', action='store_true', help='also collect per-stage metrics (timing pass only)')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--fail-rate', type=float, default=0.1, help='verify_flaky: probability of a 503')
+    parser.add_argument('--stall-rate', type=float, default=0.03, help='verify_flaky: probability of a stall')
+    parser.add_argument('--stall-ms', type=float, default=3000.0, help='verify_flaky: length of a stall')
+    parser.add_argument('--retries', type=int, default=HostPolicy().max_attempts,
+                        help='attempts per fetch (1 disables retries and the circuit breaker)')
+    parser.add_argument('--hedge', action='store_true', help='hedge async fetches slower than the p95')
+    args = parser.parse_args()
+
+    # Keep the benchmark's caches away from the user's, measure every verification rather
+    # than in-memory cache hits, and lift the politeness limits that would otherwise
+    # throttle every request to the single local host
+    os.environ['CATALOG_CACHE_DIR'] = tempfile.mkdtemp(prefix='bench_catalog_')
+    os.environ['CATALOG_VERIFY_TTL'] = '0'
+    catalog_fetch.configure(HostPolicy(
+        requests_per_second=1e9,
+        burst=10 ** 9,
+        # Room for a hedged second request next to each in-flight one
+        max_concurrency=max(args.concurrency, 1) * 2,
+        respect_robots=False,
+        max_attempts=args.retries,
+        breaker_threshold=HostPolicy().breaker_threshold if args.retries > 1 else 0,
+        hedge=args.hedge
+    ))
+
+    with CatalogServer(args.page_kb * 1024, args.latency_ms / 1000, args.layout) as server:
+        if args.agent == 'stub':
+            runner = get_uni_courses.Runner = StubRunner(server.base_url, args.agent_latency_ms / 1000)
+            catalog_url = runner.catalog_url
+        else:
+            model = LocalCatalogModel(
+                latency=args.agent_latency_ms / 1000,
+                url_template=server.base_url + '/catalog/{slug}'
+            )
+            get_uni_courses.set_model_provider(LocalModelProvider(model))
+            catalog_url = model.catalog_url
+        names = [f"Benchmark University {i}" for i in range(args.requests)]
+        urls = [catalog_url(name) for name in names]
+        count, concurrency = args.requests, args.concurrency
+        faults = f"fail={args.fail_rate}&stall={args.stall_rate}&stall_latency={args.stall_ms / 1000}"
+        flaky_urls = [f"{url}?{faults}" for url in urls]
+        inaccessible: List[int] = []
+
+        def verify_flaky() -> List[float]:
+            failures = [0]
+
+            async def verify(i: int) -> None:
+                result = await get_uni_courses.verify_url_async(flaky_urls[i])
+                failures[0] += not result.is_accessible
+
+            latencies = run_async(verify, count, concurrency)
+            inaccessible.append(failures[0])
+            return latencies
+
+        def catalog_fast_path() -> List[float]:
+            # Every /catalog/... path on the server is a catalog page, so the probes find one.
+            # The fast path is opt-in and only trusts the university's own domain, which the
+            # local server stands in for here
+            os.environ['CATALOG_FAST_PATH'] = '1'
+            domain_verified = get_uni_courses._domain_verified
+            get_uni_courses._domain_verified = lambda host, university_name: True
+            try:
+                return run_async(
+                    lambda i: get_uni_courses.get_university_catalog(names[i], refresh=True, domain=server.base_url),
+                    count,
+                    concurrency
+                )
+            finally:
+                get_uni_courses._domain_verified = domain_verified
+                del os.environ['CATALOG_FAST_PATH']
+
+        scenarios = {
+            'verify_single': lambda: run_sync(lambda i: get_uni_courses.verify_url(urls[i]), count),
+            'verify_stream_single': lambda: run_sync(lambda i: get_uni_courses.verify_url(urls[i], stream=True), count),
+            'verify_concurrent': lambda: run_async(lambda i: get_uni_courses.verify_url_async(urls[i]), count, concurrency),
+            'catalog_single': lambda: run_async(
+                lambda i: get_uni_courses.get_university_catalog(names[i], refresh=True), count, 1
+            ),
+            'catalog_batch': lambda: run_batch(names, concurrency),
+            'catalog_concurrent': lambda: run_async(
+                lambda i: get_uni_courses.get_university_catalog(names[i], refresh=True), count, concurrency
+            ),
+            'verify_flaky': verify_flaky,
+            'catalog_fast_path': catalog_fast_path,
+        }
+        selected = args.scenarios or list(scenarios)
+        unknown = set(selected) - set(scenarios)
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+        results = {}
+        print(f"{'scenario':<22} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KB':>9}")
+        stage_metrics = {}
+        for name in selected:
+            metrics.reset()
+            metrics.enabled = args.metrics
+            inaccessible.clear()
+            result = results[name] = measure(scenarios[name])
+            if inaccessible:
+                # Counted in the timing pass; every page exists, so each one is a false negative
+                result['inaccessible'] = inaccessible[0]
+            if args.metrics:
+                stage_metrics[name] = metrics.snapshot()
+            print(
+                f"{name:<22} {result['throughput_per_s']:>9} {result['p50_ms']:>9} "
+                f"{result['p95_ms']:>9} {result['p99_ms']:>9} {result['peak_memory_kb']:>9}"
+                + (f"  ({result['inaccessible']} inaccessible)" if 'inaccessible' in result else '')
+            )
+
+    report = {
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'scenarios': results,
+    }
+    if args.metrics:
+        report['metrics'] = stage_metrics
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark: DomainIndex name lookups vs a difflib scan over every institution name.
+
+    python bench_domains.py --institutions 1000 10000 50000 --queries 20000
+
+Queries are noisy variants of indexed names (abbreviations, campus suffixes, typos);
+index latency should stay in the microseconds as the dataset grows.
+"""
+import argparse
+import difflib
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from catalog_domains import DEFAULT_SOURCE_PATH, DomainIndex, DomainRecord, build_index, load_records
+
+SYLLABLES = ['ar', 'bel', 'cor', 'dan', 'el', 'fair', 'gran', 'hol', 'ing', 'kent', 'lan', 'mar',
+             'nor', 'ost', 'pel', 'quin', 'ros', 'sel', 'tor', 'ur', 'val', 'wes', 'yor', 'zen']
+SUFFIXES = ['Main Campus', 'Online', 'Downtown Campus', 'School of Engineering']
+PATTERNS = ['University of {place}', '{place} State University', '{place} College',
+            '{place} Institute of Technology', '{place} Community College', 'Saint {place} University']
+
+def place_name(rng: random.Random) -> str:
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+def synthetic_records(count: int, rng: random.Random):
+    records = list(load_records(DEFAULT_SOURCE_PATH))
+    names = {record.name for record in records}
+    while len(records) < count:
+        place = place_name(rng)
+        name = rng.choice(PATTERNS).format(place=place)
+        if name not in names:
+            names.add(name)
+            records.append(DomainRecord(name=name, domains=[f"{place.lower()}{len(records)}.edu"]))
+    return records
+
+def typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1:] if rng.random() < 0.5 else word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+def noisy(name: str, rng: random.Random):
+    """A query variant of an indexed name and what kind of noise it carries"""
+    kind = rng.choice(['exact', 'abbreviated', 'campus', 'typo', 'lowercase'])
+    if kind == 'abbreviated':
+        query = name.replace('University', 'Univ.').replace('Institute', 'Inst.').replace('Saint', 'St.')
+    elif kind == 'campus':
+        query = f"{name} - {rng.choice(SUFFIXES)}"
+    elif kind == 'typo':
+        words = name.split()
+        longest = max(range(len(words)), key=lambda i: len(words[i]))
+        words[longest] = typo(words[longest], rng)
+        query = ' '.join(words)
+    elif kind == 'lowercase':
+        query = name.lower().replace(',', '').replace('-', ' ')
+    else:
+        query = name
+    return kind, query
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--institutions', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--queries', type=int, default=20000)
+    parser.add_argument('--baseline-queries', type=int, default=50, help='queries timed with the difflib scan (0 to skip)')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'domains.idx')
+        for count in args.institutions:
+            records = synthetic_records(count, rng)
+            start = time.perf_counter()
+            build_index(iter(records), path)
+            build = time.perf_counter() - start
+            start = time.perf_counter()
+            index = DomainIndex(path)
+            opened = time.perf_counter() - start
+
+            workload = []
+            for _ in range(args.queries):
+                record = rng.choice(records)
+                workload.append((record.name,) + noisy(record.name, rng))
+            by_kind = {}
+            for name, kind, query in workload:
+                start = time.perf_counter()
+                match = index.lookup(query)
+                elapsed = time.perf_counter() - start
+                stats = by_kind.setdefault(kind, ([], [0, 0, 0]))
+                stats[0].append(elapsed)
+                stats[1][0 if match is None else 1 if match.name == name else 2] += 1
+
+            print(f"{count} institutions: build {build * 1000:.0f} ms, open {opened * 1e6:.0f} us, "
+                  f"file {os.path.getsize(path) / 1024:.0f} KiB")
+            print(f"  {'query':<12} {'p50 us':>8} {'p99 us':>8} {'correct':>8} {'no match':>9} {'wrong':>6}")
+            for kind, (timings, (missed, correct, wrong)) in sorted(by_kind.items()):
+                timings.sort()
+                total = len(timings)
+                print(f"  {kind:<12} {statistics.median(timings) * 1e6:>8.1f} "
+                      f"{timings[int(total * 0.99)] * 1e6:>8.1f} {correct / total:>8.1%} "
+                      f"{missed / total:>9.1%} {wrong / total:>6.1%}")
+
+            if args.baseline_queries:
+                names = [record.name for record in records]
+                sample = workload[:args.baseline_queries]
+                start = time.perf_counter()
+                for _, _, query in sample:
+                    difflib.get_close_matches(query, names, n=1, cutoff=0.8)
+                print(f"  difflib scan: {(time.perf_counter() - start) / len(sample) * 1e6:.0f} us/lookup")
+            index.close()
+
+if __name__ == '__main__':
+    main()
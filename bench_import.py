@@ -0,0 +1,83 @@
+"""
+Cold-start benchmark: time to import get_uni_courses in a fresh interpreter.
+
+    python bench_import.py --runs 7 --budget-ms 600
+
+Each run starts a new `python -X importtime` process, so nothing is cached in memory
+between runs. Reports the median and best cumulative import time of the module, the
+slowest modules it pulls in, and whether the agents SDK or OpenAI client were loaded
+(they should only be imported when an agent is first used). Exits with status 1 if the
+median exceeds --budget-ms or a lazily loaded package was imported eagerly.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+LAZY_PACKAGES = ('agents', 'openai')
+
+def import_profile(module: str) -> Tuple[Dict[str, int], List[str]]:
+    """Cumulative import time in microseconds per module, and the lazy packages that got loaded"""
+    check = f"import sys, {module}; print(','.join(p for p in {LAZY_PACKAGES!r} if p in sys.modules))"
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', check],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    cumulative: Dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, total, name = line.split('|')
+        if not name.startswith('  '):
+            # A top-level import finished; keep only the modules nested under ours
+            if name.strip() == module:
+                cumulative[module] = int(total)
+                break
+            cumulative.clear()
+            continue
+        cumulative.setdefault(name.strip(), int(total))
+    loaded = [package for package in completed.stdout.strip().split(',') if package]
+    return cumulative, loaded
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='get_uni_courses')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='number of slowest modules to list')
+    parser.add_argument('--budget-ms', type=float, help='fail if the median import time exceeds this')
+    args = parser.parse_args()
+
+    totals, profiles, loaded = [], [], set()
+    for _ in range(args.runs):
+        cumulative, lazy_loaded = import_profile(args.module)
+        totals.append(cumulative[args.module] / 1000)
+        profiles.append(cumulative)
+        loaded.update(lazy_loaded)
+
+    median = statistics.median(totals)
+    print(f"{args.module}: median {median:.1f} ms, best {min(totals):.1f} ms over {args.runs} runs")
+
+    # Median per module across runs, excluding the benchmarked module itself
+    modules = {name for profile in profiles for name in profile if name != args.module}
+    per_module = {
+        name: statistics.median(profile.get(name, 0) for profile in profiles) / 1000
+        for name in modules
+    }
+    print("slowest imports (cumulative ms):")
+    for name, total in sorted(per_module.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {total:8.1f}  {name}")
+
+    failed = False
+    if loaded:
+        print(f"FAIL: imported eagerly: {', '.join(sorted(loaded))}")
+        failed = True
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"FAIL: median {median:.1f} ms exceeds the {args.budget_ms:g} ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
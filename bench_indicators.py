@@ -0,0 +1,128 @@
+"""
+Micro-benchmark: precompiled IndicatorMatcher vs the per-pattern scans verify_url used to run.
+
+    python bench_indicators.py --sizes 1 2 --repeat 3
+
+The legacy scan is quadratic on the 'minified' page, so large sizes take minutes.
+"""
+import argparse
+import random
+import re
+import time
+
+from catalog_indicators import (
+    COURSE_LISTING_INDICATORS,
+    COURSE_SECTION_PATTERNS,
+    CS_INDICATORS,
+    UNIVERSITY_CONTENT_PATTERNS,
+    matcher_for,
+)
+
+FILLER_WORDS = (
+    "the of and to in student program students faculty department engineering "
+    "mathematics research campus offered semester major minor lecture laboratory"
+).split()
+
+def legacy_scan(content: str, university_name: str):
+    """The pre-matcher analysis: one full scan per pattern, patterns rebuilt per call"""
+    additional_patterns = []
+    for uni, patterns in UNIVERSITY_CONTENT_PATTERNS.items():
+        if uni in university_name.lower():
+            additional_patterns.extend(patterns)
+
+    anchor = None
+    if not any(re.search(pattern, content) for pattern in additional_patterns):
+        for pattern in COURSE_SECTION_PATTERNS:
+            if pattern in content:
+                anchor = pattern
+                break
+
+    course_listing_indicators = list(COURSE_LISTING_INDICATORS) + additional_patterns
+    contains_cs_courses = (
+        any(indicator in content for indicator in CS_INDICATORS) or
+        any(re.search(pattern, content, re.IGNORECASE) for pattern in course_listing_indicators)
+    )
+    return anchor, contains_cs_courses
+
+def matcher_scan(content: str, university_name: str):
+    matches = matcher_for(university_name).scan(content, exhaustive=False)
+    anchor = None if matches.university_pattern_matched else matches.best_anchor()
+    return anchor, matches.contains_cs_courses
+
+def matcher_report(content: str, university_name: str):
+    """Full report of every pattern present, which the legacy code never computed"""
+    return matcher_for(university_name).scan(content)
+
+def filler_line(rng: random.Random, words: int = 18) -> str:
+    return ' '.join(rng.choice(FILLER_WORDS) for _ in range(words))
+
+def catalog_page(size: int, rng: random.Random) -> str:
+    """Courseleaf-style page: anchors and course blocks spread through filler text"""
+    lines = ['<a href="#coursestext">courses</a>']
+    total = 0
+    number = 100
+    while total < size:
+        if rng.random() < 0.05:
+            line = f'<div class="courseblock">cs {number}. topic. 3 units. prerequisites: cs {number - 1}.</div>'
+            number += 1
+        else:
+            line = filler_line(rng)
+        lines.append(line)
+        total += len(line) + 1
+    return '\n'.join(lines)
+
+def unrelated_page(size: int, rng: random.Random) -> str:
+    """Page with none of the indicators, so every pattern has to scan to the end"""
+    lines, total = [], 0
+    while total < size:
+        line = filler_line(rng)
+        lines.append(line)
+        total += len(line) + 1
+    return '\n'.join(lines)
+
+def minified_page(size: int, rng: random.Random) -> str:
+    """Single-line page with many 'bulletin'/'computer science' heads whose tails never follow"""
+    parts, total = [], 0
+    while total < size:
+        part = filler_line(rng, 40) + (' bulletin computer science ' if rng.random() < 0.3 else ' ')
+        parts.append(part)
+        total += len(part)
+    return ''.join(parts) + ' <a href="#courses">'
+
+PAGES = {
+    'catalog': catalog_page,
+    'unrelated': unrelated_page,
+    'minified': minified_page,
+}
+
+def best_of(func, content: str, university_name: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content, university_name)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 2], help='page sizes in MB')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--university', default='Stanford University')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'page':<10} {'MB':>5} {'legacy ms':>11} {'matcher ms':>11} {'speedup':>8} {'full report ms':>15}")
+    for name, build in PAGES.items():
+        for size_mb in args.sizes:
+            content = build(int(size_mb * 1024 * 1024), rng).lower()
+            assert legacy_scan(content, args.university) == matcher_scan(content, args.university)
+            legacy = best_of(legacy_scan, content, args.university, args.repeat)
+            matcher = best_of(matcher_scan, content, args.university, args.repeat)
+            report = best_of(matcher_report, content, args.university, args.repeat)
+            print(
+                f"{name:<10} {size_mb:>5g} {legacy * 1000:>11.1f} {matcher * 1000:>11.1f} "
+                f"{legacy / matcher:>7.1f}x {report * 1000:>15.1f}"
+            )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark: an all-university PrerequisiteGraph at scale.
+
+    python bench_prereqs.py --universities 1500 --courses 200 --queries 20000 --updates 5000
+
+Builds one graph from synthetic catalogs (subject codes like 'CS 161' and, for every
+fifth university, MIT-style dotted numbers like '6.1210'), then times closure and depth
+queries, incremental prerequisite updates and cycle rejection. Updates are compared
+with recomputing the order from scratch (Kahn's algorithm), which is what a graph
+without incremental ordering would pay per change.
+"""
+import argparse
+import random
+import time
+from collections import deque
+from typing import List
+
+from bench_catalog import percentile
+from catalog_extract import CourseRecord
+from catalog_prereqs import PrerequisiteGraph
+
+SUBJECTS = ['CS', 'MATH', 'PHYS', 'STAT', 'EE', 'CHEM', 'BIO', 'ECON']
+
+def synthetic_catalog(count: int, dotted: bool, rng: random.Random) -> List[CourseRecord]:
+    """Courses whose prerequisites are earlier courses of the same catalog, so it is acyclic"""
+    if dotted:
+        codes = [f"{rng.randint(1, 24)}.{number:04d}" for number in range(1000, 1000 + count)]
+    else:
+        codes = [f"{rng.choice(SUBJECTS)} {number}" for number in range(100, 100 + count)]
+    courses = []
+    for i, code in enumerate(codes):
+        prereqs = rng.sample(codes[max(0, i - 40):i], min(i, rng.randint(0, 3)))
+        courses.append(CourseRecord(
+            code=code, title=f"Course {i}", prerequisites=' and '.join(prereqs) or None
+        ))
+    return courses
+
+def kahn_order(graph: PrerequisiteGraph) -> List[int]:
+    indegree = [len(prereqs) for prereqs in graph._prereqs]
+    queue = deque(node for node, degree in enumerate(indegree) if degree == 0)
+    order = []
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        for dependent in graph._dependents[node]:
+            indegree[dependent] -= 1
+            if indegree[dependent] == 0:
+                queue.append(dependent)
+    return order
+
+def report(label: str, timings: List[float]) -> None:
+    timings.sort()
+    print(f"  {label:<28} p50 {percentile(timings, 0.5) * 1e6:>8.1f} us   p99 {percentile(timings, 0.99) * 1e6:>9.1f} us")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--universities', type=int, default=1500)
+    parser.add_argument('--courses', type=int, default=200, help='courses per university')
+    parser.add_argument('--queries', type=int, default=20000)
+    parser.add_argument('--updates', type=int, default=5000)
+    parser.add_argument('--baseline-updates', type=int, default=5, help='updates timed with a full Kahn recompute (0 to skip)')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    catalogs = [
+        (f"University {i}", synthetic_catalog(args.courses, i % 5 == 0, rng))
+        for i in range(args.universities)
+    ]
+    graph = PrerequisiteGraph()
+    start = time.perf_counter()
+    for university, courses in catalogs:
+        graph.add_catalog(university, courses)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    order = graph.topological_order()
+    materialize = time.perf_counter() - start
+    edges = sum(map(len, graph._prereqs))
+    print(f"{len(graph)} courses, {edges} prerequisite edges across {args.universities} universities")
+    print(f"  build {build:.2f} s ({len(graph) / build:,.0f} courses/s), order {materialize * 1000:.0f} ms "
+          f"({len(order)} keys)")
+
+    keys = graph.keys
+    timings = {'transitive (cold)': [], 'transitive (warm)': [], 'depth': []}
+    for _ in range(args.queries):
+        university, code = rng.choice(keys)
+        cold = graph._id(code, university) not in graph._closures
+        start = time.perf_counter()
+        graph.transitive_prerequisites(code, university)
+        timings['transitive (cold)' if cold else 'transitive (warm)'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        graph.depth(code, university)
+        timings['depth'].append(time.perf_counter() - start)
+    for label, values in timings.items():
+        if values:
+            report(label, values)
+
+    added, rejected = [], []
+    for _ in range(args.updates):
+        university, courses = rng.choice(catalogs)
+        i = rng.randrange(1, len(courses))
+        course, earlier = courses[i].code, courses[rng.randrange(i)].code
+        # An edge from an earlier course never closes a cycle; once it is in, the reverse one does
+        current = graph.prerequisites(course, university)
+        start = time.perf_counter()
+        graph.set_prerequisites(course, current + [earlier], university)
+        added.append(time.perf_counter() - start)
+        current = graph.prerequisites(earlier, university)
+        start = time.perf_counter()
+        cyclic = graph.set_prerequisites(earlier, current + [course], university)
+        rejected.append(time.perf_counter() - start)
+        assert cyclic, (university, earlier, course)
+    report('add prerequisite', added)
+    report('reject cyclic prerequisite', rejected)
+
+    if args.baseline_updates:
+        start = time.perf_counter()
+        for _ in range(args.baseline_updates):
+            kahn_order(graph)
+        per_update = (time.perf_counter() - start) / args.baseline_updates
+        print(f"  full recompute (Kahn)        {per_update * 1e6:>8.0f} us per update")
+
+if __name__ == '__main__':
+    main()
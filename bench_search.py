@@ -0,0 +1,152 @@
+"""
+Benchmark: course search (catalog_search.CourseIndex) at growing collection sizes.
+
+    python bench_search.py --courses 100000 1000000 --queries 2000
+
+Synthetic catalogs (200 courses per university, Zipf-distributed title and description
+words) are indexed, then queried with words taken from indexed titles: single words,
+two- and three-word queries, as-you-type searches (last word a prefix) and
+completions. It reports build time, index size and open time, per query kind the
+p50/p99 latency, and the time to re-index one university incrementally. A substring
+scan over every title is timed for comparison.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Iterator, List
+
+from bench_catalog import percentile
+from catalog_extract import CourseRecord
+from catalog_search import CatalogCourses, CourseIndex, tokenize
+
+COURSES_PER_UNIVERSITY = 200
+SUBJECTS = ['CS', 'CSE', 'COMP', 'CSCI', 'MATH', 'STAT', 'ECE', 'EE', 'DATA', 'INFO', 'PHYS', 'BIOL']
+SEED_WORDS = (
+    "introduction programming computer science systems data structures algorithms machine learning "
+    "software engineering networks operating databases theory computation artificial intelligence "
+    "graphics security distributed parallel compilers languages design analysis discrete mathematics "
+    "linear algebra probability statistics calculus web mobile development human interaction robotics "
+    "vision natural language processing cloud computing embedded architecture organization logic"
+).split()
+SYLLABLES = ['ab', 'con', 'di', 'ex', 'for', 'gra', 'hy', 'in', 'lo', 'mat', 'no', 'pro', 'quan',
+             're', 'sta', 'tri', 'un', 'vec', 'wor', 'xe', 'zo']
+
+def vocabulary(size: int, rng: random.Random) -> List[str]:
+    words = list(SEED_WORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+class Corpus:
+    def __init__(self, words: int, rng: random.Random):
+        self.rng = rng
+        self.words = vocabulary(words, rng)
+        # Zipf: the i-th most common word is used proportionally to 1 / (i + 1)
+        total = 0.0
+        self.cumulative = []
+        for rank in range(len(self.words)):
+            total += 1 / (rank + 1)
+            self.cumulative.append(total)
+        self.titles: List[str] = []
+
+    def text(self, count: int) -> str:
+        return ' '.join(self.rng.choices(self.words, cum_weights=self.cumulative, k=count))
+
+    def catalogs(self, courses: int, start: int = 0) -> Iterator[CatalogCourses]:
+        for university in range(start, start + courses // COURSES_PER_UNIVERSITY):
+            records = []
+            for number in range(COURSES_PER_UNIVERSITY):
+                title = self.text(self.rng.randint(2, 5)).title()
+                self.titles.append(title.lower())
+                records.append(CourseRecord(
+                    code=f"{self.rng.choice(SUBJECTS)} {100 + number}",
+                    title=title,
+                    credits=str(self.rng.choice([1, 3, 4])),
+                    description=self.text(self.rng.randint(15, 40)).capitalize() + '.'
+                ))
+            yield CatalogCourses(
+                university_name=f"Benchmark University {university}",
+                catalog_url=f"https://catalog.benchmark{university}.edu/courses",
+                courses=records
+            )
+
+def workload(corpus: Corpus, queries: int, rng: random.Random):
+    """(kind, text) queries built from indexed titles"""
+    items = []
+    for _ in range(queries):
+        words = tokenize(rng.choice(corpus.titles))
+        if not words:
+            continue
+        kind = rng.choice(['1 word', '2 words', '3 words', 'as you type', 'complete'])
+        if kind in ('as you type', 'complete'):
+            last = words[min(len(words), 2) - 1]
+            text = ' '.join(words[:min(len(words), 2) - 1] + [last[:rng.randint(1, len(last))]])
+        else:
+            text = ' '.join(words[:int(kind[0])])
+        items.append((kind, text))
+    return items
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--courses', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--words', type=int, default=50000, help='vocabulary size')
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--baseline-queries', type=int, default=20, help='queries timed with a title scan (0 to skip)')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    for count in args.courses:
+        corpus = Corpus(args.words, rng)
+        with tempfile.TemporaryDirectory() as tmp:
+            index = CourseIndex(os.path.join(tmp, 'search'))
+            start = time.perf_counter()
+            index.add_catalogs(corpus.catalogs(count))
+            build = time.perf_counter() - start
+            stats = index.stats()
+            index.close()
+            start = time.perf_counter()
+            index = CourseIndex(os.path.join(tmp, 'search'))
+            indexed = len(index)
+            opened = time.perf_counter() - start
+            print(f"{indexed} courses: build {build:.1f} s, index {stats['bytes'] / 2 ** 20:.0f} MiB "
+                  f"({stats['terms']} terms), open {opened * 1000:.1f} ms")
+
+            timings = {}
+            for kind, text in workload(corpus, args.queries, rng):
+                start = time.perf_counter()
+                if kind == 'complete':
+                    index.complete(text, args.limit)
+                else:
+                    index.search(text, args.limit, prefix=kind == 'as you type')
+                timings.setdefault(kind, []).append(time.perf_counter() - start)
+            print(f"  {'query':<12} {'p50 ms':>8} {'p99 ms':>8}")
+            for kind, values in sorted(timings.items()):
+                values.sort()
+                print(f"  {kind:<12} {percentile(values, 0.5) * 1000:>8.2f} {percentile(values, 0.99) * 1000:>8.2f}")
+
+            updates = []
+            for catalog in corpus.catalogs(5 * COURSES_PER_UNIVERSITY, start=0):
+                start = time.perf_counter()
+                index.add_catalogs([catalog])
+                updates.append(time.perf_counter() - start)
+            print(f"  re-index one university: {percentile(sorted(updates), 0.5) * 1000:.0f} ms "
+                  f"(p50 of {len(updates)}), {index.stats()['segments']} segments, {len(index)} live courses")
+
+            if args.baseline_queries:
+                sample = [text for kind, text in workload(corpus, args.baseline_queries, rng)]
+                start = time.perf_counter()
+                for text in sample:
+                    words = text.split()
+                    [title for title in corpus.titles if all(word in title for word in words)]
+                print(f"  title scan: {(time.perf_counter() - start) / len(sample) * 1000:.0f} ms/query")
+            index.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: host-indexed URLRuleRegistry lookups vs the linear scan normalize_url used to run.
+
+    python bench_url_rules.py --rules 10 1000 10000 50000 --urls 20000
+
+Registry throughput should stay flat as the rule count grows; the linear scan degrades with it.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from catalog_url_rules import URLRuleRegistry
+
+def synthetic_rules(count: int, rng: random.Random):
+    rules = []
+    for i in range(count):
+        name = f"uni{i}"
+        rules.append({
+            'university': name,
+            'host': f"catalog.{name}.edu",
+            'path_prefix': rng.choice(['', '/courses', '/undergraduate/computer-science']),
+            'target': f"https://bulletin.{name}.edu/cs/courses"
+        })
+    return rules
+
+def legacy_normalize(url: str, university_name: str, university_patterns) -> str:
+    """The pre-registry lookup: substring tests against every rule"""
+    url_lower = url.lower()
+    university_lower = university_name.lower()
+    for uni, patterns in university_patterns.items():
+        if uni in university_lower:
+            for old_pattern in patterns['old_patterns']:
+                if old_pattern in url_lower:
+                    return f"https://{patterns['new_pattern']}"
+    return url
+
+def legacy_patterns(rules):
+    patterns = {}
+    for rule in rules:
+        entry = patterns.setdefault(rule['university'], {'old_patterns': [], 'new_pattern': rule['target'][8:]})
+        entry['old_patterns'].append(rule['host'] + rule['path_prefix'])
+    return patterns
+
+def workload(count: int, urls: int, rng: random.Random):
+    """Half the lookups hit a rule, half miss (unknown host); every URL is distinct"""
+    lookups = []
+    for n in range(urls):
+        i = rng.randrange(count)
+        if rng.random() < 0.5:
+            lookups.append((f"https://catalog.uni{i}.edu/undergraduate/computer-science/?ref={n}", f"Uni{i} University"))
+        else:
+            lookups.append((f"https://www.other{i}.edu/about/?ref={n}", f"Other{i} College"))
+    return lookups
+
+def throughput(func, lookups) -> float:
+    start = time.perf_counter()
+    for url, name in lookups:
+        func(url, name)
+    return len(lookups) / (time.perf_counter() - start)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rules', type=int, nargs='+', default=[10, 100, 1000, 10000, 50000])
+    parser.add_argument('--urls', type=int, default=20000)
+    parser.add_argument('--legacy-max', type=int, default=10000, help='skip the slow linear scan above this many rules')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'rules':>7} {'load ms':>9} {'registry ops/s':>15} {'legacy ops/s':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'url_rules.json')
+        for count in args.rules:
+            rules = synthetic_rules(count, rng)
+            with open(path, 'w') as f:
+                json.dump({'format': 1, 'version': f'bench-{count}', 'rules': rules}, f)
+
+            start = time.perf_counter()
+            registry = URLRuleRegistry(path)
+            load = time.perf_counter() - start
+            assert len(registry) == count
+
+            lookups = workload(count, args.urls, rng)
+            registry_ops = throughput(registry.normalize, lookups)
+            legacy = '-'
+            if count <= args.legacy_max:
+                patterns = legacy_patterns(rules)
+                sample = lookups[:max(100, args.urls * 100 // count)]
+                for url, name in sample[:200]:
+                    assert registry.normalize(url, name) == legacy_normalize(url, name, patterns)
+                legacy = f"{throughput(lambda url, name: legacy_normalize(url, name, patterns), sample):.0f}"
+            print(f"{count:>7} {load * 1000:>9.1f} {registry_ops:>15.0f} {legacy:>13}")
+
+if __name__ == '__main__':
+    main()
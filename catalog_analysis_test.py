@@ -0,0 +1,61 @@
+"""
+Tests for the analysis pool: workers reach the same verdicts as inline analysis, for bodies sent as bytes and through shared memory.
+
+    python -m pytest catalog_analysis_test.py
+"""
+import asyncio
+
+import pytest
+
+import get_uni_courses
+from catalog_analysis import AnalysisPool
+
+FILLER = '<p>' + 'Campus news and events. ' * 40 + '</p>\n'
+
+PAGES = [
+    # Under the shared memory threshold: sent as bytes
+    ('<h1>Computer Science</h1><div id="courses"><p>CS 106A Programming Methodology.</p></div>', 'text/html'),
+    ('<p>Admissions and financial aid</p>', None),
+    # Shared memory, in a fresh block and then reusing it for smaller bodies
+    (FILLER * 40 + '<div id="coursestext"><p>CS 229 Machine Learning. 3 units</p></div>', 'text/html; charset=utf-8'),
+    (FILLER * 10 + '<h2>Course Descriptions</h2><p>CS 161 Théorie des algorithmes</p>', 'text/html; charset=utf-8'),
+    (FILLER * 20 + '<p>Café hours</p>', 'text/html; charset=iso-8859-1'),
+    # Larger than any block so far
+    (FILLER * 200 + '<a href="#course-list">List</a><p>CS 140 Operating Systems</p>', 'text/html'),
+]
+
+@pytest.fixture
+def pool():
+    pool = AnalysisPool(workers=1, shared_memory_threshold=8 * 1024, min_body_bytes=0)
+    yield pool
+    pool.close()
+
+def _encode(text, content_type):
+    return text.encode('latin-1' if content_type and 'iso-8859-1' in content_type else 'utf-8')
+
+def test_workers_agree_with_inline_analysis(pool):
+    bodies = [(_encode(text, content_type), content_type) for text, content_type in PAGES]
+    assert any(len(body) < pool.shared_memory_threshold for body, _ in bodies)
+    assert any(len(body) >= pool.shared_memory_threshold for body, _ in bodies)
+    url = 'https://catalog.stanford.edu/cs'
+
+    async def analyze_all():
+        results = []
+        # One at a time, so freed blocks are reused, then all at once
+        for body, content_type in bodies:
+            results.append(await pool.run(get_uni_courses.analyze_page, body, url, content_type, 'Stanford University', True))
+        results.extend(await asyncio.gather(*(
+            pool.run(get_uni_courses.analyze_page, body, url, content_type, 'Stanford University', True)
+            for body, content_type in bodies
+        )))
+        return results
+
+    results = asyncio.run(analyze_all())
+    expected = [
+        get_uni_courses.analyze_page(body, url, content_type, 'Stanford University', True)
+        for body, content_type in bodies
+    ]
+    assert results == expected + expected
+    assert [result.contains_cs_courses for result in expected] == [True, False, True, True, False, True]
+    # Bodies that went through shared memory reused blocks rather than one each
+    assert 0 < len(pool._blocks) < sum(len(body) >= pool.shared_memory_threshold for body, _ in bodies) * 2
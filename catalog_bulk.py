@@ -0,0 +1,273 @@
+"""
+Bulk catalog lookups: read universities from a JSONL, CSV or text file and stream results as JSONL.
+
+    python catalog_bulk.py universities.csv --output catalogs.jsonl --concurrency 16
+    python catalog_bulk.py universities.csv --batch-size 10
+
+With --batch-size N, each agent run looks up N universities at once, and any the
+batched run doesn't settle are looked up on their own.
+
+Each result line carries the input position ("index") of its university and is flushed as
+soon as the lookup finishes, so the output file doubles as the checkpoint: rerunning the
+same command after a crash skips every university that already has a result.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+import get_uni_courses
+
+NAME_FIELDS = ('university_name', 'university', 'name', 'institution')
+PROGRESS_INTERVAL = 1.0
+
+def _detect_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    if extension in ('.csv', '.tsv'):
+        return 'csv'
+    return 'text'
+
+def _name_from_record(record, field: Optional[str]) -> Optional[str]:
+    if isinstance(record, str):
+        return record
+    if not isinstance(record, dict):
+        return None
+    for key in ((field,) if field else NAME_FIELDS):
+        value = record.get(key)
+        if isinstance(value, str) and value.strip():
+            return value
+    return None
+
+def read_university_names(path: str, input_format: Optional[str] = None, field: Optional[str] = None) -> Iterator[str]:
+    """
+    Stream university names from a file, one per record.
+
+    Args:
+        path: JSONL (objects or bare strings), CSV with a header row, or plain text
+        input_format: 'jsonl', 'csv' or 'text'; detected from the extension if omitted
+        field: Field holding the name; by default the first of NAME_FIELDS present
+            (for CSV without any of them, the first column)
+
+    Yields:
+        Names in file order; blank records yield '' so positions stay stable
+    """
+    input_format = input_format or _detect_format(path)
+    with open(path, newline='', encoding='utf-8') as f:
+        if input_format == 'jsonl':
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{path}:{line_number}: invalid JSON ({e})")
+                yield (_name_from_record(record, field) or '').strip()
+        elif input_format == 'csv':
+            dialect = 'excel-tab' if path.lower().endswith('.tsv') else 'excel'
+            reader = csv.DictReader(f, dialect=dialect)
+            fallback = None
+            if field is None and not any(name in (reader.fieldnames or ()) for name in NAME_FIELDS):
+                fallback = (reader.fieldnames or [None])[0]
+            for row in reader:
+                yield (_name_from_record(row, field or fallback) or '').strip()
+        else:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+
+def load_checkpoint(path: str, retry_errors: bool = False) -> Dict[int, str]:
+    """
+    Read an existing output file and return the completed positions with their university names.
+
+    A partial last line left by a killed run is truncated so appending continues cleanly.
+    With retry_errors, lookups that failed with an exception are not counted as completed,
+    and their lines are dropped from the file so the retried results don't duplicate them.
+    """
+    completed: Dict[int, str] = {}
+    if not os.path.exists(path):
+        return completed
+    valid_end = 0
+    # The line holding the result kept for each position, so failures can be dropped
+    kept: Dict[int, bytes] = {}
+    dropped = False
+    with open(path, 'rb') as f:
+        for line_number, raw in enumerate(f, 1):
+            if not raw.endswith(b'\n'):
+                break
+            valid_end += len(raw)
+            try:
+                record = json.loads(raw)
+            except json.JSONDecodeError:
+                continue
+            if (
+                not isinstance(record, dict)
+                or not isinstance(record.get('index'), int)
+                or not isinstance(record.get('university_name'), str)
+            ):
+                raise ValueError(
+                    f"{path}:{line_number}: not a result line (expected an object with 'index' and 'university_name')"
+                )
+            index = record['index']
+            dropped = dropped or index in kept
+            if retry_errors and record.get('error_message'):
+                completed.pop(index, None)
+                kept.pop(index, None)
+                dropped = True
+                continue
+            completed[index] = record['university_name']
+            kept[index] = raw
+    if retry_errors and dropped:
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.writelines(kept.values())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    elif valid_end < os.path.getsize(path):
+        with open(path, 'r+b') as f:
+            f.truncate(valid_end)
+    return completed
+
+class Progress:
+    """Throughput and ETA line on stderr, rewritten in place on a terminal"""
+
+    def __init__(self, total: int, already_done: int, stream: TextIO = sys.stderr):
+        self.total = total
+        self.done = already_done
+        self.errors = 0
+        self.processed = 0
+        self.stream = stream
+        self.started = time.monotonic()
+        self._last_report = 0.0
+
+    def update(self, error: bool) -> None:
+        self.done += 1
+        self.processed += 1
+        self.errors += error
+        now = time.monotonic()
+        if now - self._last_report >= PROGRESS_INTERVAL or self.done == self.total:
+            self._last_report = now
+            self.report(now)
+
+    def report(self, now: Optional[float] = None) -> None:
+        elapsed = (now or time.monotonic()) - self.started
+        rate = self.processed / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.done
+        eta = _format_duration(remaining / rate) if rate > 0 else '?'
+        line = (
+            f"{self.done}/{self.total} done, {self.errors} errors, "
+            f"{rate:.2f}/s, elapsed {_format_duration(elapsed)}, ETA {eta}"
+        )
+        if self.stream.isatty():
+            self.stream.write('\r' + line.ljust(78))
+        else:
+            self.stream.write(line + '\n')
+        self.stream.flush()
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+def _pending(names: Iterator[str], completed: Dict[int, str], positions: List[int]) -> Iterator[str]:
+    """Names still to look up; positions[k] records the input position of the k-th one yielded"""
+    for position, name in enumerate(names):
+        if position in completed:
+            if completed[position] != name:
+                raise ValueError(
+                    f"Output does not match the input at record {position} "
+                    f"({completed[position]!r} vs {name!r}); use a new output file or --no-resume"
+                )
+            continue
+        if not name:
+            continue
+        positions.append(position)
+        yield name
+
+async def run_bulk(
+    names: Iterator[str],
+    output: TextIO,
+    total: int,
+    completed: Dict[int, str],
+    max_concurrency: int,
+    refresh: bool = False,
+    progress: Optional[Progress] = None,
+    batch_size: int = get_uni_courses.DEFAULT_BATCH_SIZE
+) -> Tuple[int, int]:
+    """Look up pending names concurrently, writing one JSON line per result as it completes"""
+    positions: List[int] = []
+    processed = errors = 0
+    last_sync = time.monotonic()
+    async for index, result in get_uni_courses.iter_indexed_university_catalogs(
+        _pending(names, completed, positions), max_concurrency, refresh, batch_size
+    ):
+        record = {'index': positions[index], **result.model_dump(mode='json')}
+        output.write(json.dumps(record) + '\n')
+        output.flush()
+        # Survive a machine crash too, not just a killed process, without an fsync per line
+        if output.fileno() > 2 and time.monotonic() - last_sync >= PROGRESS_INTERVAL:
+            os.fsync(output.fileno())
+            last_sync = time.monotonic()
+        processed += 1
+        errors += result.error_message is not None
+        if progress is not None:
+            progress.update(result.error_message is not None)
+    return processed, errors
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='JSONL, CSV or text file of universities')
+    parser.add_argument('-o', '--output', help="results file (default: <input>.results.jsonl; '-' for stdout)")
+    parser.add_argument('--format', choices=('jsonl', 'csv', 'text'), help='input format (default: by extension)')
+    parser.add_argument('--field', help='field holding the university name')
+    parser.add_argument('-c', '--concurrency', type=int, default=get_uni_courses.DEFAULT_MAX_CONCURRENCY)
+    parser.add_argument('-b', '--batch-size', type=int, default=get_uni_courses.DEFAULT_BATCH_SIZE,
+                        help='universities per agent run')
+    parser.add_argument('--refresh', action='store_true', help='skip the catalog cache')
+    parser.add_argument('--no-resume', action='store_true', help='start over, replacing the output file')
+    parser.add_argument('--retry-errors', action='store_true', help='on resume, look up failed universities again')
+    parser.add_argument('-q', '--quiet', action='store_true', help='no progress output')
+    args = parser.parse_args(argv)
+
+    output_path = args.output or os.path.splitext(args.input)[0] + '.results.jsonl'
+    to_stdout = output_path == '-'
+    try:
+        completed = {} if (to_stdout or args.no_resume) else load_checkpoint(output_path, args.retry_errors)
+        total = sum(1 for name in read_university_names(args.input, args.format, args.field) if name)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    progress = None if args.quiet else Progress(total, len(completed))
+    if completed and progress is not None:
+        print(f"Resuming: {len(completed)} of {total} already done", file=sys.stderr)
+
+    names = read_university_names(args.input, args.format, args.field)
+    output = sys.stdout if to_stdout else open(output_path, 'w' if args.no_resume else 'a', encoding='utf-8')
+    try:
+        processed, errors = asyncio.run(run_bulk(
+            names, output, total, completed, args.concurrency, args.refresh, progress, args.batch_size
+        ))
+    except KeyboardInterrupt:
+        print("\nInterrupted; rerun the same command to resume", file=sys.stderr)
+        return 130
+    except ValueError as e:
+        # The output belongs to a different input; results written before the mismatch stay valid
+        print(f"\nError: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if not to_stdout:
+            output.close()
+    if progress is not None and progress.stream.isatty():
+        progress.stream.write('\n')
+    print(f"Processed {processed} universities ({errors} errors) into {output_path}", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
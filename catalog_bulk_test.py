@@ -0,0 +1,52 @@
+"""
+Tests for the bulk lookup checkpoint and CLI error reporting.
+
+    python -m pytest catalog_bulk_test.py
+"""
+import json
+
+import pytest
+
+import catalog_bulk
+
+def _line(index, name, error=None):
+    return json.dumps({'index': index, 'university_name': name, 'error_message': error}) + '\n'
+
+def test_resume_counts_completed_and_truncates_a_partial_line(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    path.write_text(_line(0, 'MIT') + _line(1, 'Yale', 'timeout') + '{"index": 2, "univ')
+    assert catalog_bulk.load_checkpoint(str(path)) == {0: 'MIT', 1: 'Yale'}
+    assert path.read_text() == _line(0, 'MIT') + _line(1, 'Yale', 'timeout')
+
+def test_retry_errors_drops_failed_lines(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    path.write_text(
+        _line(0, 'MIT') + _line(1, 'Yale', 'timeout') + _line(2, 'Rice')
+        + _line(2, 'Rice', 'timeout') + _line(3, 'Duke', 'timeout') + _line(3, 'Duke') + '{"ind'
+    )
+    assert catalog_bulk.load_checkpoint(str(path), retry_errors=True) == {0: 'MIT', 3: 'Duke'}
+    # Every position is on at most one line, so appending the retried results can't duplicate it
+    assert path.read_text() == _line(0, 'MIT') + _line(3, 'Duke')
+
+def test_mismatched_output_is_a_cli_error(tmp_path, capsys):
+    names = tmp_path / 'universities.txt'
+    names.write_text('Stanford University\nMIT\n')
+    output = tmp_path / 'results.jsonl'
+    output.write_text(_line(0, 'Harvard University'))
+    assert catalog_bulk.main([str(names), '-o', str(output), '--quiet']) == 1
+    error = capsys.readouterr().err
+    assert "Output does not match the input at record 0" in error
+    assert 'Traceback' not in error
+
+@pytest.mark.parametrize('line', ['[0, "MIT"]', '"MIT"', '{"university_name": "MIT"}', '{"index": "0", "university_name": "MIT"}'])
+def test_malformed_checkpoint_line_is_a_cli_error(tmp_path, capsys, line):
+    names = tmp_path / 'universities.txt'
+    names.write_text('MIT\nYale\n')
+    output = tmp_path / 'results.jsonl'
+    output.write_text(_line(0, 'MIT') + line + '\n')
+    with pytest.raises(ValueError, match='results.jsonl:2:'):
+        catalog_bulk.load_checkpoint(str(output))
+    assert catalog_bulk.main([str(names), '-o', str(output), '--quiet']) == 1
+    error = capsys.readouterr().err
+    assert 'results.jsonl:2: not a result line' in error
+    assert 'Traceback' not in error
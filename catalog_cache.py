@@ -0,0 +1,266 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from typing import Dict, Generic, Iterator, Optional, Type, TypeVar
+
+from pydantic import BaseModel
+
+from catalog_fingerprint import PageFingerprint
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'uni_catalog')
+DEFAULT_CATALOG_TTL = 30 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 50000
+
+ModelT = TypeVar('ModelT', bound=BaseModel)
+
+def canonicalize_university_name(university_name: str) -> str:
+    """Reduce a university name to a stable cache key ('The Univ. of X' and 'university of x' match)"""
+    name = unicodedata.normalize('NFKD', university_name)
+    name = ''.join(ch for ch in name if not unicodedata.combining(ch)).lower()
+    name = name.replace('&', ' and ')
+    name = re.sub(r'\buniv\b\.?', 'university', name)
+    name = re.sub(r'[^a-z0-9]+', ' ', name).strip()
+    if name.startswith('the '):
+        name = name[4:]
+    return name
+
+def default_cache_path(filename: str) -> str:
+    return os.path.join(os.getenv('CATALOG_CACHE_DIR', DEFAULT_CACHE_DIR), filename)
+
+def _connect(path: str) -> sqlite3.Connection:
+    if path != ':memory:':
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+class CatalogCache(Generic[ModelT]):
+    """
+    On-disk TTL cache of catalog lookups keyed by canonical university name.
+
+    Entries expire after ttl_seconds; once more than max_entries are stored the
+    least recently used ones are evicted. hits and misses count lookups since creation.
+    """
+
+    def __init__(
+        self,
+        model: Type[ModelT],
+        path: Optional[str] = None,
+        ttl_seconds: float = DEFAULT_CATALOG_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        self.model = model
+        self.path = path or default_cache_path('catalogs.sqlite3')
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = _connect(self.path)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS catalogs ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS catalogs_accessed ON catalogs (accessed_at)')
+
+    def get(self, university_name: str) -> Optional[ModelT]:
+        key = canonicalize_university_name(university_name)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value, expires_at FROM catalogs WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            self._db.execute('UPDATE catalogs SET accessed_at = ? WHERE key = ?', (now, key))
+            self.hits += 1
+        return self.model.model_validate_json(row[0])
+
+    def put(self, university_name: str, value: ModelT) -> None:
+        key = canonicalize_university_name(university_name)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO catalogs (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, value.model_dump_json(), now + self.ttl_seconds, now)
+            )
+            self._evict(now)
+
+    def values(self) -> Iterator[ModelT]:
+        """Every unexpired entry, e.g. to re-check all cached catalogs"""
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT value FROM catalogs WHERE expires_at > ?', (time.time(),)
+            ).fetchall()
+        for row in rows:
+            yield self.model.model_validate_json(row[0])
+
+    def invalidate(self, university_name: str) -> None:
+        with self._lock:
+            self._db.execute('DELETE FROM catalogs WHERE key = ?', (canonicalize_university_name(university_name),))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute('DELETE FROM catalogs')
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM catalogs').fetchone()[0]
+
+    def _evict(self, now: float) -> None:
+        self._db.execute('DELETE FROM catalogs WHERE expires_at <= ?', (now,))
+        overflow = self._db.execute('SELECT COUNT(*) FROM catalogs').fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._db.execute(
+                'DELETE FROM catalogs WHERE key IN '
+                '(SELECT key FROM catalogs ORDER BY accessed_at LIMIT ?)',
+                (overflow,)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+DEFAULT_PAGE_MAX_ENTRIES = 20000
+
+class PageCache(Generic[ModelT]):
+    """
+    On-disk HTTP page cache for conditional revalidation of catalog URLs.
+
+    Stores each page's ETag/Last-Modified validators with its zlib-compressed body,
+    plus the verification verdicts computed from that body per university. Storing a
+    new body drops the verdicts derived from the old one. Content fingerprints (see
+    catalog_fingerprint) are kept per URL until replaced, so a sweep can compare the
+    page it fetches with the one it last processed.
+    """
+
+    def __init__(
+        self,
+        model: Type[ModelT],
+        path: Optional[str] = None,
+        max_entries: int = DEFAULT_PAGE_MAX_ENTRIES
+    ):
+        self.model = model
+        self.path = path or default_cache_path('pages.sqlite3')
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = _connect(self.path)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS pages ('
+            ' url TEXT PRIMARY KEY,'
+            ' etag TEXT,'
+            ' last_modified TEXT,'
+            ' body BLOB NOT NULL,'
+            ' accessed_at REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at)')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS verdicts ('
+            ' url TEXT NOT NULL,'
+            ' university_key TEXT NOT NULL,'
+            ' value TEXT NOT NULL,'
+            ' PRIMARY KEY (url, university_key))'
+        )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS fingerprints ('
+            ' url TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL)'
+        )
+
+    def revalidation_headers(self, url: str) -> Dict[str, str]:
+        """Conditional request headers that let the server answer 304 Not Modified"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT etag, last_modified FROM pages WHERE url = ?', (url,)
+            ).fetchone()
+        headers = {}
+        if row is not None:
+            if row[0]:
+                headers['If-None-Match'] = row[0]
+            if row[1]:
+                headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def get_text(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute('SELECT body FROM pages WHERE url = ?', (url,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE pages SET accessed_at = ? WHERE url = ?', (time.time(), url))
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], text: str) -> None:
+        body = zlib.compress(text.encode('utf-8'))
+        with self._lock:
+            self._db.execute('DELETE FROM verdicts WHERE url = ?', (url,))
+            self._db.execute(
+                'INSERT OR REPLACE INTO pages (url, etag, last_modified, body, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                (url, etag, last_modified, body, time.time())
+            )
+            self._evict()
+
+    def get_verdict(self, url: str, university_name: str) -> Optional[ModelT]:
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value FROM verdicts WHERE url = ? AND university_key = ?',
+                (url, canonicalize_university_name(university_name))
+            ).fetchone()
+        if row is None:
+            return None
+        return self.model.model_validate_json(row[0])
+
+    def put_verdict(self, url: str, university_name: str, value: ModelT) -> None:
+        with self._lock:
+            # Verdicts are only meaningful for a body we still hold
+            self._db.execute(
+                'INSERT OR REPLACE INTO verdicts (url, university_key, value) '
+                'SELECT url, ?, ? FROM pages WHERE url = ?',
+                (canonicalize_university_name(university_name), value.model_dump_json(), url)
+            )
+
+    def get_fingerprint(self, url: str) -> Optional[PageFingerprint]:
+        with self._lock:
+            row = self._db.execute('SELECT value FROM fingerprints WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            return None
+        return PageFingerprint.model_validate_json(row[0])
+
+    def put_fingerprint(self, url: str, fingerprint: PageFingerprint) -> None:
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO fingerprints (url, value) VALUES (?, ?)',
+                (url, fingerprint.model_dump_json())
+            )
+
+    def record(self, hit: bool) -> None:
+        """Count a revalidation outcome: hit for 304 Not Modified, miss for a full download"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _evict(self) -> None:
+        overflow = self._db.execute('SELECT COUNT(*) FROM pages').fetchone()[0] - self.max_entries
+        if overflow > 0:
+            stale = [row[0] for row in self._db.execute(
+                'SELECT url FROM pages ORDER BY accessed_at LIMIT ?', (overflow,)
+            )]
+            self._db.executemany('DELETE FROM verdicts WHERE url = ?', [(url,) for url in stale])
+            self._db.executemany('DELETE FROM fingerprints WHERE url = ?', [(url,) for url in stale])
+            self._db.executemany('DELETE FROM pages WHERE url = ?', [(url,) for url in stale])
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,69 @@
+"""
+Tests for the catalog cache: expiry after the TTL, LRU eviction at capacity, and refresh bypassing it.
+
+    python -m pytest catalog_cache_test.py
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+import catalog_cache
+import get_uni_courses
+from catalog_cache import CatalogCache
+
+class Entry(BaseModel):
+    catalog_url: str
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(catalog_cache, 'time', SimpleNamespace(time=lambda: now[0]))
+    return now
+
+def _cache(tmp_path, **kwargs):
+    return CatalogCache(Entry, str(tmp_path / 'catalogs.sqlite3'), **kwargs)
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = _cache(tmp_path, ttl_seconds=60)
+    cache.put('Stanford University', Entry(catalog_url='https://bulletin.stanford.edu/courses'))
+    clock[0] += 59
+    # Looked up by canonical name
+    assert cache.get('the stanford univ.') == Entry(catalog_url='https://bulletin.stanford.edu/courses')
+    clock[0] += 1
+    assert cache.get('Stanford University') is None
+    assert list(cache.values()) == []
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+def test_least_recently_used_entries_are_evicted_at_capacity(tmp_path, clock):
+    cache = _cache(tmp_path, max_entries=2)
+    for name in ('Alpha University', 'Beta University'):
+        clock[0] += 1
+        cache.put(name, Entry(catalog_url=f'https://{name.split()[0].lower()}.edu/catalog'))
+    clock[0] += 1
+    assert cache.get('Alpha University') is not None
+    clock[0] += 1
+    cache.put('Gamma University', Entry(catalog_url='https://gamma.edu/catalog'))
+    assert len(cache) == 2
+    assert cache.get('Beta University') is None
+    assert cache.get('Alpha University') is not None and cache.get('Gamma University') is not None
+    cache.close()
+
+def test_refresh_bypasses_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('CATALOG_CACHE_DIR', str(tmp_path))
+    monkeypatch.delenv('CATALOG_FAST_PATH', raising=False)
+    monkeypatch.setattr(get_uni_courses, '_catalog_cache', None)
+    cached = get_uni_courses.UniversityCatalogOutput(
+        university_name='Example University',
+        catalog_url='https://catalog.example.edu/courses',
+        verification_status=get_uni_courses._invalid_result('https://catalog.example.edu/courses', 'Not verified')
+    )
+    get_uni_courses.get_catalog_cache().put('Example University', cached)
+
+    lookup = get_uni_courses._cached_or_probed
+    assert asyncio.run(lookup('Example University', False, 'example.edu')) == cached
+    assert asyncio.run(lookup('Example University', True, 'example.edu')) is None
+    # Bypassing doesn't drop the entry
+    assert get_uni_courses.get_catalog_cache().get('Example University') == cached
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+class SingleFlight:
+    """
+    Coalesces concurrent async calls with the same key onto one in-flight task.
+
+    The first caller starts the task; callers arriving while it runs await the same
+    task and get its result (or exception). The key is forgotten as soon as the task
+    finishes, so later calls start fresh. A waiter that is cancelled does not cancel the
+    shared task.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        # Tasks belong to one event loop, so flights are never shared across loops
+        flight_key = (loop, key)
+        task = self._calls.get(flight_key)
+        if task is None:
+            task = loop.create_task(factory())
+            self._calls[flight_key] = task
+            self.started += 1
+
+            def finished(done: asyncio.Task) -> None:
+                if self._calls.get(flight_key) is done:
+                    del self._calls[flight_key]
+                # Mark the exception retrieved even if every waiter was cancelled
+                if not done.cancelled():
+                    done.exception()
+
+            task.add_done_callback(finished)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+class TTLCache(Generic[T]):
+    """Thread-safe in-memory LRU whose entries also expire ttl_seconds after they were stored"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, T]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[T]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: T) -> None:
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,69 @@
+"""
+Tests for SingleFlight: concurrent calls with one key share a call, and its error reaches every waiter.
+
+    python -m pytest catalog_dedup_test.py
+"""
+import asyncio
+
+import pytest
+
+from catalog_dedup import SingleFlight
+
+def test_concurrent_calls_with_one_key_share_a_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def lookup(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    async def check():
+        results = await asyncio.gather(*(
+            flights.run(key, lambda key=key: lookup(key)) for key in ['mit', 'mit', 'cmu', 'mit', 'cmu']
+        ))
+        assert results == ['MIT', 'MIT', 'CMU', 'MIT', 'CMU']
+        assert sorted(calls) == ['cmu', 'mit'] and len(flights) == 0
+        # A finished key starts fresh
+        assert await flights.run('mit', lambda: lookup('mit')) == 'MIT'
+
+    asyncio.run(check())
+    assert calls.count('mit') == 2
+    assert (flights.started, flights.coalesced) == (3, 3)
+
+def test_an_error_reaches_every_waiter():
+    flights = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError('lookup failed')
+
+    async def check():
+        results = await asyncio.gather(*(flights.run('mit', failing) for _ in range(3)), return_exceptions=True)
+        assert len(calls) == 1
+        assert all(isinstance(result, RuntimeError) and str(result) == 'lookup failed' for result in results)
+        # The failure isn't remembered: the next call runs again
+        with pytest.raises(RuntimeError):
+            await flights.run('mit', failing)
+        assert len(calls) == 2
+
+    asyncio.run(check())
+
+def test_a_cancelled_waiter_leaves_the_call_running():
+    flights = SingleFlight()
+
+    async def lookup():
+        await asyncio.sleep(0.02)
+        return 'done'
+
+    async def check():
+        first = asyncio.ensure_future(flights.run('mit', lookup))
+        second = asyncio.ensure_future(flights.run('mit', lookup))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        assert await second == 'done'
+        assert first.cancelled() and flights.started == 1
+
+    asyncio.run(check())
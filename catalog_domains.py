@@ -0,0 +1,512 @@
+"""
+Institution name to domain index.
+
+    python catalog_domains.py build university_domains.json -o domains.idx
+    python catalog_domains.py lookup "UC Berkeley" "Univ. of Michigan - Ann Arbor"
+
+Source files are JSON lists in the world-universities format ({"name", "domains",
+optional "aliases"}), JSON lines of the same objects, or CSV with name, domains
+and optional aliases columns (multiple values separated by ';').
+"""
+import argparse
+import csv
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from catalog_cache import canonicalize_university_name, default_cache_path
+
+DEFAULT_SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'university_domains.json')
+DEFAULT_MIN_SCORE = 0.8
+MAGIC = b'CDIX'
+FORMAT_VERSION = 1
+
+# 'Main Campus' qualifies nearly any institution's name without telling them apart
+STOPWORDS = frozenset({'a', 'and', 'at', 'campus', 'for', 'in', 'main', 'of', 'the'})
+ABBREVIATIONS = {
+    'u': ('university',),
+    'uc': ('university', 'california'),
+    'inst': ('institute',),
+    'tech': ('technology',),
+    'coll': ('college',),
+    'poly': ('polytechnic',),
+    'mt': ('mount',),
+    'cc': ('community', 'college'),
+    'suny': ('state', 'university', 'new', 'york'),
+    'cuny': ('city', 'university', 'new', 'york'),
+}
+# Query tokens whose posting list is longer than this share of all names only score
+# candidates found through rarer tokens
+COMMON_TOKEN_SHARE = 8
+MAX_CANDIDATES = 16
+MIN_TYPO_SIMILARITY = 0.6
+
+# Sections of the index file, in file order; each is a u32 array except the string blob
+# and the f32 token weights
+_SECTIONS = (
+    'blob',
+    'entry_names', 'entry_domains',
+    'row_entries', 'row_tokens', 'row_token_ids',
+    'token_weights', 'token_names', 'token_postings', 'postings',
+    'trigram_postings', 'trigram_tokens',
+    'name_table', 'token_table', 'trigram_table', 'domain_table',
+)
+_HEADER = struct.Struct('<4sIIII')
+_SECTION = struct.Struct('<QQ')
+
+class DomainRecord(BaseModel):
+    name: str
+    domains: List[str]
+    aliases: List[str] = []
+
+class DomainMatch(BaseModel):
+    name: str
+    domains: List[str]
+    score: float
+
+def normalize_tokens(name: str) -> List[str]:
+    """Tokens of a university name with punctuation, stopwords and common abbreviations normalized"""
+    tokens = canonicalize_university_name(name).split()
+    normalized = []
+    for i, token in enumerate(tokens):
+        if token == 'st':
+            # 'Ohio St', 'Ohio St University' vs 'St Olaf College', 'Washington University in St Louis'
+            following = tokens[i + 1] if i + 1 < len(tokens) else None
+            normalized.append('state' if following in (None, 'university', 'college') else 'saint')
+        elif token in ABBREVIATIONS:
+            normalized.extend(ABBREVIATIONS[token])
+        elif token not in STOPWORDS:
+            normalized.append(token)
+    return normalized
+
+def _trigrams(token: str) -> List[str]:
+    padded = f' {token} '
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+def _bare_host(domain: str) -> str:
+    domain = domain.strip().lower().rstrip('.')
+    return domain[4:] if domain.startswith('www.') else domain
+
+def _split_values(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in (value or '').split(';') if part.strip()]
+
+def load_records(path: str) -> Iterator[DomainRecord]:
+    """Read institution records from a JSON list, JSON lines or CSV file"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            for row in csv.DictReader(f):
+                yield DomainRecord(
+                    name=row['name'],
+                    domains=_split_values(row.get('domains') or row.get('domain')),
+                    aliases=_split_values(row.get('aliases'))
+                )
+            return
+        text = f.read()
+    if text.lstrip().startswith('['):
+        items = json.loads(text)
+    else:
+        items = [json.loads(line) for line in text.splitlines() if line.strip()]
+    for item in items:
+        yield DomainRecord.model_validate(item)
+
+class _HashTable:
+    """Open-addressing table from byte keys (stored in the blob) to u32 values, laid out as a u32 array"""
+
+    def __init__(self, keys: Dict[bytes, int], key_offsets: Dict[bytes, int]):
+        capacity = 8
+        while capacity < 2 * len(keys):
+            capacity *= 2
+        self.words = array('I', [0] * (1 + 3 * capacity))
+        self.words[0] = capacity
+        for key, value in keys.items():
+            slot = zlib.crc32(key) & (capacity - 1)
+            while self.words[2 + 3 * slot]:
+                slot = (slot + 1) & (capacity - 1)
+            self.words[1 + 3 * slot:4 + 3 * slot] = array('I', (key_offsets[key], len(key), value))
+
+class _Blob:
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets: Dict[bytes, int] = {}
+
+    def add(self, value: bytes) -> int:
+        offset = self.offsets.get(value)
+        if offset is None:
+            offset = self.offsets[value] = len(self.data)
+            self.data += value
+        return offset
+
+def build_index(records: Iterator[DomainRecord], path: str) -> int:
+    """
+    Write the index file for a set of institutions, replacing any file at path atomically.
+
+    Returns:
+        Number of institutions indexed
+    """
+    entries: List[Tuple[str, List[str]]] = []
+    rows: List[Tuple[int, List[str]]] = []
+    names: Dict[bytes, int] = {}
+    for record in records:
+        entry = len(entries)
+        entries.append((record.name, [_bare_host(domain) for domain in record.domains]))
+        for name in [record.name] + record.aliases:
+            tokens = list(dict.fromkeys(normalize_tokens(name)))
+            key = ' '.join(tokens).encode('utf-8')
+            if tokens and key not in names:
+                names[key] = len(rows)
+                rows.append((entry, tokens))
+
+    vocabulary: Dict[str, int] = {}
+    postings: List[List[int]] = []
+    entry_sets: List[set] = []
+    for row, (entry, tokens) in enumerate(rows):
+        for token in tokens:
+            token_id = vocabulary.setdefault(token, len(vocabulary))
+            if token_id == len(postings):
+                postings.append([])
+                entry_sets.append(set())
+            postings[token_id].append(row)
+            entry_sets[token_id].add(entry)
+    # Inverse document frequency over institutions, so aliases don't make a token look common
+    weights = array('f', (math.log(1 + len(entries) / len(entry_set)) for entry_set in entry_sets))
+
+    trigrams: Dict[str, int] = {}
+    trigram_tokens: List[List[int]] = []
+    for token, token_id in vocabulary.items():
+        for trigram in dict.fromkeys(_trigrams(token)):
+            trigram_id = trigrams.setdefault(trigram, len(trigrams))
+            if trigram_id == len(trigram_tokens):
+                trigram_tokens.append([])
+            trigram_tokens[trigram_id].append(token_id)
+
+    blob = _Blob()
+    sections: Dict[str, array] = {name: array('I') for name in _SECTIONS if name not in ('blob', 'token_weights')}
+    for name, domains in entries:
+        encoded = name.encode('utf-8')
+        sections['entry_names'].extend((blob.add(encoded), len(encoded)))
+        joined = '\n'.join(domains).encode('utf-8')
+        sections['entry_domains'].extend((blob.add(joined), len(joined)))
+    for entry, tokens in rows:
+        sections['row_entries'].append(entry)
+        sections['row_tokens'].extend((len(sections['row_token_ids']), len(tokens)))
+        sections['row_token_ids'].extend(vocabulary[token] for token in tokens)
+    for token, token_id in vocabulary.items():
+        encoded = token.encode('utf-8')
+        sections['token_names'].extend((blob.add(encoded), len(encoded)))
+        sections['token_postings'].extend((len(sections['postings']), len(postings[token_id])))
+        sections['postings'].extend(postings[token_id])
+    for token_ids in trigram_tokens:
+        sections['trigram_postings'].extend((len(sections['trigram_tokens']), len(token_ids)))
+        sections['trigram_tokens'].extend(token_ids)
+
+    def table(keys: Dict[bytes, int]) -> array:
+        for key in keys:
+            blob.add(key)
+        return _HashTable(keys, blob.offsets).words
+
+    sections['name_table'] = table(names)
+    sections['token_table'] = table({token.encode('utf-8'): token_id for token, token_id in vocabulary.items()})
+    sections['trigram_table'] = table({trigram.encode('utf-8'): trigram_id for trigram, trigram_id in trigrams.items()})
+    domain_owners: Dict[bytes, int] = {}
+    for entry, (_, domains) in enumerate(entries):
+        for domain in domains:
+            domain_owners.setdefault(domain.encode('utf-8'), entry)
+    sections['domain_table'] = table(domain_owners)
+
+    payloads = []
+    for name in _SECTIONS:
+        if name == 'blob':
+            data = bytes(blob.data)
+        elif name == 'token_weights':
+            data = _little_endian(weights)
+        else:
+            data = _little_endian(sections[name])
+        payloads.append(data)
+
+    offset = _HEADER.size + _SECTION.size * len(_SECTIONS)
+    layout = []
+    for data in payloads:
+        offset += -offset % 8
+        layout.append((offset, len(data)))
+        offset += len(data)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.domains-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(entries), len(rows), len(vocabulary)))
+            for section_offset, length in layout:
+                f.write(_SECTION.pack(section_offset, length))
+            for (section_offset, _), data in zip(layout, payloads):
+                f.write(b'\0' * (section_offset - f.tell()))
+                f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return len(entries)
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+class DomainIndex:
+    """
+    Read-only institution name to domain index, memory-mapped from a file built by build_index.
+
+    Every process that opens the same file shares its pages through the OS page cache.
+    A name is looked up by its normalized form first; otherwise candidates sharing
+    its rarer tokens (typos corrected through a trigram index over the vocabulary)
+    are ranked by how much of their name, weighted by token rarity, the query covers,
+    scaled down by how many of the shared words come in a different order
+    ('Washington University' is not 'University of Washington').
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.entry_count, self.row_count, self.token_count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} domain index")
+        view = memoryview(self._mmap)
+        self._views = []
+        for i, name in enumerate(_SECTIONS):
+            offset, length = _SECTION.unpack_from(self._mmap, _HEADER.size + i * _SECTION.size)
+            section = view[offset:offset + length]
+            if name == 'blob':
+                self._blob_offset = offset
+                continue
+            typecode = 'f' if name == 'token_weights' else 'I'
+            if sys.byteorder == 'big':
+                section = memoryview(array(typecode, _swapped(typecode, section)))
+            else:
+                section = section.cast(typecode)
+            self._views.append(section)
+            setattr(self, '_' + name, section)
+        self._views.append(view)
+        self._common_postings = max(64, self.row_count // COMMON_TOKEN_SHARE)
+        self._rare_weight = math.log(1 + self.entry_count)
+
+    def __len__(self) -> int:
+        return self.entry_count
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        self._mmap.close()
+
+    def _key(self, offset: int, length: int) -> bytes:
+        start = self._blob_offset + offset
+        return self._mmap[start:start + length]
+
+    def _find(self, table: memoryview, key: bytes) -> Optional[int]:
+        mask = table[0] - 1
+        slot = zlib.crc32(key) & mask
+        while True:
+            base = 1 + 3 * slot
+            length = table[base + 1]
+            if not length:
+                return None
+            if length == len(key) and self._key(table[base], length) == key:
+                return table[base + 2]
+            slot = (slot + 1) & mask
+
+    def _entry(self, entry: int, score: float) -> DomainMatch:
+        domains = self._key(self._entry_domains[2 * entry], self._entry_domains[2 * entry + 1])
+        return DomainMatch(
+            name=self._key(self._entry_names[2 * entry], self._entry_names[2 * entry + 1]).decode('utf-8'),
+            domains=domains.decode('utf-8').split('\n') if domains else [],
+            score=score
+        )
+
+    def _closest_token(self, token: str) -> Tuple[Optional[int], float]:
+        """Vocabulary token most similar to a misspelled one (trigram Dice coefficient)"""
+        if len(token) < 3:
+            return None, 0.0
+        trigrams = set(_trigrams(token))
+        counts: Counter = Counter()
+        for trigram in trigrams:
+            trigram_id = self._find(self._trigram_table, trigram.encode('utf-8'))
+            if trigram_id is not None:
+                start, length = self._trigram_postings[2 * trigram_id], self._trigram_postings[2 * trigram_id + 1]
+                counts.update(self._trigram_tokens[start:start + length])
+        # Fewer shared trigrams than this cannot reach the similarity threshold whatever the token's length
+        shared = math.ceil(MIN_TYPO_SIMILARITY * len(trigrams) / (2 - MIN_TYPO_SIMILARITY) - 1e-9)
+        best, best_similarity = None, 0.0
+        for token_id in [token_id for token_id, count in counts.items() if count >= shared]:
+            candidate = self._key(self._token_names[2 * token_id], self._token_names[2 * token_id + 1]).decode('utf-8')
+            candidate_trigrams = set(_trigrams(candidate))
+            similarity = 2 * len(trigrams & candidate_trigrams) / (len(trigrams) + len(candidate_trigrams))
+            if similarity > best_similarity:
+                best, best_similarity = token_id, similarity
+        if best_similarity < MIN_TYPO_SIMILARITY:
+            return None, 0.0
+        return best, best_similarity
+
+    def lookup(self, name: str, min_score: float = DEFAULT_MIN_SCORE) -> Optional[DomainMatch]:
+        """
+        Find the institution a (possibly abbreviated or misspelled) name refers to.
+
+        Args:
+            name: Institution name as a user would type it
+            min_score: Lowest match score (0-1) accepted; exact normalized matches score 1
+
+        Returns:
+            DomainMatch with the official name and domains, or None if nothing matched well enough
+        """
+        tokens = list(dict.fromkeys(normalize_tokens(name)))
+        if not tokens:
+            return None
+        row = self._find(self._name_table, ' '.join(tokens).encode('utf-8'))
+        if row is not None:
+            return self._entry(self._row_entries[row], 1.0)
+
+        # Resolve query tokens to vocabulary tokens, with their similarity to what was typed
+        query: Dict[int, float] = {}
+        sequence: List[int] = []
+        query_weight = 0.0
+        for token in tokens:
+            token_id = self._find(self._token_table, token.encode('utf-8'))
+            similarity = 1.0
+            if token_id is None:
+                token_id, similarity = self._closest_token(token)
+            if token_id is None:
+                # Unknown words count as rare: a query that is mostly unknown matches nothing well
+                query_weight += self._rare_weight
+                continue
+            if token_id not in query:
+                sequence.append(token_id)
+            if similarity > query.get(token_id, 0.0):
+                query[token_id] = similarity
+        query_weight += sum(self._token_weights[token_id] for token_id in query)
+        if not query:
+            return None
+
+        rare = [
+            token_id for token_id in query
+            if self._token_postings[2 * token_id + 1] <= self._common_postings
+        ] or list(query)
+        candidates: Dict[int, float] = {}
+        for token_id in rare:
+            weight = self._token_weights[token_id] * query[token_id]
+            start, length = self._token_postings[2 * token_id], self._token_postings[2 * token_id + 1]
+            for row in self._postings[start:start + length]:
+                candidates[row] = candidates.get(row, 0.0) + weight
+
+        best_row, best_score = None, 0.0
+        for row in sorted(candidates, key=candidates.__getitem__, reverse=True)[:MAX_CANDIDATES]:
+            start, length = self._row_tokens[2 * row], self._row_tokens[2 * row + 1]
+            row_tokens = self._row_token_ids[start:start + length]
+            row_weight = matched = 0.0
+            for token_id in row_tokens:
+                weight = self._token_weights[token_id]
+                row_weight += weight
+                matched += weight * query.get(token_id, 0.0)
+            # Mostly how much of the candidate's name the query covers, then how much of the query is explained
+            score = 0.75 * matched / row_weight + 0.25 * matched / query_weight
+            shared = [token_id for token_id in row_tokens if token_id in query]
+            if len(shared) > 1:
+                score *= _in_order([token_id for token_id in sequence if token_id in shared], shared) / len(shared)
+            if score > best_score:
+                best_row, best_score = row, score
+        if best_row is None or best_score < min_score:
+            return None
+        return self._entry(self._row_entries[best_row], round(best_score, 3))
+
+    def owner(self, host: str) -> Optional[DomainMatch]:
+        """Institution whose domain is host or one of its parent domains"""
+        host = _bare_host(host.partition(':')[0])
+        while host:
+            entry = self._find(self._domain_table, host.encode('utf-8'))
+            if entry is not None:
+                return self._entry(entry, 1.0)
+            host = host.partition('.')[2]
+        return None
+
+def _in_order(first: List[int], second: List[int]) -> int:
+    """Length of the longest common subsequence of two short token sequences"""
+    lengths = [0] * (len(second) + 1)
+    for token in first:
+        previous = 0
+        for i, other in enumerate(second):
+            current = lengths[i + 1]
+            lengths[i + 1] = previous + 1 if token == other else max(lengths[i + 1], lengths[i])
+            previous = current
+    return lengths[-1]
+
+def _swapped(typecode: str, section: memoryview) -> array:
+    values = array(typecode, section.tobytes())
+    values.byteswap()
+    return values
+
+_domain_index: Optional[DomainIndex] = None
+_domain_index_loaded = False
+
+def get_domain_index() -> Optional[DomainIndex]:
+    """
+    Return the process-wide domain index, or None if there is none.
+
+    CATALOG_DOMAIN_INDEX_PATH names a prebuilt index. Otherwise the index is built
+    from CATALOG_DOMAIN_SOURCE_PATH (default: the bundled university_domains.json)
+    into the cache directory on first use, and rebuilt when the source changes.
+    """
+    global _domain_index, _domain_index_loaded
+    if not _domain_index_loaded:
+        _domain_index_loaded = True
+        path = os.getenv('CATALOG_DOMAIN_INDEX_PATH')
+        if not path:
+            source = os.getenv('CATALOG_DOMAIN_SOURCE_PATH', DEFAULT_SOURCE_PATH)
+            path = default_cache_path('domains.idx')
+            try:
+                if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(source):
+                    build_index(load_records(source), path)
+            except OSError:
+                return None
+        try:
+            _domain_index = DomainIndex(path)
+        except (OSError, ValueError):
+            _domain_index = None
+    return _domain_index
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='build an index file from a source dataset')
+    build.add_argument('source', help='JSON, JSON lines or CSV file of institutions')
+    build.add_argument('-o', '--output', default=default_cache_path('domains.idx'))
+    lookup = commands.add_parser('lookup', help='look up institution names')
+    lookup.add_argument('names', nargs='+')
+    lookup.add_argument('--index', help='index file (default: as get_domain_index)')
+    lookup.add_argument('--min-score', type=float, default=DEFAULT_MIN_SCORE)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        count = build_index(load_records(args.source), args.output)
+        print(f"Indexed {count} institutions into {args.output} ({os.path.getsize(args.output)} bytes)")
+        return 0
+    index = DomainIndex(args.index) if args.index else get_domain_index()
+    if index is None:
+        print("No domain index available", file=sys.stderr)
+        return 1
+    for name in args.names:
+        match = index.lookup(name, args.min_score)
+        print(f"{name!r}: " + (f"{match.name} {', '.join(match.domains)} (score {match.score})" if match else 'no match'))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Tests for institution name lookups in the domain index built from the bundled seed.
+
+    python -m pytest catalog_domains_test.py
+"""
+import pytest
+
+from catalog_domains import DEFAULT_SOURCE_PATH, DomainIndex, build_index, load_records
+
+@pytest.fixture(scope='module')
+def index(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('domains') / 'domains.idx')
+    build_index(load_records(DEFAULT_SOURCE_PATH), path)
+    index = DomainIndex(path)
+    yield index
+    index.close()
+
+@pytest.mark.parametrize('query, name', [
+    ('University of Washington', 'University of Washington'),
+    ('Univ. of Washington', 'University of Washington'),
+    ('Washington University in St. Louis', 'Washington University in St. Louis'),
+    ('Washington Univ in St Louis', 'Washington University in St. Louis'),
+    ('University of Miami', 'University of Miami'),
+    ('UC Berkeley', 'University of California, Berkeley'),
+    ('University of California Berkeley Main Campus', 'University of California, Berkeley'),
+    ('Massachusetts Inst. of Tech.', 'Massachusetts Institute of Technology'),
+    ('Ohio St', 'Ohio State University'),
+])
+def test_lookup_resolves_name_variants(index, query, name):
+    match = index.lookup(query)
+    assert match is not None and match.name == name
+
+@pytest.mark.parametrize('query', [
+    # Same words as another institution's name, in another order: a different university
+    'Washington University',
+    'Miami University',
+    'Miami University of Ohio',
+    'State University of Ohio',
+])
+def test_lookup_does_not_ignore_word_order(index, query):
+    assert index.lookup(query) is None
+
+def test_owner_walks_parent_domains(index):
+    assert index.owner('www.cs.washington.edu').name == 'University of Washington'
+    assert index.owner('catalog.wustl.edu').name == 'Washington University in St. Louis'
+    assert index.owner('example.com') is None
@@ -0,0 +1,295 @@
+import re
+from html.parser import HTMLParser
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+class CourseRecord(BaseModel):
+    code: str
+    title: str
+    credits: Optional[str] = None
+    description: str = ''
+    prerequisites: Optional[str] = None
+
+# Elements that never get a closing tag, so they are not pushed on the open-element stack
+_VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'
+])
+# Elements whose boundaries separate words; text either side of other tags is run together
+_BLOCK_ELEMENTS = frozenset([
+    'br', 'p', 'div', 'li', 'ul', 'ol', 'td', 'th', 'tr', 'table', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'dd', 'dt'
+])
+
+# Start tags that close an open element whose end tag was left out, as HTML allows:
+# tag -> (elements it closes, elements it never closes past)
+_IMPLIED_ENDS = {
+    'li': (frozenset(['li']), frozenset(['ul', 'ol', 'table'])),
+    'dt': (frozenset(['dt', 'dd']), frozenset(['dl', 'table'])),
+    'dd': (frozenset(['dt', 'dd']), frozenset(['dl', 'table'])),
+}
+# Start tags that close an open paragraph, and the elements a paragraph never closes past
+_PARAGRAPH_CLOSERS = frozenset([
+    'p', 'div', 'ul', 'ol', 'dl', 'li', 'dt', 'dd', 'table', 'pre', 'blockquote', 'section', 'article',
+    'header', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr'
+])
+_PARAGRAPH = frozenset(['p'])
+_PARAGRAPH_SCOPE = frozenset(['div', 'li', 'dt', 'dd', 'td', 'th', 'table', 'blockquote', 'section', 'article', 'button'])
+
+# Class names of the parts of a course block, as used by courseleaf and common variants
+_FIELD_CLASSES = {
+    'courseblocktitle': 'heading',
+    'detail-code': 'code',
+    'code': 'code',
+    'detail-title': 'title',
+    'title': 'title',
+    'detail-hours_html': 'credits',
+    'detail-hours': 'credits',
+    'detail-credits': 'credits',
+    'hours': 'credits',
+    'credits': 'credits',
+}
+
+_CODE = re.compile(r'^(?P<code>[A-Z][A-Z&]{1,9}\s?-?\s?\d{1,4}[A-Z]{0,3})\b[\s.:\-–—]*(?P<rest>.*)$')
+# Subject-less dotted numbers ('6.006', '18.06', '6.S191', '21M.301'), as MIT numbers
+# its courses. Only tried on the heading of a recognized course block, and never when
+# what follows is a credit unit ('4.00 Credits')
+_NUMBERED_CODE = re.compile(
+    r'^(?P<code>\d{1,2}[A-Z]{0,2}\.(?:\d{2,4}[A-Z]?|[A-Z]{1,3}\d{0,3}))\b'
+    r'(?!\s*(?:credits?|units?|hours?|cr)\b)[\s.:\-–—]*(?P<rest>.*)$',
+    re.IGNORECASE
+)
+_CREDIT_AMOUNT = r'\d+(?:\.\d+)?(?:\s*(?:-|–|to|or)\s*\d+(?:\.\d+)?)?'
+_CREDITS_IN_TITLE = re.compile(
+    r'[\s.(]*\b(?P<amount>' + _CREDIT_AMOUNT + r')\s*'
+    r'(?:credit hours?|semester hours?|units?|credits?|hours?|cr\.?)\)?\.?\s*$',
+    re.IGNORECASE
+)
+_CREDITS_LABEL = re.compile(
+    r'\bcredits?(?:\s*hours?)?\s*:\s*(?P<amount>' + _CREDIT_AMOUNT + r')\.?',
+    re.IGNORECASE
+)
+_CREDIT_NUMBER = re.compile(_CREDIT_AMOUNT)
+_PREREQUISITES = re.compile(
+    r'\b(?:prerequisites?|prereqs?|pre-requisites?)\s*(?:\(s\))?\s*:\s*'
+    r'(?P<text>.+?)\s*(?=\.\s+[A-Z]|\b(?:corequisites?|co-requisites?|restrictions?|notes?)\s*:|$)',
+    re.IGNORECASE
+)
+
+def _collapse(text: str) -> str:
+    return ' '.join(text.split())
+
+def _match_code(text: str) -> Optional[re.Match]:
+    return _CODE.match(text) or _NUMBERED_CODE.match(text)
+
+def build_course_record(fields: Dict[str, str]) -> Optional[CourseRecord]:
+    """
+    Turn the text collected from one course block into a CourseRecord.
+
+    Args:
+        fields: Text by field name: 'heading' ('CS 101. Intro. 3 Units.'), 'code',
+            'title', 'credits' and 'body' (description and any extra lines)
+
+    Returns:
+        The record, or None if no course code can be found
+    """
+    heading = _collapse(fields.get('heading', ''))
+    code = _collapse(fields.get('code', ''))
+    title = _collapse(fields.get('title', ''))
+    if not code:
+        match = _match_code(heading) or _match_code(title)
+        if match is None:
+            return None
+        code = match.group('code')
+        if not title or match.string == title:
+            title = match.group('rest')
+
+    credits = None
+    credit_text = _collapse(fields.get('credits', ''))
+    if credit_text:
+        match = _CREDIT_NUMBER.search(credit_text)
+        credits = match.group(0) if match else credit_text
+    match = _CREDITS_IN_TITLE.search(title)
+    if match is not None:
+        credits = credits or match.group('amount')
+        title = title[:match.start()]
+
+    description = _collapse(fields.get('body', ''))
+    if credits is None:
+        match = _CREDITS_LABEL.search(description)
+        if match is not None:
+            credits = match.group('amount')
+            description = description[:match.start()] + description[match.end():]
+
+    prerequisites = None
+    match = _PREREQUISITES.search(description)
+    if match is not None:
+        prerequisites = match.group('text').rstrip('.')
+        description = description[:match.start()] + description[match.end():].lstrip('.')
+
+    return CourseRecord(
+        code=code,
+        title=title.strip(' .:-–—'),
+        credits=credits,
+        description=_collapse(description),
+        prerequisites=prerequisites
+    )
+
+class _Record:
+    def __init__(self, depth: int, heading_tag: Optional[str]):
+        # The record ends when the open-element stack drops below this depth
+        self.depth = depth
+        # Tag whose first occurrence holds the heading (acalog 'CODE - Title' links)
+        self.heading_tag = heading_tag
+        self.fields: Dict[str, List[str]] = {}
+        # (depth, field) for the classed elements currently open inside the record
+        self.field_stack: List[Tuple[int, str]] = []
+
+    def field(self) -> str:
+        return self.field_stack[-1][1] if self.field_stack else 'body'
+
+    def add(self, field: str, text: str) -> None:
+        self.fields.setdefault(field, []).append(text)
+
+    def text_fields(self) -> Dict[str, str]:
+        return {field: ''.join(parts) for field, parts in self.fields.items()}
+
+class CourseExtractor(HTMLParser):
+    """
+    Incremental course extractor for catalog HTML.
+
+    Recognizes courseleaf course blocks (div.courseblock inside #coursestext and
+    similar containers), acalog course listings (li.acalog-course and links to
+    preview_course pages) and acalog course preview pages (h1#course_preview_title).
+    Only the text of the course block being parsed is kept, so memory does not grow
+    with the page. feed() returns the records completed by each chunk.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._stack: List[str] = []
+        self._record: Optional[_Record] = None
+        self._completed: List[CourseRecord] = []
+
+    def _start_record(self, depth: int, heading_tag: Optional[str] = None) -> None:
+        self._record = _Record(depth, heading_tag)
+
+    def _finish_record(self) -> None:
+        record, self._record = self._record, None
+        course = build_course_record(record.text_fields())
+        if course is not None:
+            self._completed.append(course)
+
+    def _close_open(self, tags: frozenset, scope: frozenset) -> None:
+        """Close the innermost open element among tags, unless an element in scope is open inside it"""
+        for open_tag in reversed(self._stack):
+            if open_tag in tags:
+                self.handle_endtag(open_tag)
+                return
+            if open_tag in scope:
+                return
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attributes = dict(attrs)
+        classes = (attributes.get('class') or '').split()
+        if tag in _PARAGRAPH_CLOSERS:
+            self._close_open(_PARAGRAPH, _PARAGRAPH_SCOPE)
+        if tag in _IMPLIED_ENDS:
+            self._close_open(*_IMPLIED_ENDS[tag])
+        record = self._record
+        if record is not None and ('courseblock' in classes or (tag == 'li' and 'acalog-course' in classes)):
+            # The previous course block was left unclosed; a new one starts here
+            self._finish_record()
+            record = None
+        if record is not None and tag in _BLOCK_ELEMENTS:
+            record.add(record.field(), '\n')
+        if tag in _VOID_ELEMENTS:
+            return
+        self._stack.append(tag)
+        depth = len(self._stack)
+
+        if record is None:
+            if 'courseblock' in classes:
+                self._start_record(depth)
+            elif tag == 'li' and 'acalog-course' in classes:
+                self._start_record(depth, heading_tag='a')
+            elif tag == 'h1' and attributes.get('id') == 'course_preview_title':
+                # The preview's credits and description follow the heading inside its parent
+                self._start_record(depth - 1)
+                self._record.field_stack.append((depth, 'heading'))
+            elif tag == 'a' and 'preview_course' in (attributes.get('href') or ''):
+                self._start_record(depth)
+                self._record.field_stack.append((depth, 'heading'))
+            return
+
+        if tag == record.heading_tag and 'heading' not in record.fields:
+            record.field_stack.append((depth, 'heading'))
+            return
+        for name in classes:
+            field = _FIELD_CLASSES.get(name)
+            if field is not None:
+                record.field_stack.append((depth, field))
+                break
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if self._record is not None and tag in _BLOCK_ELEMENTS:
+            self._record.add(self._record.field(), '\n')
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag not in self._stack:
+            # Stray closing tag; there is nothing open for it to close
+            return
+        # Closing an element also closes anything left open inside it
+        while self._stack.pop() != tag:
+            pass
+        record = self._record
+        if record is None:
+            return
+        depth = len(self._stack)
+        while record.field_stack and record.field_stack[-1][0] > depth:
+            record.field_stack.pop()
+        if tag in _BLOCK_ELEMENTS:
+            record.add(record.field(), '\n')
+        if depth < record.depth:
+            self._finish_record()
+
+    def handle_data(self, data: str) -> None:
+        if self._record is not None:
+            self._record.add(self._record.field(), data)
+
+    def feed(self, data: str) -> List[CourseRecord]:
+        """Parse the next chunk of HTML and return the course records it completed"""
+        super().feed(data)
+        completed, self._completed = self._completed, []
+        return completed
+
+    def close(self) -> List[CourseRecord]:
+        """Flush the parser and return the remaining records, including an unterminated last block"""
+        super().close()
+        if self._record is not None:
+            self._finish_record()
+        completed, self._completed = self._completed, []
+        return completed
+
+def iter_courses(chunks: Iterable[str]) -> Iterator[CourseRecord]:
+    """
+    Extract course records from HTML delivered in chunks.
+
+    Args:
+        chunks: Decoded HTML text, e.g. from a streaming response
+
+    Returns:
+        Generator of CourseRecord in page order
+    """
+    extractor = CourseExtractor()
+    for chunk in chunks:
+        yield from extractor.feed(chunk)
+    yield from extractor.close()
+
+async def aiter_courses(chunks: AsyncIterable[str]) -> AsyncIterator[CourseRecord]:
+    """Async form of iter_courses for text decoded from an async stream"""
+    extractor = CourseExtractor()
+    async for chunk in chunks:
+        for course in extractor.feed(chunk):
+            yield course
+    for course in extractor.close():
+        yield course
@@ -0,0 +1,78 @@
+"""
+Tests for course record extraction from catalog HTML.
+
+    python -m pytest catalog_extract_test.py
+"""
+import pytest
+
+from catalog_extract import build_course_record, iter_courses
+
+@pytest.mark.parametrize('heading, code, title', [
+    ('CS 101. Intro to Programming. 3 Units.', 'CS 101', 'Intro to Programming'),
+    ('COMP 110 - Introduction to Programming', 'COMP 110', 'Introduction to Programming'),
+    ('6.006 Introduction to Algorithms. 12 Units.', '6.006', 'Introduction to Algorithms'),
+    ('18.06 Linear Algebra', '18.06', 'Linear Algebra'),
+    ('6.S191 Introduction to Deep Learning', '6.S191', 'Introduction to Deep Learning'),
+    ('21M.301 Harmony and Counterpoint I', '21M.301', 'Harmony and Counterpoint I'),
+])
+def test_course_codes_in_headings(heading, code, title):
+    record = build_course_record({'heading': heading})
+    assert (record.code, record.title) == (code, title)
+
+@pytest.mark.parametrize('heading', ['4.00 Credits', '3.0 Units', 'Introduction to Algorithms', '2024 Catalog'])
+def test_headings_without_a_course_code(heading):
+    assert build_course_record({'heading': heading}) is None
+
+def test_mit_course_block():
+    html = (
+        '<div id="coursestext"><div class="courseblock">'
+        '<p class="courseblocktitle"><strong>6.006 Introduction to Algorithms. 12 Units.</strong></p>'
+        '<p class="courseblockdesc">Prerequisite: 6.1200. Sorting, searching and graphs.</p>'
+        '</div></div>'
+    )
+    [record] = iter_courses([html])
+    assert record.code == '6.006'
+    assert record.credits == '12'
+    assert record.prerequisites == '6.1200'
+
+def test_dotted_numbers_outside_course_blocks_are_ignored():
+    html = '<p>6.006 Introduction to Algorithms</p><h3>18.06 Linear Algebra</h3>'
+    assert list(iter_courses([html])) == []
+
+def test_acalog_items_without_end_tags():
+    html = (
+        '<ul><li class="acalog-course"><a href="preview_course.php?coid=1">CS 201 - Data Structures</a>'
+        '<p>Lists, trees and graphs.'
+        '<li class="acalog-course"><a href="preview_course.php?coid=2">CS 202 - Algorithms</a>'
+        '<p>Sorting and searching.</ul>'
+    )
+    records = list(iter_courses([html]))
+    assert [(record.code, record.title) for record in records] == [
+        ('CS 201', 'Data Structures'), ('CS 202', 'Algorithms')
+    ]
+    assert records[0].description == 'Lists, trees and graphs.'
+
+def test_course_block_paragraphs_without_end_tags():
+    html = (
+        '<div id="coursestext"><div class="courseblock">'
+        '<p class="courseblocktitle"><strong>CS 161. Design and Analysis of Algorithms. 5 Units.</strong>'
+        '<p class="courseblockdesc">Worst and average case analysis. Prerequisite: CS 106B.'
+        '<div class="courseblock"><p class="courseblocktitle">CS 166. Data Structures. 3 Units.'
+        '<p class="courseblockdesc">Balanced trees.'
+        '</div></div>'
+    )
+    first, second = iter_courses([html])
+    assert (first.code, first.title, first.credits) == ('CS 161', 'Design and Analysis of Algorithms', '5')
+    assert first.description == 'Worst and average case analysis.'
+    assert first.prerequisites == 'CS 106B'
+    assert (second.code, second.title, second.description) == ('CS 166', 'Data Structures', 'Balanced trees.')
+
+def test_definition_list_terms_without_end_tags():
+    html = (
+        '<dl><dt class="courseblock"><span class="code">MATH 51</span><span class="title">Linear Algebra</span>'
+        '<dd>Matrices.<dt class="courseblock"><span class="code">MATH 52</span>'
+        '<span class="title">Integral Calculus</span></dl>'
+    )
+    assert [(record.code, record.title, record.description) for record in iter_courses([html])] == [
+        ('MATH 51', 'Linear Algebra', ''), ('MATH 52', 'Integral Calculus', '')
+    ]
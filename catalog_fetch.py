@@ -0,0 +1,640 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import httpx
+import requests
+from pydantic import BaseModel
+
+from catalog_metrics import metrics
+
+USER_AGENT = "CatalogVerifier/1.0 (+https://github.com/pleyva2004/BofA-Code-A-Thon)"
+DEFAULT_TIMEOUT = 10.0
+ROBOTS_TIMEOUT = 5.0
+RETRYABLE_ASYNC_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+RETRYABLE_SYNC_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+# Rate limiting and gateway errors that usually clear up on their own
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+LATENCY_WINDOW = 64
+MIN_LATENCY_SAMPLES = 8
+
+class HostPolicy(BaseModel):
+    """Politeness limits and failure handling applied to every request sent to one host"""
+    requests_per_second: float = 2.0
+    burst: int = 4
+    max_concurrency: int = 4
+    respect_robots: bool = True
+    # Attempts per request, with full-jitter exponential backoff between them
+    max_attempts: int = 3
+    backoff_base: float = 0.25
+    backoff_max: float = 4.0
+    # Once the host has enough samples, time out at this multiple of its p95 latency
+    timeout_multiplier: float = 4.0
+    min_timeout: float = 1.0
+    # Consecutive failures that open the host's circuit, and how long it stays open (0 disables)
+    breaker_threshold: int = 5
+    breaker_cooldown: float = 30.0
+    # Async only: send a second request if the first has not answered within the host's p95
+    hedge: bool = False
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a host that keeps failing"""
+
+class TokenBucket:
+    """Thread-safe token bucket that hands out reservations instead of blocking"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return how many seconds the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+class LatencyTracker:
+    """Thread-safe window of a host's most recent response times"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Nearest-rank quantile of the window, or None until there are enough samples to trust it"""
+        with self._lock:
+            if len(self._samples) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a host after `threshold` consecutive failures.
+
+    Once open, requests fail fast for `cooldown` seconds; after that a single probe
+    request is let through, and its outcome closes the circuit or opens it for another
+    cooldown. A probe that never reports back is replaced after the next cooldown.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.cooldown:
+                return False
+            # Half-open: this caller is the probe, everyone else waits another cooldown
+            self._opened_at = now
+            return True
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self._opened_at + self.cooldown - time.monotonic())
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.threshold > 0 and self.failures >= self.threshold:
+                if self._opened_at is None:
+                    metrics.increment('circuit_opened_total')
+                self._opened_at = time.monotonic()
+
+def _backoff(policy: HostPolicy, attempt: int, retry_after: Optional[str] = None) -> float:
+    """Seconds to wait before retry number `attempt` (0-based), honoring a numeric Retry-After"""
+    delay = random.uniform(0, min(policy.backoff_max, policy.backoff_base * 2 ** attempt))
+    if retry_after and retry_after.strip().isdigit():
+        delay = max(delay, min(float(retry_after), policy.backoff_max))
+    return delay
+
+def _parse_crawl_delay(robots_txt: str) -> Optional[float]:
+    parser = RobotFileParser()
+    parser.parse(robots_txt.splitlines())
+    delay = parser.crawl_delay(USER_AGENT)
+    if delay is None:
+        delay = parser.crawl_delay("*")
+    return float(delay) if delay is not None else None
+
+class HostScheduler:
+    """
+    Per-host politeness state shared by the sync and async fetch paths.
+
+    Token buckets and robots.txt crawl delays live here so every event loop and
+    thread in the process draws from the same per-host budget, as do the latency
+    windows and circuit breakers, so what one path learns about a host the other uses.
+    """
+
+    def __init__(
+        self,
+        default_policy: Optional[HostPolicy] = None,
+        host_policies: Optional[Dict[str, HostPolicy]] = None
+    ):
+        self.default_policy = default_policy or HostPolicy()
+        self.host_policies = {host.lower(): policy for host, policy in (host_policies or {}).items()}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._crawl_delays: Dict[str, Optional[float]] = {}
+        self._sessions: Dict[str, requests.Session] = {}
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._robots_locks: Dict[str, threading.Lock] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def policy(self, host: str) -> HostPolicy:
+        """Find the policy for a host, falling back through its parent domains"""
+        labels = host.split(':')[0].split('.')
+        for i in range(len(labels)):
+            policy = self.host_policies.get('.'.join(labels[i:]))
+            if policy is not None:
+                return policy
+        return self.default_policy
+
+    def has_crawl_delay(self, host: str) -> bool:
+        return host in self._crawl_delays
+
+    def set_crawl_delay(self, host: str, delay: Optional[float]) -> None:
+        with self._lock:
+            self._crawl_delays[host] = delay
+            # Rebuild the bucket so it picks up the crawl delay
+            self._buckets.pop(host, None)
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                policy = self.policy(host)
+                rate, capacity = policy.requests_per_second, policy.burst
+                delay = self._crawl_delays.get(host)
+                if delay:
+                    rate, capacity = min(rate, 1.0 / delay), 1
+                bucket = self._buckets[host] = TokenBucket(rate, capacity)
+            return bucket
+
+    def session(self, host: str) -> requests.Session:
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                policy = self.policy(host)
+                session = requests.Session()
+                session.headers['User-Agent'] = USER_AGENT
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=policy.max_concurrency
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+                self._slots[host] = threading.BoundedSemaphore(policy.max_concurrency)
+                self._robots_locks[host] = threading.Lock()
+            return session
+
+    def slot(self, host: str) -> threading.BoundedSemaphore:
+        self.session(host)
+        return self._slots[host]
+
+    def robots_lock(self, host: str) -> threading.Lock:
+        """Held while a thread fetches the host's robots.txt, so other threads wait for it"""
+        self.session(host)
+        return self._robots_locks[host]
+
+    def latency(self, host: str) -> LatencyTracker:
+        with self._lock:
+            tracker = self._latencies.get(host)
+            if tracker is None:
+                tracker = self._latencies[host] = LatencyTracker()
+            return tracker
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                policy = self.policy(host)
+                breaker = self._breakers[host] = CircuitBreaker(policy.breaker_threshold, policy.breaker_cooldown)
+            return breaker
+
+    def timeout(self, host: str, max_timeout: float, attempt: int = 0) -> float:
+        """
+        Timeout for an attempt: a multiple of the host's p95 latency, doubled on every retry.
+
+        Hosts without enough history get max_timeout, which also caps the result.
+        """
+        p95 = self.latency(host).quantile(0.95)
+        if p95 is None:
+            return max_timeout
+        policy = self.policy(host)
+        timeout = max(policy.min_timeout, policy.timeout_multiplier * p95) * 2 ** attempt
+        return min(max_timeout, timeout)
+
+    def check_circuit(self, host: str) -> None:
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            metrics.increment('circuit_rejected_total')
+            raise CircuitOpenError(
+                f"{host} failed {breaker.failures} times in a row; "
+                f"not retrying for another {breaker.retry_in():.0f}s"
+            )
+
+async def _close_shielded(response: httpx.Response) -> None:
+    # A cancellation landing mid-close would leave the connection checked out of the pool for good
+    await asyncio.shield(response.aclose())
+
+def _release_abandoned(send: asyncio.Future) -> None:
+    if not send.cancelled() and send.exception() is None:
+        asyncio.ensure_future(send.result().aclose())
+
+class _AsyncHost:
+    def __init__(self, client: httpx.AsyncClient, max_concurrency: int):
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.robots_task: Optional[asyncio.Task] = None
+
+class CatalogFetcher:
+    """
+    Async fetcher with one keep-alive connection pool per host.
+
+    Each request waits for a per-host concurrency slot and a token from the host's
+    bucket, so many hosts can be fetched in parallel while each one sees bounded load.
+    Clients are bound to the event loop they were created on; use get_fetcher().
+    """
+
+    def __init__(
+        self,
+        scheduler: Optional["HostScheduler"] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_hosts: int = 256
+    ):
+        self.scheduler = scheduler or default_scheduler
+        self.timeout = timeout
+        self.max_hosts = max_hosts
+        self._hosts: "OrderedDict[str, _AsyncHost]" = OrderedDict()
+
+    def _host(self, host: str) -> _AsyncHost:
+        state = self._hosts.get(host)
+        if state is not None:
+            self._hosts.move_to_end(host)
+            return state
+
+        policy = self.scheduler.policy(host)
+        client = httpx.AsyncClient(
+            timeout=self.timeout,
+            follow_redirects=True,
+            headers={'User-Agent': USER_AGENT},
+            limits=httpx.Limits(
+                max_connections=policy.max_concurrency,
+                max_keepalive_connections=policy.max_concurrency
+            )
+        )
+        state = self._hosts[host] = _AsyncHost(client, policy.max_concurrency)
+        self._evict_idle_hosts(keep=host)
+        return state
+
+    def _evict_idle_hosts(self, keep: str) -> None:
+        # keep is the host just added: it is idle until its caller takes a slot
+        for host in list(self._hosts):
+            if len(self._hosts) <= self.max_hosts:
+                break
+            state = self._hosts[host]
+            if state.active == 0 and host != keep:
+                del self._hosts[host]
+                asyncio.ensure_future(state.client.aclose())
+
+    async def _load_robots(self, host: str, scheme: str, state: _AsyncHost) -> None:
+        delay = None
+        try:
+            response = await state.client.get(f"{scheme}://{host}/robots.txt", timeout=ROBOTS_TIMEOUT)
+            if response.status_code == 200:
+                delay = _parse_crawl_delay(response.text)
+        except httpx.HTTPError:
+            pass
+        self.scheduler.set_crawl_delay(host, delay)
+
+    async def _ensure_robots(self, host: str, scheme: str, state: _AsyncHost) -> None:
+        if self.scheduler.has_crawl_delay(host):
+            return
+        # Every concurrent request to a new host waits on the same robots.txt fetch
+        if state.robots_task is None:
+            state.robots_task = asyncio.ensure_future(self._load_robots(host, scheme, state))
+        await asyncio.shield(state.robots_task)
+
+    @asynccontextmanager
+    async def _slot(self, url: str) -> AsyncIterator[_AsyncHost]:
+        """Wait for the host's robots.txt, a concurrency slot and a rate token"""
+        parsed = urlparse(url)
+        host = parsed.netloc.lower()
+        state = self._host(host)
+        state.active += 1
+        try:
+            if self.scheduler.policy(host).respect_robots:
+                await self._ensure_robots(host, parsed.scheme, state)
+            async with state.semaphore:
+                delay = self.scheduler.bucket(host).reserve()
+                if delay:
+                    await asyncio.sleep(delay)
+                yield state
+        finally:
+            state.active -= 1
+
+    async def _send(
+        self,
+        url: str,
+        host: str,
+        headers: Optional[Dict[str, str]],
+        timeout: float
+    ) -> Tuple[httpx.Response, AsyncExitStack]:
+        """Send one GET and return once the headers arrive, with a stack that releases the response and slot"""
+        stack = AsyncExitStack()
+        try:
+            state = await stack.enter_async_context(self._slot(url))
+            # Waiting for a pooled connection is local contention, not host latency
+            request = state.client.build_request(
+                'GET', url, headers=headers, timeout=httpx.Timeout(timeout, pool=self.timeout)
+            )
+            started = time.monotonic()
+            send = asyncio.ensure_future(state.client.send(request, stream=True))
+            try:
+                response = await asyncio.shield(send)
+            except asyncio.CancelledError:
+                # httpcore can lose track of a connection when cancelled mid-request, so let
+                # the request finish on its own and release the response afterwards
+                send.add_done_callback(_release_abandoned)
+                raise
+            except httpx.TimeoutException as e:
+                # Count the timeout as a sample so a host that slowed down gets longer timeouts
+                if not isinstance(e, httpx.PoolTimeout):
+                    self.scheduler.latency(host).observe(timeout)
+                raise
+            stack.push_async_callback(_close_shielded, response)
+            self.scheduler.latency(host).observe(time.monotonic() - started)
+            return response, stack
+        except BaseException:
+            await stack.aclose()
+            raise
+
+    async def _send_hedged(
+        self,
+        url: str,
+        host: str,
+        headers: Optional[Dict[str, str]],
+        timeout: float
+    ) -> Tuple[httpx.Response, AsyncExitStack]:
+        """Like _send, but race a second request against a first one slower than the host's p95"""
+        delay = self.scheduler.latency(host).quantile(0.95) if self.scheduler.policy(host).hedge else None
+        if delay is None:
+            return await self._send(url, host, headers, timeout)
+
+        primary = asyncio.ensure_future(self._send(url, host, headers, timeout))
+        tasks = [primary]
+        winner = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                metrics.increment('fetch_hedged_total')
+                tasks.append(asyncio.ensure_future(self._send(url, host, headers, timeout)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in tasks if task in done and task.exception() is None), None)
+                if winner is not None:
+                    if winner is not primary:
+                        metrics.increment('fetch_hedge_won_total')
+                    return winner.result()
+            # Both failed; report the original request's error
+            return primary.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Release a losing request that got its response before it could be cancelled
+            for task in tasks:
+                if task is not winner and not task.cancelled() and task.exception() is None:
+                    await task.result()[1].aclose()
+
+    async def _request(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]],
+        read_body: bool,
+        retry: bool = True
+    ) -> Tuple[httpx.Response, AsyncExitStack]:
+        """Send a GET with the host's adaptive timeout, retrying transient failures through its circuit breaker"""
+        host = urlparse(url).netloc.lower()
+        policy = self.scheduler.policy(host)
+        breaker = self.scheduler.breaker(host)
+        attempts = max(1, policy.max_attempts) if retry else 1
+        for attempt in range(attempts):
+            self.scheduler.check_circuit(host)
+            timeout = self.scheduler.timeout(host, self.timeout, attempt)
+            try:
+                response, stack = await self._send_hedged(url, host, headers, timeout)
+                if read_body:
+                    try:
+                        await response.aread()
+                    except BaseException:
+                        await stack.aclose()
+                        raise
+            except RETRYABLE_ASYNC_ERRORS as e:
+                if not isinstance(e, httpx.PoolTimeout):
+                    breaker.record_failure()
+                if attempt + 1 == attempts:
+                    raise
+                metrics.increment('fetch_retries_total', reason=type(e).__name__)
+                await asyncio.sleep(_backoff(policy, attempt))
+                continue
+
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if response.status_code not in RETRYABLE_STATUS or attempt + 1 == attempts:
+                return response, stack
+            await stack.aclose()
+            metrics.increment('fetch_retries_total', reason=str(response.status_code))
+            await asyncio.sleep(_backoff(policy, attempt, response.headers.get('Retry-After')))
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None, retry: bool = True) -> httpx.Response:
+        """
+        GET a URL through its host's connection pool, honoring the host's politeness limits.
+
+        Timeouts adapt to the host's recent latency; timeouts, connection errors and
+        retryable statuses (429, 5xx) are retried with backoff unless retry is False,
+        and a host that keeps failing is skipped with CircuitOpenError until its
+        cooldown passes.
+        """
+        response, stack = await self._request(url, headers, read_body=True, retry=retry)
+        await stack.aclose()
+        return response
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        retry: bool = True
+    ) -> AsyncIterator[httpx.Response]:
+        """Streaming GET with the same retries as get(); the host's concurrency slot is held until the body is closed"""
+        response, stack = await self._request(url, headers, read_body=False, retry=retry)
+        async with stack:
+            yield response
+
+    async def aclose(self) -> None:
+        hosts, self._hosts = self._hosts, OrderedDict()
+        for state in hosts.values():
+            await state.client.aclose()
+
+default_scheduler = HostScheduler()
+
+_fetchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, CatalogFetcher]" = weakref.WeakKeyDictionary()
+
+def configure(
+    default_policy: Optional[HostPolicy] = None,
+    host_policies: Optional[Dict[str, HostPolicy]] = None
+) -> None:
+    """
+    Replace the process-wide politeness configuration.
+
+    Args:
+        default_policy: Policy for hosts without a specific entry
+        host_policies: Policies keyed by host or parent domain (e.g. 'catalog.mit.edu' or 'mit.edu')
+    """
+    global default_scheduler
+    default_scheduler = HostScheduler(default_policy, host_policies)
+    _fetchers.clear()
+
+def get_fetcher() -> CatalogFetcher:
+    """Return the CatalogFetcher bound to the running event loop, creating it on first use"""
+    loop = asyncio.get_running_loop()
+    fetcher = _fetchers.get(loop)
+    if fetcher is None:
+        fetcher = _fetchers[loop] = CatalogFetcher()
+    return fetcher
+
+def _release_on_close(response: requests.Response, slot: threading.BoundedSemaphore) -> None:
+    """Release a host slot once, when the response is closed or, failing that, garbage collected"""
+    release = weakref.finalize(response, slot.release)
+    close = response.close
+
+    def close_and_release() -> None:
+        try:
+            close()
+        finally:
+            release()
+
+    response.close = close_and_release
+
+def fetch(
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    stream: bool = False
+) -> requests.Response:
+    """
+    Blocking GET through the per-host session pool, honoring the same politeness limits.
+
+    Timeouts adapt to the host's recent latency, with timeout as the upper bound;
+    transient failures are retried and failing hosts short-circuited as in CatalogFetcher.get.
+    With stream=True only the headers are read; the caller reads the body and must close the response.
+    """
+    scheduler = default_scheduler
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    session = scheduler.session(host)
+
+    if scheduler.policy(host).respect_robots and not scheduler.has_crawl_delay(host):
+        # Threads fetching a new host at once wait on the first one's robots.txt
+        with scheduler.robots_lock(host):
+            if not scheduler.has_crawl_delay(host):
+                delay = None
+                try:
+                    response = session.get(f"{parsed.scheme}://{host}/robots.txt", timeout=ROBOTS_TIMEOUT)
+                    if response.status_code == 200:
+                        delay = _parse_crawl_delay(response.text)
+                except requests.RequestException:
+                    pass
+                scheduler.set_crawl_delay(host, delay)
+
+    policy = scheduler.policy(host)
+    breaker = scheduler.breaker(host)
+    attempts = max(1, policy.max_attempts)
+    for attempt in range(attempts):
+        scheduler.check_circuit(host)
+        attempt_timeout = scheduler.timeout(host, timeout, attempt)
+        slot = scheduler.slot(host)
+        slot.acquire()
+        try:
+            delay = scheduler.bucket(host).reserve()
+            if delay:
+                time.sleep(delay)
+            response = session.get(
+                url, headers=headers, timeout=attempt_timeout, allow_redirects=True, stream=stream
+            )
+        except RETRYABLE_SYNC_ERRORS as e:
+            slot.release()
+            if isinstance(e, requests.Timeout):
+                scheduler.latency(host).observe(attempt_timeout)
+            breaker.record_failure()
+            if attempt + 1 == attempts:
+                raise
+            metrics.increment('fetch_retries_total', reason=type(e).__name__)
+            time.sleep(_backoff(policy, attempt))
+            continue
+        except BaseException:
+            slot.release()
+            raise
+        if stream:
+            # The caller reads the body after we return; the slot is taken until it closes the response
+            _release_on_close(response, slot)
+        else:
+            slot.release()
+
+        # elapsed runs from sending the request until the headers were parsed
+        scheduler.latency(host).observe(response.elapsed.total_seconds())
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if response.status_code not in RETRYABLE_STATUS or attempt + 1 == attempts:
+            return response
+        response.close()
+        metrics.increment('fetch_retries_total', reason=str(response.status_code))
+        time.sleep(_backoff(policy, attempt, response.headers.get('Retry-After')))
@@ -0,0 +1,87 @@
+"""
+Tests for per-host fetch state: client eviction, sync slots and robots.txt fetches.
+
+    python -m pytest catalog_fetch_test.py
+"""
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import catalog_fetch
+from catalog_fetch import CatalogFetcher, HostPolicy
+
+class _Handler(BaseHTTPRequestHandler):
+    robots_requests = 0
+
+    def do_GET(self):
+        if self.path == '/robots.txt':
+            type(self).robots_requests += 1
+            # Slow enough that concurrent first requests all see the host as new
+            time.sleep(0.2)
+            body = b'User-agent: *\nAllow: /\n'
+        else:
+            body = b'<p>' + b'CS 106A Programming Methodology. ' * 2000 + b'</p>'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    _Handler.robots_requests = 0
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+    catalog_fetch.configure()
+
+def test_new_host_is_not_evicted_by_its_own_arrival():
+    async def check():
+        fetcher = CatalogFetcher(max_hosts=1)
+        busy = fetcher._host('a.example.edu')
+        busy.active = 1
+        new = fetcher._host('b.example.edu')
+        assert 'b.example.edu' in fetcher._hosts
+        assert not new.client.is_closed
+        # Once they are idle, the next arrival evicts both older hosts
+        busy.active = 0
+        fetcher._host('c.example.edu')
+        assert list(fetcher._hosts) == ['c.example.edu']
+        await fetcher._hosts['c.example.edu'].client.aclose()
+        await asyncio.sleep(0)
+
+    asyncio.run(check())
+
+def test_streamed_response_holds_its_slot_until_closed(server):
+    catalog_fetch.configure(HostPolicy(requests_per_second=1000, burst=1000, max_concurrency=1, respect_robots=False))
+    slot = catalog_fetch.default_scheduler.slot('127.0.0.1:' + server.rsplit(':', 1)[1])
+
+    response = catalog_fetch.fetch(server + '/page', stream=True)
+    assert not slot.acquire(blocking=False)
+    with response:
+        assert b'CS 106A' in next(response.iter_content(1024))
+    assert slot.acquire(blocking=False)
+    slot.release()
+
+    # A buffered fetch has its body already, so the slot is free when it returns
+    catalog_fetch.fetch(server + '/page')
+    assert slot.acquire(blocking=False)
+    slot.release()
+
+def test_concurrent_threads_fetch_robots_once(server):
+    catalog_fetch.configure(HostPolicy(requests_per_second=1000, burst=1000, respect_robots=True))
+    threads = [threading.Thread(target=catalog_fetch.fetch, args=(server + '/page',)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert _Handler.robots_requests == 1
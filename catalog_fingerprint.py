@@ -0,0 +1,127 @@
+import hashlib
+import re
+from collections import Counter
+from html import unescape
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from catalog_indicators import COURSE_SECTION_PATTERNS
+
+# Name of the section holding everything before the first course-section anchor
+TOP_SECTION = '#top'
+SIMHASH_BITS = 64
+
+# An element whose id (or name) is one of the course-section anchors starts a section
+_SECTION_START = re.compile(
+    r'<[a-z][a-z0-9]*\b[^>]*?\b(?:id|name)\s*=\s*["\']?('
+    + '|'.join(re.escape(pattern.lstrip('#')) for pattern in COURSE_SECTION_PATTERNS)
+    + r')["\'\s/>]',
+    re.IGNORECASE
+)
+_INVISIBLE = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAG = re.compile(r'<[^>]*>')
+_WORD = re.compile(r'\w+')
+
+# Bit-sliced simhash: _SPREAD[k][b] is byte value b of a hash's k-th byte with each of its
+# bits moved into a 32-bit lane of its own, so adding spread hashes counts every bit at once
+_LANE_BITS = 32
+_LANE_MASK = (1 << _LANE_BITS) - 1
+_SPREAD = [
+    [sum(((value >> bit) & 1) << ((8 * byte + bit) * _LANE_BITS) for bit in range(8)) for value in range(256)]
+    for byte in range(SIMHASH_BITS // 8)
+]
+
+class SectionFingerprint(BaseModel):
+    # Hash of the section's visible words, so markup-only changes don't count
+    text_hash: str
+    simhash: int
+
+class PageFingerprint(BaseModel):
+    page_hash: str
+    sections: Dict[str, SectionFingerprint]
+
+def split_sections(html: str) -> List[Tuple[str, int, int]]:
+    """
+    Split a page at its course-section anchor elements.
+
+    Returns:
+        (name, start, end) spans covering the page: TOP_SECTION first, then one per
+        anchor ('#coursestext', ...) in page order; a repeated anchor stays part of the
+        section it appears in
+    """
+    starts = [(TOP_SECTION, 0)]
+    seen = set()
+    for match in _SECTION_START.finditer(html):
+        name = '#' + match.group(1).lower()
+        if name not in seen:
+            seen.add(name)
+            starts.append((name, match.start()))
+    ends = [start for _, start in starts[1:]] + [len(html)]
+    return [(name, start, end) for (name, start), end in zip(starts, ends)]
+
+def visible_words(html: str) -> List[str]:
+    """Lowercased words of the text a reader sees, without markup, scripts or styles"""
+    return _WORD.findall(unescape(_TAG.sub(' ', _INVISIBLE.sub(' ', html))).lower())
+
+def simhash(features: Iterable[Tuple[str, int]]) -> int:
+    """64-bit Charikar simhash of weighted features; similar feature sets differ in few bits"""
+    lanes = total = 0
+    for feature, weight in features:
+        digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=SIMHASH_BITS // 8).digest()
+        lanes += weight * sum(table[value] for table, value in zip(_SPREAD, digest))
+        total += weight
+    value = 0
+    for bit in range(SIMHASH_BITS):
+        if 2 * ((lanes >> (bit * _LANE_BITS)) & _LANE_MASK) > total:
+            value |= 1 << bit
+    return value
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+def section_fingerprint(html: str) -> SectionFingerprint:
+    words = visible_words(html)
+    # Words and word pairs, so reordering text changes the hash too
+    features = Counter(words)
+    features.update(map(' '.join, zip(words, words[1:])))
+    return SectionFingerprint(
+        text_hash=hashlib.blake2b(' '.join(words).encode('utf-8'), digest_size=16).hexdigest(),
+        simhash=simhash(features.items())
+    )
+
+def page_fingerprint(html: str) -> PageFingerprint:
+    """Whole-page hash plus a fingerprint per course section (see split_sections)"""
+    return PageFingerprint(
+        page_hash=hashlib.blake2b(html.encode('utf-8'), digest_size=16).hexdigest(),
+        sections={name: section_fingerprint(html[start:end]) for name, start, end in split_sections(html)}
+    )
+
+def changed_sections(
+    previous: PageFingerprint,
+    current: PageFingerprint,
+    max_distance: Optional[int] = None
+) -> Tuple[List[str], List[str]]:
+    """
+    Compare two fingerprints of a page section by section.
+
+    Args:
+        previous: Fingerprint from the last time the page was processed
+        current: Fingerprint of the page now
+        max_distance: Sections whose visible text changed but whose simhashes differ in at
+            most this many bits count as unchanged (near-duplicates such as a rotating
+            'last updated' line). None counts every text change.
+
+    Returns:
+        (changed or added section names in page order, removed section names)
+    """
+    changed = []
+    for name, section in current.sections.items():
+        old = previous.sections.get(name)
+        if old is None:
+            changed.append(name)
+        elif old.text_hash != section.text_hash:
+            if max_distance is None or hamming_distance(old.simhash, section.simhash) > max_distance:
+                changed.append(name)
+    removed = [name for name in previous.sections if name not in current.sections]
+    return changed, removed
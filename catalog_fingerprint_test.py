@@ -0,0 +1,57 @@
+"""
+Tests for page fingerprints: splitting at course-section anchors, and which sections count as changed.
+
+    python -m pytest catalog_fingerprint_test.py
+"""
+from catalog_fingerprint import (
+    TOP_SECTION, changed_sections, hamming_distance, page_fingerprint, split_sections
+)
+
+COURSES = ''.join(
+    f'<p>CS {i} Topics in computing {i}. Programs, proofs and systems for part {i}.</p>'
+    for i in range(100, 140)
+)
+
+def _page(updated='March 1', courses=COURSES, requirements='<p>Take 12 units of CS.</p>'):
+    return (
+        f'<html><body><p>Last updated {updated}</p><script>var t = "{updated}";</script>'
+        f'<div id="coursestext">{courses}<p>Catalog revised {updated}</p></div>'
+        f'<div id="programrequirementstext">{requirements}</div></body></html>'
+    )
+
+def test_sections_split_at_anchors():
+    html = _page() + '<a name="coursestext"></a><p>More</p>'
+    sections = split_sections(html)
+    assert [name for name, _, _ in sections] == [TOP_SECTION, '#coursestext', '#programrequirementstext']
+    assert sections[0][1] == 0 and sections[-1][2] == len(html)
+    assert all(end == start for (_, _, end), (_, start, _) in zip(sections, sections[1:]))
+    # The repeated anchor stays in the section it appears in
+    assert html[sections[-1][1]:].endswith('<p>More</p>')
+
+def test_markup_changes_are_not_changes():
+    previous = page_fingerprint(_page())
+    current = page_fingerprint(_page(courses=COURSES.replace('<p>', '<p class="course">')))
+    assert previous.page_hash != current.page_hash
+    assert changed_sections(previous, current) == ([], [])
+
+def test_changed_added_and_removed_sections():
+    previous = page_fingerprint(_page())
+    current = page_fingerprint(_page(courses=COURSES + '<p>CS 229 Machine Learning.</p>'))
+    assert changed_sections(previous, current) == (['#coursestext'], [])
+
+    html = _page().replace('id="programrequirementstext"', 'id="curriculum"')
+    assert changed_sections(previous, page_fingerprint(html)) == (['#curriculum'], ['#programrequirementstext'])
+
+def test_max_distance_ignores_near_duplicates_only():
+    previous = page_fingerprint(_page())
+    # A rotating date changes a word or two of a long section
+    touched = page_fingerprint(_page(updated='March 2'))
+    distance = hamming_distance(previous.sections['#coursestext'].simhash, touched.sections['#coursestext'].simhash)
+    assert distance <= 3
+    assert changed_sections(previous, touched) == ([TOP_SECTION, '#coursestext'], [])
+    # The top section is only a few words, so the same edit moves its simhash much further
+    assert changed_sections(previous, touched, max_distance=3) == ([TOP_SECTION], [])
+
+    # Replacing the course list is far beyond the near-duplicate threshold
+    rewritten = page_fingerprint(_page(courses='<p>EE 101 Circuits.</p><p>EE 102 Signals.</p>'))
+    assert changed_sections(previous, rewritten, max_distance=3) == (['#coursestext'], [])
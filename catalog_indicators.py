@@ -0,0 +1,427 @@
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+# University-specific content patterns
+UNIVERSITY_CONTENT_PATTERNS = {
+    'stanford': [
+        r'cs\s*\d{2,3}[a-z]?',  # CS 106A, CS 229, etc.
+        r'computer science.*?units',
+        r'bulletin.*?courses'
+    ],
+    'berkeley': [
+        r'compsci\s*\d{2,3}[a-z]?',
+        r'cs\s*\d{2,3}[a-z]?'
+    ],
+    'mit': [
+        r'6\.\d{3,4}',  # MIT's course numbering
+        r'course\s*6'
+    ]
+}
+
+# Common course section anchors with priority order
+COURSE_SECTION_PATTERNS = [
+    '#coursestext',
+    '#courses',
+    '#course-list',
+    '#course-descriptions',
+    '#programrequirementstext',
+    '#curriculum'
+]
+
+# Enhanced CS course indicators with more specific patterns
+CS_INDICATORS = [
+    'computer science',
+    'course description',
+    'undergraduate courses',
+    'cs courses',
+    'course catalog',
+    'degree requirements',
+    'course number',
+    'credits',
+    'prerequisites',
+    r'cs \d{3}',
+    'computer science courses'
+]
+
+# Common course listing patterns, combined with university-specific ones at match time
+COURSE_LISTING_INDICATORS = [
+    r'cs \d{3}',
+    r'comp \d{3}',
+    r'computer science \d{3}',
+    r'course number.*?description',
+    r'credits.*?prerequisites'
+]
+
+_REGEX_METACHARACTERS = set('.^$*+?{}[]\\|()')
+_SEQUENCE_SEPARATOR = '.*?'
+
+# Characters of the previous chunk re-searched with the next one when scanning a stream
+DEFAULT_OVERLAP = 256
+
+def _is_literal(pattern: str) -> bool:
+    return not any(ch in _REGEX_METACHARACTERS for ch in pattern)
+
+class _Atom:
+    """One literal or bounded regex, searched with the fastest primitive that fits"""
+
+    def __init__(self, source: str):
+        self.literal = source if _is_literal(source) else None
+        self.regex = None if self.literal is not None else re.compile(source)
+
+    def search(self, content: str, start: int = 0, end: Optional[int] = None) -> Optional[Tuple[int, int]]:
+        if end is None:
+            end = len(content)
+        if self.literal is not None:
+            index = content.find(self.literal, start, end)
+            return None if index == -1 else (index, index + len(self.literal))
+        match = self.regex.search(content, start, end)
+        return None if match is None else match.span()
+
+class _Pattern:
+    """An indicator pattern: a single atom, or a 'head.*?tail' pair confined to one line"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.tail = None
+        if source.count(_SEQUENCE_SEPARATOR) == 1:
+            head, tail = source.split(_SEQUENCE_SEPARATOR)
+            self.head, self.tail = _Atom(head), _Atom(tail)
+        else:
+            self.head = _Atom(source)
+
+    def search(self, content: str) -> bool:
+        return self.search_window(content)[0]
+
+    def search_window(
+        self,
+        window: str,
+        window_start: int = 0,
+        open_head_end: Optional[int] = None
+    ) -> Tuple[bool, Optional[int]]:
+        """
+        Search one window of a (possibly streamed) page.
+
+        For 'head.*?tail' patterns, a head whose line continues past the end of the
+        window is reported as its absolute end offset, so the next window can keep
+        looking for the tail on that line.
+
+        Returns:
+            (found, absolute end of a head still waiting for its tail, or None)
+        """
+        if self.tail is None:
+            return self.head.search(window) is not None, None
+
+        # Equivalent to re.search('head.*?tail') without re.DOTALL, but each line is
+        # searched for the tail at most once, so the scan stays linear in the page size
+        position = 0
+        if open_head_end is not None:
+            position = max(open_head_end - window_start, 0)
+            line_end = window.find('\n', position)
+            if self.tail.search(window, position, len(window) if line_end == -1 else line_end) is not None:
+                return True, None
+            if line_end == -1:
+                return False, open_head_end
+            position = line_end + 1
+
+        while True:
+            head = self.head.search(window, position)
+            if head is None:
+                return False, None
+            line_end = window.find('\n', head[1])
+            if self.tail.search(window, head[1], len(window) if line_end == -1 else line_end) is not None:
+                return True, None
+            if line_end == -1:
+                return False, window_start + head[1]
+            position = line_end + 1
+
+class LiteralAutomaton:
+    """
+    Multi-literal matcher built once from a trie of the literals.
+
+    The trie is compiled into one regex whose branches follow the trie edges and whose
+    empty named groups mark the nodes where a literal ends. A match at a position
+    therefore reports every literal starting there ('#courses' and '#coursestext'
+    alike), and the walk runs inside sre instead of a per-character Python loop, which
+    is what a pure-Python Aho-Corasick automaton would need (about 125 ms/MB here).
+    Restarting each search one character after the previous match start also reports
+    occurrences that overlap or nest inside a longer literal.
+    """
+
+    def __init__(self, literals: List[str]):
+        self.literals = list(dict.fromkeys(literals))
+        trie: Dict = {}
+        for index, literal in enumerate(self.literals):
+            node = trie
+            for ch in literal:
+                node = node.setdefault(ch, {})
+            node[None] = index
+        self._regex = re.compile(self._emit(trie)) if self.literals else None
+        # Group numbers follow emission order, not literal order
+        self._group_literals: List[str] = [''] * len(self.literals)
+        if self._regex is not None:
+            for name, group in self._regex.groupindex.items():
+                self._group_literals[group - 1] = self.literals[int(name[1:])]
+
+    @classmethod
+    def _emit(cls, node: Dict) -> str:
+        parts = []
+        if None in node:
+            parts.append(f'(?P<l{node[None]}>)')
+        branches = [re.escape(ch) + cls._emit(child) for ch, child in sorted(
+            (key, value) for key, value in node.items() if key is not None
+        )]
+        if branches:
+            body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            # Past the end of a literal the rest of the branch is optional
+            parts.append(f'(?:{body})?' if None in node else body)
+        return ''.join(parts)
+
+    def finditer(self, content: str, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """Yield (position, literal) for every occurrence, in position order"""
+        if self._regex is None:
+            return
+        if end is None:
+            end = len(content)
+        search = self._regex.search
+        while True:
+            match = search(content, start, end)
+            if match is None:
+                return
+            for group, value in enumerate(match.groups()):
+                if value is not None:
+                    yield match.start(), self._group_literals[group]
+            start = match.start() + 1
+
+    def search(self, content: str, start: int = 0, end: Optional[int] = None) -> Optional[Tuple[int, str]]:
+        """First occurrence of any literal"""
+        return next(self.finditer(content, start, end), None)
+
+    def first_positions(
+        self,
+        content: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        stop_on: Iterable[str] = ()
+    ) -> Dict[str, int]:
+        """
+        Position of the first occurrence of each literal, found in a single pass.
+
+        The pass ends early once every literal has been seen or one of stop_on is found.
+        """
+        stop_on = frozenset(stop_on)
+        positions: Dict[str, int] = {}
+        for position, literal in self.finditer(content, start, end):
+            positions.setdefault(literal, position)
+            if literal in stop_on or len(positions) == len(self.literals):
+                break
+        return positions
+
+class IndicatorMatches(BaseModel):
+    indicators: FrozenSet[str] = frozenset()
+    anchors: FrozenSet[str] = frozenset()
+    university_pattern_matched: bool = False
+    # First offset of each literal indicator and anchor that was found
+    positions: Dict[str, int] = {}
+
+    @property
+    def contains_cs_courses(self) -> bool:
+        return bool(self.indicators)
+
+    def best_anchor(self) -> Optional[str]:
+        """Highest-priority course section anchor present on the page"""
+        for anchor in COURSE_SECTION_PATTERNS:
+            if anchor in self.anchors:
+                return anchor
+        return None
+
+class IndicatorMatcher:
+    """
+    Precompiled matcher for CS indicators, course listing patterns and section anchors.
+
+    Plain-literal indicators and the section anchors go through LiteralAutomaton
+    instances built once, so a single pass finds all of them with their positions.
+    Only the genuinely variable patterns are regexes; they are compiled once and run
+    without re.IGNORECASE (page text is lowercased first) so sre's prefix scanner
+    applies. 'head.*?tail' patterns are evaluated line by line instead of by regex
+    backtracking, which keeps every pattern linear in the page size.
+
+    Text passed to scan() must already be lowercased.
+    """
+
+    def __init__(self, indicators: List[str], university_patterns: List[str], anchors: List[str]):
+        indicators = list(dict.fromkeys(indicators))
+        self.literal_indicators = [source for source in indicators if _is_literal(source)]
+        self.pattern_indicators = [_Pattern(source) for source in indicators if not _is_literal(source)]
+        self.university_patterns = [_Pattern(source) for source in dict.fromkeys(university_patterns)]
+        self.anchors = list(anchors)
+        self._indicator_sources = frozenset(indicators)
+        self._anchor_set = frozenset(anchors)
+
+        self.indicator_automaton = LiteralAutomaton(self.literal_indicators)
+        self.anchor_automaton = LiteralAutomaton(self.anchors)
+        self.literal_automaton = LiteralAutomaton(self.literal_indicators + self.anchors)
+
+    def scan(self, content: str, exhaustive: bool = True) -> IndicatorMatches:
+        """
+        Match lowercased page text against the indicator, university and anchor patterns.
+
+        Args:
+            content: Lowercased page text
+            exhaustive: Report every pattern present. When False, stop as soon as the
+                verdict is decided: the first indicator hit, the first university pattern
+                hit, and (only if no university pattern matched) the best anchor present.
+
+        Returns:
+            IndicatorMatches naming the patterns that were found
+        """
+        university_hits = []
+        for pattern in self.university_patterns:
+            if pattern.search(content):
+                university_hits.append(pattern.source)
+                if not exhaustive:
+                    break
+        indicators = [source for source in university_hits if source in self._indicator_sources]
+
+        if exhaustive:
+            # One pass over the page for every literal indicator and anchor
+            positions = self.literal_automaton.first_positions(content)
+            indicators.extend(literal for literal in positions if literal not in self._anchor_set)
+        else:
+            positions = {}
+            if not university_hits:
+                positions = self.anchor_automaton.first_positions(content, stop_on=self.anchors[:1])
+            if not indicators:
+                hit = self.indicator_automaton.search(content)
+                if hit is not None:
+                    positions[hit[1]] = hit[0]
+                    indicators.append(hit[1])
+
+        for pattern in self.pattern_indicators:
+            if indicators and not exhaustive:
+                break
+            if pattern.source not in indicators and pattern.search(content):
+                indicators.append(pattern.source)
+
+        return IndicatorMatches(
+            indicators=frozenset(indicators),
+            anchors=frozenset(positions.keys() & self._anchor_set),
+            university_pattern_matched=bool(university_hits),
+            positions=positions
+        )
+
+    def scanner(self, need_anchor: bool = True, overlap: int = DEFAULT_OVERLAP) -> "IndicatorScanner":
+        """Start an incremental scan for text that arrives in chunks"""
+        return IndicatorScanner(self, need_anchor, overlap)
+
+class IndicatorScanner:
+    """
+    Incremental, early-exit form of IndicatorMatcher.scan(exhaustive=False).
+
+    Feed lowercased chunks as they are decoded. Each chunk is searched together with
+    the last `overlap` characters of the previous one, so matches spanning a chunk
+    boundary are found as long as they are shorter than the overlap. Only patterns
+    that can still change the verdict are searched, and feed() returns True once the
+    verdict is decided: an indicator has matched and either no anchor is needed, a
+    university pattern matched, or (without university patterns) the highest-priority
+    anchor was found.
+    """
+
+    def __init__(self, matcher: IndicatorMatcher, need_anchor: bool = True, overlap: int = DEFAULT_OVERLAP):
+        self.matcher = matcher
+        self.need_anchor = need_anchor
+        self.overlap = overlap
+        self.chars_scanned = 0
+        self._carry = ''
+        self._indicators: List[str] = []
+        self._university_hit = False
+        self._positions: Dict[str, int] = {}
+        self._open_heads: Dict[str, int] = {}
+
+    @property
+    def decided(self) -> bool:
+        if not self._indicators:
+            return False
+        if not self.need_anchor or self._university_hit:
+            return True
+        # A university pattern anywhere on the page suppresses the anchor, so with
+        # university patterns in play the anchor is only settled by a hit or the end
+        if self.matcher.university_patterns:
+            return False
+        return self.matcher.anchors[0] in self._positions
+
+    def _search(self, pattern: _Pattern, window: str, window_start: int) -> bool:
+        found, open_head_end = pattern.search_window(window, window_start, self._open_heads.get(pattern.source))
+        if open_head_end is None:
+            self._open_heads.pop(pattern.source, None)
+        else:
+            self._open_heads[pattern.source] = open_head_end
+        return found
+
+    def feed(self, chunk: str) -> bool:
+        """Scan the next lowercased chunk; returns True once the verdict is decided"""
+        if self.decided:
+            return True
+        window = self._carry + chunk
+        window_start = self.chars_scanned - len(self._carry)
+        self.chars_scanned += len(chunk)
+        self._carry = window[-self.overlap:] if self.overlap else ''
+
+        if not self._university_hit:
+            for pattern in self.matcher.university_patterns:
+                if self._search(pattern, window, window_start):
+                    self._university_hit = True
+                    if pattern.source in self.matcher._indicator_sources:
+                        self._indicators.append(pattern.source)
+                    break
+
+        if self.need_anchor and not self._university_hit:
+            anchors = self.matcher.anchor_automaton.first_positions(window, stop_on=self.matcher.anchors[:1])
+            for anchor, position in anchors.items():
+                self._positions.setdefault(anchor, window_start + position)
+
+        if not self._indicators:
+            hit = self.matcher.indicator_automaton.search(window)
+            if hit is not None:
+                self._positions.setdefault(hit[1], window_start + hit[0])
+                self._indicators.append(hit[1])
+
+        if not self._indicators:
+            for pattern in self.matcher.pattern_indicators:
+                if self._search(pattern, window, window_start):
+                    self._indicators.append(pattern.source)
+                    break
+
+        return self.decided
+
+    def result(self) -> IndicatorMatches:
+        return IndicatorMatches(
+            indicators=frozenset(self._indicators),
+            anchors=frozenset(self._positions.keys() & frozenset(self.matcher.anchors)),
+            university_pattern_matched=self._university_hit,
+            positions=self._positions
+        )
+
+def university_keys(university_name: str) -> Tuple[str, ...]:
+    """Universities whose content patterns apply to the given name"""
+    university_lower = university_name.lower()
+    return tuple(uni for uni in UNIVERSITY_CONTENT_PATTERNS if uni in university_lower)
+
+@lru_cache(maxsize=64)
+def _build_matcher(keys: Tuple[str, ...]) -> IndicatorMatcher:
+    university_patterns = [pattern for key in keys for pattern in UNIVERSITY_CONTENT_PATTERNS[key]]
+    return IndicatorMatcher(
+        CS_INDICATORS + COURSE_LISTING_INDICATORS + university_patterns,
+        university_patterns,
+        COURSE_SECTION_PATTERNS
+    )
+
+def matcher_for(university_name: str) -> IndicatorMatcher:
+    """Return the prebuilt matcher for a university's pattern set"""
+    return _build_matcher(university_keys(university_name))
+
+# Prebuild the generic matcher and one per known university at import time
+for _keys in [()] + [(uni,) for uni in UNIVERSITY_CONTENT_PATTERNS]:
+    _build_matcher(_keys)
@@ -0,0 +1,92 @@
+"""
+Equivalence tests: the precompiled indicator matcher against verify_url's original regex checks.
+
+    python -m pytest catalog_indicators_test.py
+"""
+import random
+import re
+
+import pytest
+
+from catalog_indicators import (
+    COURSE_SECTION_PATTERNS, CS_INDICATORS, COURSE_LISTING_INDICATORS, UNIVERSITY_CONTENT_PATTERNS,
+    LiteralAutomaton, matcher_for
+)
+
+UNIVERSITY_NAMES = ['', 'Stanford University', 'UC Berkeley', 'MIT', 'Stanford and MIT']
+
+FRAGMENTS = [
+    'computer science', 'computer', ' science', 'course', ' description', 'course number', ' number',
+    'credits', 'prerequisites', 'degree requirements', 'undergraduate courses', 'cs courses',
+    'course catalog', 'cs ', 'cs', 'comp ', 'compsci ', 'computer science ', '1', '12', '123', '106a',
+    '6.', '6.0', '6.006', 'course 6', 'course6', 'bulletin', 'units', ' ', ' ', '\n', '\n',
+    '#courses', '#coursestext', 'text', '#course-list', '#course-descriptions', '#curriculum',
+    '#programrequirementstext', '#program', 'lorem ipsum ', 'dolor ', 'a', '.',
+]
+
+def original_verdict(content: str, university_name: str):
+    """contains_cs_courses and the anchor appended, as the baseline verify_url computed them"""
+    additional_patterns = [
+        pattern for uni, patterns in UNIVERSITY_CONTENT_PATTERNS.items()
+        if uni in university_name.lower() for pattern in patterns
+    ]
+    university_matched = any(re.search(pattern, content) for pattern in additional_patterns)
+    anchor = None
+    if not university_matched:
+        anchor = next((pattern for pattern in COURSE_SECTION_PATTERNS if pattern in content), None)
+    # The baseline checked the CS indicators as substrings; 'cs \d{3}' among them only
+    # ever matched as the regex it also is among the course listing indicators
+    contains = (
+        any(indicator in content for indicator in CS_INDICATORS)
+        or any(re.search(pattern, content, re.IGNORECASE) for pattern in COURSE_LISTING_INDICATORS + additional_patterns)
+    )
+    return contains, anchor, university_matched
+
+def random_pages(count: int, seed: int):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield ''.join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 40)))
+
+@pytest.mark.parametrize('university_name', UNIVERSITY_NAMES)
+@pytest.mark.parametrize('exhaustive', [True, False])
+def test_scan_matches_original_regexes(university_name, exhaustive):
+    matcher = matcher_for(university_name)
+    for content in random_pages(2000, seed=len(university_name)):
+        matches = matcher.scan(content, exhaustive=exhaustive)
+        contains, anchor, university_matched = original_verdict(content, university_name)
+        assert matches.contains_cs_courses == contains, content
+        assert matches.university_pattern_matched == university_matched, content
+        if not university_matched:
+            assert matches.best_anchor() == anchor, content
+
+@pytest.mark.parametrize('university_name', UNIVERSITY_NAMES)
+@pytest.mark.parametrize('chunk_size', [1, 7, 64])
+def test_incremental_scanner_matches_scan(university_name, chunk_size):
+    matcher = matcher_for(university_name)
+    for content in random_pages(300, seed=chunk_size):
+        scanner = matcher.scanner(need_anchor=True, overlap=64)
+        for start in range(0, len(content), chunk_size):
+            if scanner.feed(content[start:start + chunk_size]):
+                break
+        streamed, scanned = scanner.result(), matcher.scan(content, exhaustive=False)
+        assert streamed.contains_cs_courses == scanned.contains_cs_courses, content
+        assert streamed.university_pattern_matched == scanned.university_pattern_matched, content
+        if not scanned.university_pattern_matched:
+            assert streamed.best_anchor() == scanned.best_anchor(), content
+
+def test_head_tail_patterns_stay_on_one_line():
+    stanford = matcher_for('Stanford')
+    assert stanford.scan('bulletin of courses').university_pattern_matched
+    assert not stanford.scan('bulletin\nof courses').university_pattern_matched
+
+def test_literal_automaton_reports_overlapping_and_nested_literals():
+    literals = ['#courses', '#coursestext', 'course', 'ses', 'text']
+    automaton = LiteralAutomaton(literals)
+    rng = random.Random(0)
+    for _ in range(500):
+        content = ''.join(rng.choice(['#', 'course', 's', 'text', 'es', 'x']) for _ in range(rng.randint(0, 20)))
+        expected = sorted(
+            (position, literal) for literal in literals
+            for position in range(len(content)) if content.startswith(literal, position)
+        )
+        assert sorted(automaton.finditer(content)) == expected, content
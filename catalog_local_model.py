@@ -0,0 +1,212 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Union
+
+from agents import Model, ModelProvider, ModelResponse, ModelSettings, ModelTracing
+from agents.agent_output import AgentOutputSchema
+from agents.usage import Usage
+from openai.types.responses import Response, ResponseCompletedEvent, ResponseOutputMessage, ResponseOutputText
+
+from catalog_cache import canonicalize_university_name
+
+DEFAULT_URL_TEMPLATE = "https://catalog.{slug}.edu/computer-science/#coursestext"
+DEFAULT_LATENCY = 0.0
+DEFAULT_JITTER = 0.0
+DEFAULT_TOKEN_LATENCY = 0.0
+
+_LISTED_NAME = re.compile(r'^\s*\d+\.\s+(.+?)\s*$', re.MULTILINE)
+
+def _input_text(input: Union[str, List[Dict[str, Any]]]) -> str:
+    """Text of the last user message in a Responses-format input"""
+    if isinstance(input, str):
+        return input
+    for item in reversed(input):
+        if item.get('role') != 'user':
+            continue
+        content = item.get('content')
+        if isinstance(content, str):
+            return content
+        return ''.join(part.get('text', '') for part in content or [] if isinstance(part, dict))
+    return ''
+
+def _example(
+    schema: Dict[str, Any],
+    definitions: Dict[str, Any],
+    hints: Dict[str, Any],
+    name: str = '',
+    items: Sequence[Dict[str, Any]] = ()
+) -> Any:
+    """Value that satisfies a (strict) JSON schema, preferring hints for named fields; arrays get one element per items hint"""
+    if '$ref' in schema:
+        schema = definitions[schema['$ref'].split('/')[-1]]
+    if 'anyOf' in schema:
+        # Optional fields are left empty unless a hint fills them
+        options = schema['anyOf']
+        if name not in hints and any(option.get('type') == 'null' for option in options):
+            return None
+        schema = next(option for option in options if option.get('type') != 'null')
+    if name in hints:
+        return hints[name]
+    if 'enum' in schema:
+        return schema['enum'][0]
+    kind = schema.get('type')
+    if kind == 'object':
+        return {
+            key: _example(value, definitions, hints, key, items)
+            for key, value in schema.get('properties', {}).items()
+        }
+    if kind == 'array':
+        return [_example(schema['items'], definitions, item) for item in items]
+    if kind == 'boolean':
+        return True
+    if kind in ('integer', 'number'):
+        return 0
+    return ''
+
+class LocalCatalogModel(Model):
+    """
+    Deterministic stand-in for the LLM behind the catalog agents.
+
+    Answers every request with schema-valid output derived only from the input: the
+    university name is turned into a catalog URL with url_template, and every other
+    field gets a fixed value (booleans true, optionals null). A numbered list of names
+    (a batched lookup) gets one list element per name. Responses are delayed by
+    latency seconds plus up to jitter seconds chosen from a hash of the input, so a
+    run is reproducible, plus token_latency seconds per output token. No network
+    calls are made.
+    """
+
+    def __init__(
+        self,
+        latency: float = DEFAULT_LATENCY,
+        jitter: float = DEFAULT_JITTER,
+        url_template: str = DEFAULT_URL_TEMPLATE,
+        model_name: str = 'local-catalog',
+        token_latency: float = DEFAULT_TOKEN_LATENCY
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_latency = token_latency
+        self.url_template = url_template
+        self.model_name = model_name
+        self.requests = 0
+
+    def catalog_url(self, university_name: str) -> str:
+        slug = canonicalize_university_name(university_name).replace(' ', '')
+        return self.url_template.format(slug=slug or 'unknown', name=university_name)
+
+    def _delay(self, text: str) -> float:
+        if not self.jitter:
+            return self.latency
+        digest = hashlib.blake2b(text.encode('utf-8'), digest_size=4).digest()
+        return self.latency + self.jitter * int.from_bytes(digest, 'big') / 0xFFFFFFFF
+
+    def _hints(self, text: str) -> Dict[str, Any]:
+        url = text if text.startswith('http') else self.catalog_url(text)
+        return {'university_name': text, 'catalog_url': url, 'url': url, 'error_message': None}
+
+    def _output_text(self, text: str, output_schema: Optional[AgentOutputSchema]) -> str:
+        if output_schema is None or output_schema.is_plain_text():
+            return self.catalog_url(text)
+        schema = output_schema.json_schema()
+        items = [self._hints(name) for name in _LISTED_NAME.findall(text)]
+        output = json.dumps(_example(schema, schema.get('$defs', {}), self._hints(text), items=items))
+        # Fail here rather than inside the Runner if the schema was not satisfied
+        output_schema.validate_json(output)
+        return output
+
+    def _respond(self, text: str, output_schema: Optional[AgentOutputSchema]) -> List[ResponseOutputMessage]:
+        self.requests += 1
+        return [ResponseOutputMessage(
+            id=f"msg_local_{self.requests}",
+            type='message',
+            role='assistant',
+            status='completed',
+            content=[ResponseOutputText(type='output_text', text=self._output_text(text, output_schema), annotations=[])]
+        )]
+
+    async def get_response(
+        self,
+        system_instructions: Optional[str],
+        input: Union[str, List[Dict[str, Any]]],
+        model_settings: ModelSettings,
+        tools: list,
+        output_schema: Optional[AgentOutputSchema],
+        handoffs: list,
+        tracing: ModelTracing
+    ) -> ModelResponse:
+        text = _input_text(input).strip()
+        output = self._respond(text, output_schema)
+        input_tokens = (len(system_instructions or '') + len(text)) // 4
+        output_tokens = len(output[0].content[0].text) // 4
+        delay = self._delay(text) + self.token_latency * output_tokens
+        if delay:
+            await asyncio.sleep(delay)
+        return ModelResponse(
+            output=output,
+            usage=Usage(
+                requests=1,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                total_tokens=input_tokens + output_tokens
+            ),
+            referenceable_id=None
+        )
+
+    async def stream_response(
+        self,
+        system_instructions: Optional[str],
+        input: Union[str, List[Dict[str, Any]]],
+        model_settings: ModelSettings,
+        tools: list,
+        output_schema: Optional[AgentOutputSchema],
+        handoffs: list,
+        tracing: ModelTracing
+    ) -> AsyncIterator[ResponseCompletedEvent]:
+        text = _input_text(input).strip()
+        output = self._respond(text, output_schema)
+        delay = self._delay(text) + self.token_latency * (len(output[0].content[0].text) // 4)
+        if delay:
+            await asyncio.sleep(delay)
+        yield ResponseCompletedEvent(
+            type='response.completed',
+            response=Response(
+                id=f"resp_local_{self.requests}",
+                created_at=time.time(),
+                model=self.model_name,
+                object='response',
+                output=output,
+                parallel_tool_calls=False,
+                tool_choice='auto',
+                tools=[]
+            )
+        )
+
+class LocalModelProvider(ModelProvider):
+    """Model provider that serves LocalCatalogModel for every model name"""
+
+    def __init__(self, model: Optional[LocalCatalogModel] = None):
+        self.model = model or LocalCatalogModel()
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return self.model
+
+def local_provider_from_env() -> LocalModelProvider:
+    """
+    Build a LocalModelProvider configured from the environment.
+
+    CATALOG_LOCAL_MODEL_LATENCY_MS, CATALOG_LOCAL_MODEL_JITTER_MS and
+    CATALOG_LOCAL_MODEL_TOKEN_MS (per output token) set the synthetic latency;
+    CATALOG_LOCAL_MODEL_URL_TEMPLATE the catalog URL returned ({slug} and {name} are
+    filled in from the university name).
+    """
+    return LocalModelProvider(LocalCatalogModel(
+        latency=float(os.getenv('CATALOG_LOCAL_MODEL_LATENCY_MS', DEFAULT_LATENCY * 1000)) / 1000,
+        jitter=float(os.getenv('CATALOG_LOCAL_MODEL_JITTER_MS', DEFAULT_JITTER * 1000)) / 1000,
+        url_template=os.getenv('CATALOG_LOCAL_MODEL_URL_TEMPLATE', DEFAULT_URL_TEMPLATE),
+        token_latency=float(os.getenv('CATALOG_LOCAL_MODEL_TOKEN_MS', DEFAULT_TOKEN_LATENCY * 1000)) / 1000
+    ))
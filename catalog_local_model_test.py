@@ -0,0 +1,36 @@
+"""
+Tests for the local model: the real Runner gets schema-valid output from it for the single and batch agents.
+
+    python -m pytest catalog_local_model_test.py
+"""
+import asyncio
+
+from agents import RunConfig, Runner
+
+import get_uni_courses
+from catalog_local_model import LocalCatalogModel, LocalModelProvider
+
+def _run(agent, input, model):
+    run_config = RunConfig(model_provider=LocalModelProvider(model), tracing_disabled=True)
+    return asyncio.run(Runner.run(agent, input, run_config=run_config)).final_output
+
+def test_single_agent_output_matches_the_schema():
+    model = LocalCatalogModel(url_template='https://{slug}.example.edu/catalog')
+    output = _run(get_uni_courses.get_agent(), 'The Univ. of Washington', model)
+    assert isinstance(output, get_uni_courses.UniversityCatalogOutput)
+    assert output.university_name == 'The Univ. of Washington'
+    assert output.catalog_url == 'https://universityofwashington.example.edu/catalog'
+    assert output.verification_status.url == output.catalog_url
+    assert output.verification_status.error_message is None
+    # The same input always gets the same answer
+    assert _run(get_uni_courses.get_agent(), 'The Univ. of Washington', model) == output
+
+def test_batch_agent_answers_every_listed_name():
+    model = LocalCatalogModel()
+    names = ['Stanford University', 'Massachusetts Institute of Technology', 'Université de Montréal']
+    prompt = '\n'.join(f"{number}. {name}" for number, name in enumerate(names, 1))
+    output = _run(get_uni_courses.get_batch_agent(), prompt, model)
+    assert isinstance(output, get_uni_courses.UniversityCatalogBatchOutput)
+    assert [answer.university_name for answer in output.catalogs] == names
+    assert [answer.catalog_url for answer in output.catalogs] == [model.catalog_url(name) for name in names]
+    assert model.catalog_url('Université de Montréal') == 'https://catalog.universitedemontreal.edu/computer-science/#coursestext'
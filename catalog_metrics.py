@@ -0,0 +1,177 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds in seconds, from sub-millisecond regex scans to multi-second LLM runs
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket plus the overflow (+Inf) bucket; not cumulative until exported
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value: float) -> str:
+    # Exact: counters such as bytes_fetched_total outgrow the 6 digits of '%g'
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+class _StageTimer:
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self) -> "_StageTimer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        if exc_type is not None:
+            self.metrics.increment('errors_total', stage=self.stage)
+        return False
+
+_DISABLED = nullcontext()
+
+class Metrics:
+    """
+    In-process stage latency histograms and counters.
+
+    stage(name) times a block into the 'stage_seconds' histogram for that stage and
+    counts an error if the block raises. While disabled, stage() returns a shared no-op
+    context manager and increment() returns immediately, so instrumented code pays only
+    a method call.
+    """
+
+    def __init__(self, enabled: bool = False, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name: str):
+        """Context manager that records how long the block took"""
+        if not self.enabled:
+            return _DISABLED
+        return _StageTimer(self, name)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def increment(self, name: str, amount: float = 1, **labels: str) -> None:
+        """Add to a counter, e.g. increment('bytes_fetched_total', 1024) or increment('cache_total', result='hit')"""
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict:
+        """JSON-serializable view: per-stage count, total, p50/p95/p99 and buckets, plus counters"""
+        with self._lock:
+            stages = {}
+            for stage, histogram in sorted(self._histograms.items()):
+                cumulative, total = {}, 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), histogram.counts):
+                    total += bucket_count
+                    cumulative['+Inf' if bound == float('inf') else repr(bound)] = total
+                stages[stage] = {
+                    'count': histogram.count,
+                    'sum_seconds': histogram.sum,
+                    'p50_seconds': histogram.quantile(0.50),
+                    'p95_seconds': histogram.quantile(0.95),
+                    'p99_seconds': histogram.quantile(0.99),
+                    'buckets': cumulative,
+                }
+            counters = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                counters[name + _format_labels(labels)] = value
+        return {'stages': stages, 'counters': counters}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix: str = 'catalog_') -> str:
+        """Snapshot in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            if self._histograms:
+                name = f'{prefix}stage_seconds'
+                lines.append(f'# HELP {name} Time spent in each catalog pipeline stage.')
+                lines.append(f'# TYPE {name} histogram')
+                for stage, histogram in sorted(self._histograms.items()):
+                    stage_key = (('stage', stage),)
+                    total = 0
+                    for bound, bucket_count in zip(self.buckets + (float('inf'),), histogram.counts):
+                        total += bucket_count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f'{name}_bucket{_format_labels(stage_key, (("le", le),))} {total}')
+                    lines.append(f'{name}_sum{_format_labels(stage_key)} {_format_value(histogram.sum)}')
+                    lines.append(f'{name}_count{_format_labels(stage_key)} {histogram.count}')
+            declared = set()
+            for (counter, labels), value in sorted(self._counters.items()):
+                name = prefix + counter
+                if name not in declared:
+                    declared.add(name)
+                    lines.append(f'# TYPE {name} counter')
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics(enabled=os.getenv('CATALOG_METRICS', '').lower() in ('1', 'true', 'yes'))
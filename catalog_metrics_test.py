@@ -0,0 +1,32 @@
+"""
+Tests for the Prometheus text export of stage histograms and counters.
+
+    python -m pytest catalog_metrics_test.py
+"""
+from catalog_metrics import Metrics
+
+def _samples(text):
+    return dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+
+def test_counters_are_exported_exactly():
+    metrics = Metrics(enabled=True)
+    metrics.increment('bytes_fetched_total', 12345678)
+    metrics.increment('bytes_fetched_total', 2 ** 40)
+    metrics.increment('cost_total', 0.1)
+    metrics.increment('cost_total', 0.2)
+    metrics.increment('cache_total', result='hit')
+    samples = _samples(metrics.to_prometheus())
+    assert samples['catalog_bytes_fetched_total'] == str(12345678 + 2 ** 40)
+    assert float(samples['catalog_cost_total']) == 0.1 + 0.2
+    assert samples['catalog_cache_total{result="hit"}'] == '1'
+
+def test_stage_histogram():
+    metrics = Metrics(enabled=True, buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.5, 5.0):
+        metrics.observe('fetch', seconds)
+    samples = _samples(metrics.to_prometheus())
+    assert samples['catalog_stage_seconds_bucket{stage="fetch",le="0.1"}'] == '1'
+    assert samples['catalog_stage_seconds_bucket{stage="fetch",le="1.0"}'] == '3'
+    assert samples['catalog_stage_seconds_bucket{stage="fetch",le="+Inf"}'] == '4'
+    assert float(samples['catalog_stage_seconds_sum{stage="fetch"}']) == 6.05
+    assert samples['catalog_stage_seconds_count{stage="fetch"}'] == '4'
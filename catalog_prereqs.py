@@ -0,0 +1,305 @@
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+
+from catalog_cache import canonicalize_university_name
+from catalog_extract import CourseRecord
+
+# A dotted course number after the subject ('MIT 6.006'), as MIT numbers its courses
+_DOTTED_SUFFIX = r'(?:\.(?:\d{1,4}[A-Z]?|[A-Z]\d{2,3}))?'
+_SUBJECT_CODE = re.compile(r'\b([A-Z][A-Z&]{1,9})\s?-?\s?(\d{1,4}[A-Z]{0,3}' + _DOTTED_SUFFIX + r')\b')
+# Subject-less dotted numbers ('6.006', '18.06', '6.S191', '21M.301'); in prerequisite
+# text only looked for when the course itself is numbered this way, and never before a
+# credit unit or as part of a longer number ('a 3.00 GPA' is not a course at other schools)
+_DOTTED_CODE = re.compile(
+    r'(?<![\w.])(\d{1,2}[A-Z]{0,2}\.(?:\d{2,4}[A-Z]?|[A-Z]{1,3}\d{0,3}))(?![\w.])'
+    r'(?!\s*(?:CREDITS?|UNITS?|HOURS?|GPA)\b)'
+)
+# 'CS 106A or 106B', 'MATH 51, 52 and 53': bare numbers reuse the preceding subject
+_CONTINUATION = re.compile(r'\s*(?:,|/|\bor\b|\band\b)\s*(?:,|\bor\b|\band\b)?\s*(\d{1,4}[A-Z]{0,3})\b')
+
+# Nodes are keyed by (canonical university name, normalized code), so every school's
+# 'CS 101' stays its own course in an all-university graph
+CourseKey = Tuple[str, str]
+
+def normalize_code(code: str) -> str:
+    """Canonical course code ('cs106a', 'CS-106A' and 'CS 106A' all become 'CS 106A'; '6.006' stays)"""
+    code = code.upper()
+    match = _SUBJECT_CODE.search(code)
+    if match is not None:
+        return f"{match.group(1)} {match.group(2)}"
+    match = _DOTTED_CODE.search(code)
+    if match is not None:
+        return match.group(1)
+    return ' '.join(code.split())
+
+def is_dotted_code(code: str) -> bool:
+    """Whether a (normalized) code is a subject-less dotted number such as '6.006'"""
+    return _DOTTED_CODE.fullmatch(code.upper()) is not None
+
+def course_key(code: str, university: str = '') -> CourseKey:
+    return canonicalize_university_name(university), normalize_code(code)
+
+def parse_prerequisite_codes(text: str, dotted: bool = False) -> List[str]:
+    """
+    Course codes mentioned in prerequisite text, in order of first mention.
+
+    'and'/'or' structure is not kept: every course mentioned counts as a prerequisite.
+    With dotted, subject-less dotted numbers ('6.1200 or 18.06') are courses too.
+    """
+    mentions: List[Tuple[int, str]] = []
+    covered: List[Tuple[int, int]] = []
+    for match in _SUBJECT_CODE.finditer(text):
+        subject = match.group(1)
+        mentions.append((match.start(), f"{subject} {match.group(2)}"))
+        position = match.end()
+        while True:
+            continuation = _CONTINUATION.match(text, position)
+            if continuation is None:
+                break
+            mentions.append((continuation.start(1), f"{subject} {continuation.group(1)}"))
+            position = continuation.end()
+        covered.append((match.start(), position))
+    if dotted:
+        for match in _DOTTED_CODE.finditer(text.upper()):
+            if not any(start <= match.start() < end for start, end in covered):
+                mentions.append((match.start(), match.group(1)))
+    mentions.sort(key=lambda mention: mention[0])
+    return list(dict.fromkeys(code for _, code in mentions))
+
+class PrerequisiteGraph:
+    """
+    Integer-indexed prerequisite graph with incrementally maintained topological order.
+
+    Each (university, code) key maps to a node id; adjacency is kept as lists of ids in both
+    directions. The topological order (prerequisites first) is maintained with the
+    Pearce-Kelly algorithm, so adding an edge only reorders the nodes between its two
+    endpoints. Transitive prerequisites and depths are memoized per node; changing a
+    course's prerequisites drops the memos of that course and its dependents only.
+    An edge that would create a cycle is not added and is reported to the caller.
+    """
+
+    def __init__(self):
+        self.keys: List[CourseKey] = []
+        self.titles: List[str] = []
+        self._ids: Dict[CourseKey, int] = {}
+        self._prereqs: List[List[int]] = []
+        self._dependents: List[List[int]] = []
+        # _order[position] is a node id; _position[node] is its index in _order
+        self._order: List[int] = []
+        self._position: List[int] = []
+        self._closures: Dict[int, FrozenSet[int]] = {}
+        self._depths: Dict[int, int] = {}
+        self._order_keys: Optional[List[CourseKey]] = None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, course: Union[str, CourseKey]) -> bool:
+        """A code ('CS 106A', no university) or a (university, code) key"""
+        key = course_key(course) if isinstance(course, str) else course_key(course[1], course[0])
+        return key in self._ids
+
+    def _node(self, key: CourseKey) -> int:
+        node = self._ids.get(key)
+        if node is None:
+            node = self._ids[key] = len(self.keys)
+            self.keys.append(key)
+            self.titles.append('')
+            self._prereqs.append([])
+            self._dependents.append([])
+            self._position.append(len(self._order))
+            self._order.append(node)
+            self._order_keys = None
+        return node
+
+    def _id(self, code: str, university: str) -> int:
+        node = self._ids.get(course_key(code, university))
+        if node is None:
+            raise KeyError(f"Unknown course {code!r}" + (f" at {university!r}" if university else ''))
+        return node
+
+    def _reach(self, start: int, edges: List[List[int]], lower: int, upper: int) -> List[int]:
+        """Nodes reachable from start whose position lies within [lower, upper]"""
+        seen = {start}
+        stack = [start]
+        while stack:
+            for neighbor in edges[stack.pop()]:
+                if neighbor not in seen and lower <= self._position[neighbor] <= upper:
+                    seen.add(neighbor)
+                    stack.append(neighbor)
+        return list(seen)
+
+    def _add_edge(self, prereq: int, course: int) -> bool:
+        """Add prereq -> course, reordering the affected region; False if it would create a cycle"""
+        lower, upper = self._position[course], self._position[prereq]
+        if upper > lower:
+            forward = self._reach(course, self._dependents, lower, upper)
+            if prereq in forward:
+                return False
+            backward = self._reach(prereq, self._prereqs, lower, upper)
+            # Reuse the same positions: everything prereq needs, then everything after course
+            key = self._position.__getitem__
+            nodes = sorted(backward, key=key) + sorted(forward, key=key)
+            for position, node in zip(sorted(map(key, nodes)), nodes):
+                self._order[position] = node
+                self._position[node] = position
+            self._order_keys = None
+        self._prereqs[course].append(prereq)
+        self._dependents[prereq].append(course)
+        return True
+
+    def _invalidate(self, node: int) -> None:
+        # A memo exists only if the memos of everything it depends on exist, so the walk
+        # can stop at dependents that have none
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node not in self._closures and node not in self._depths:
+                continue
+            self._closures.pop(node, None)
+            self._depths.pop(node, None)
+            stack.extend(self._dependents[node])
+
+    def set_prerequisites(self, code: str, prerequisites: Iterable[str], university: str = '') -> List[str]:
+        """
+        Replace a course's direct prerequisites, adding any unknown course as a node.
+
+        Args:
+            code: Course code
+            prerequisites: Codes of the courses it requires, at the same university
+            university: University offering the course ('' for a single-catalog graph)
+
+        Returns:
+            Prerequisites that were not added because they would create a cycle
+        """
+        school = canonicalize_university_name(university)
+        node = self._node((school, normalize_code(code)))
+        wanted = [self._node((school, p)) for p in dict.fromkeys(map(normalize_code, prerequisites))]
+        wanted = [p for p in wanted if p != node]
+        current = self._prereqs[node]
+        if wanted == current:
+            return []
+
+        self._invalidate(node)
+        wanted_set = set(wanted)
+        for prereq in current:
+            if prereq not in wanted_set:
+                self._dependents[prereq].remove(node)
+        self._prereqs[node] = [p for p in current if p in wanted_set]
+
+        rejected = []
+        kept = set(self._prereqs[node])
+        for prereq in wanted:
+            if prereq not in kept and not self._add_edge(prereq, node):
+                rejected.append(self.keys[prereq][1])
+        return rejected
+
+    def add_course(self, course: CourseRecord, university: str = '') -> List[str]:
+        """Add or update a course from an extracted record; returns the prerequisites rejected as cyclic"""
+        code = normalize_code(course.code)
+        prerequisites = parse_prerequisite_codes(course.prerequisites or '', dotted=is_dotted_code(code))
+        rejected = self.set_prerequisites(code, prerequisites, university)
+        self.titles[self._ids[course_key(code, university)]] = course.title
+        return rejected
+
+    def add_catalog(self, university: str, courses: Iterable[CourseRecord]) -> Dict[str, List[str]]:
+        """Add one university's courses; returns the rejected prerequisites by course code"""
+        rejected = {}
+        for course in courses:
+            cyclic = self.add_course(course, university)
+            if cyclic:
+                rejected[normalize_code(course.code)] = cyclic
+        return rejected
+
+    @classmethod
+    def from_courses(cls, courses: Iterable[CourseRecord], university: str = '') -> "PrerequisiteGraph":
+        graph = cls()
+        graph.add_catalog(university, courses)
+        return graph
+
+    def topological_order(self) -> List[CourseKey]:
+        """All (university, code) keys, every course after its prerequisites"""
+        if self._order_keys is None:
+            self._order_keys = [self.keys[node] for node in self._order]
+        return self._order_keys
+
+    def prerequisites(self, code: str, university: str = '') -> List[str]:
+        """Direct prerequisites of a course"""
+        return [self.keys[p][1] for p in self._prereqs[self._id(code, university)]]
+
+    def dependents(self, code: str, university: str = '') -> List[str]:
+        """Courses that list this course as a direct prerequisite"""
+        return [self.keys[d][1] for d in self._dependents[self._id(code, university)]]
+
+    def _closure(self, node: int) -> FrozenSet[int]:
+        closures = self._closures
+        stack = [node]
+        while stack:
+            current = stack[-1]
+            if current in closures:
+                stack.pop()
+                continue
+            pending = [p for p in self._prereqs[current] if p not in closures]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            prereqs = self._prereqs[current]
+            closures[current] = frozenset(prereqs).union(*(closures[p] for p in prereqs))
+        return closures[node]
+
+    def transitive_prerequisites(self, code: str, university: str = '') -> List[str]:
+        """Every course needed before this one, in a valid order to take them"""
+        closure = self._closure(self._id(code, university))
+        return [self.keys[node][1] for node in sorted(closure, key=self._position.__getitem__)]
+
+    def depth(self, code: str, university: str = '') -> int:
+        """Length of the longest prerequisite chain leading to a course (0 if it has none)"""
+        return self._depth(self._id(code, university))
+
+    def _depth(self, node: int) -> int:
+        depths = self._depths
+        stack = [node]
+        while stack:
+            current = stack[-1]
+            if current in depths:
+                stack.pop()
+                continue
+            pending = [p for p in self._prereqs[current] if p not in depths]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            depths[current] = 1 + max((depths[p] for p in self._prereqs[current]), default=-1)
+        return depths[node]
+
+    def mind_map(self, code: str, levels: int = 2, university: str = '') -> Dict:
+        """
+        Prerequisite tree of a course in the node format MindMap.tsx renders.
+
+        Args:
+            code: Target course, used as the 'main' node
+            levels: Prerequisite levels below the target ('category', then 'subcategory')
+            university: University offering the course
+
+        Returns:
+            Dict with id, name, type, description and children
+        """
+        node_types = ['main', 'category', 'subcategory']
+
+        def build(node: int, level: int) -> Dict:
+            code = self.keys[node][1]
+            entry = {
+                'id': code,
+                'name': f"{code} {self.titles[node]}".strip(),
+                'type': node_types[min(level, len(node_types) - 1)],
+                'description': (
+                    f"{len(self._closure(node))} prerequisite courses, "
+                    f"longest chain {self._depth(node)}"
+                )
+            }
+            if level < levels and self._prereqs[node]:
+                entry['children'] = [build(p, level + 1) for p in self._prereqs[node]]
+            return entry
+
+        return build(self._id(code, university), 0)
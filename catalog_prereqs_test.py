@@ -0,0 +1,120 @@
+"""
+Tests for prerequisite parsing and the incrementally ordered PrerequisiteGraph.
+
+    python -m pytest catalog_prereqs_test.py
+"""
+import random
+
+import pytest
+
+from catalog_extract import CourseRecord
+from catalog_prereqs import PrerequisiteGraph, normalize_code, parse_prerequisite_codes
+
+@pytest.mark.parametrize('code, expected', [
+    ('cs106a', 'CS 106A'),
+    ('CS-106A', 'CS 106A'),
+    ('CS 106A', 'CS 106A'),
+    ('MIT 6.006', 'MIT 6.006'),
+    ('6.006', '6.006'),
+    ('18.06', '18.06'),
+    ('6.S191', '6.S191'),
+    ('21m.301', '21M.301'),
+])
+def test_normalize_code(code, expected):
+    assert normalize_code(code) == expected
+
+def test_parse_subject_codes_and_continuations():
+    text = 'CS 106A or 106B, and MATH 51, 52; or consent of instructor'
+    assert parse_prerequisite_codes(text) == ['CS 106A', 'CS 106B', 'MATH 51', 'MATH 52']
+
+def test_parse_dotted_codes_only_when_asked():
+    text = '6.1200 and (18.06 or 18.C06); a 3.00 GPA; 2.0 units of 6.100A'
+    assert parse_prerequisite_codes(text) == []
+    assert parse_prerequisite_codes(text, dotted=True) == ['6.1200', '18.06', '18.C06', '6.100A']
+
+def _course(code, prerequisites=None):
+    return CourseRecord(code=code, title=f"Title of {code}", prerequisites=prerequisites)
+
+def test_mit_catalog_prerequisites():
+    graph = PrerequisiteGraph.from_courses([
+        _course('6.1200', '18.01'),
+        _course('6.1210', '6.100A and 6.1200'),
+        _course('6.006', '6.1210'),
+    ], university='MIT')
+    assert graph.prerequisites('6.1210', 'MIT') == ['6.100A', '6.1200']
+    transitive = graph.transitive_prerequisites('6.006', 'mit')
+    assert set(transitive) == {'18.01', '6.100A', '6.1200', '6.1210'}
+    assert transitive.index('18.01') < transitive.index('6.1200') < transitive.index('6.1210')
+    assert graph.depth('6.006', 'MIT') == 3
+
+def test_universities_are_separate_namespaces():
+    graph = PrerequisiteGraph()
+    graph.add_catalog('Stanford University', [_course('CS 161', 'CS 106B'), _course('CS 106B', 'CS 106A')])
+    graph.add_catalog('UC Berkeley', [_course('CS 161', 'CS 61B')])
+    assert graph.prerequisites('CS 161', 'Stanford University') == ['CS 106B']
+    assert graph.prerequisites('CS 161', 'UC Berkeley') == ['CS 61B']
+    assert graph.depth('CS 161', 'stanford university') == 2
+    assert graph.depth('CS 161', 'UC Berkeley') == 1
+    assert ('UC Berkeley', 'CS 61B') in graph
+    assert ('Stanford University', 'CS 61B') not in graph
+    with pytest.raises(KeyError):
+        graph.prerequisites('CS 161')
+    # Stanford's CS 161 needs its CS 106B; Berkeley's CS 106B is a different course
+    assert graph.set_prerequisites('CS 106B', ['CS 161'], 'Stanford University') == ['CS 161']
+    assert graph.set_prerequisites('CS 106B', ['CS 161'], 'UC Berkeley') == []
+
+def _reachable(edges, start):
+    seen, stack = set(), [start]
+    while stack:
+        for neighbor in edges.get(stack.pop(), ()):
+            if neighbor not in seen:
+                seen.add(neighbor)
+                stack.append(neighbor)
+    return seen
+
+def test_random_updates_keep_a_valid_order_and_reject_cycles():
+    rng = random.Random(7)
+    codes = [f"CS {number}" for number in range(100, 160)]
+    graph = PrerequisiteGraph()
+    expected = {}
+    for _ in range(3000):
+        code = rng.choice(codes)
+        wanted = rng.sample(codes, rng.randint(0, 3))
+        rejected = graph.set_prerequisites(code, wanted)
+        # Brute force: each wanted edge goes in unless the course is already needed by it
+        kept = []
+        expected[code] = []
+        for prereq in dict.fromkeys(wanted):
+            if prereq == code:
+                continue
+            if code in _reachable(expected, prereq):
+                assert prereq in rejected
+            else:
+                kept.append(prereq)
+                expected[code] = kept
+        assert sorted(graph.prerequisites(code)) == sorted(expected[code])
+
+        order = [code for _, code in graph.topological_order()]
+        position = {code: i for i, code in enumerate(order)}
+        assert len(order) == len(graph)
+        for course, prereqs in expected.items():
+            for prereq in prereqs:
+                assert position[prereq] < position[course]
+
+        probe = rng.choice(codes)
+        if probe in graph:
+            closure = _reachable(expected, probe)
+            transitive = graph.transitive_prerequisites(probe)
+            assert set(transitive) == closure
+            assert all(position[a] < position[b] for a, b in zip(transitive, transitive[1:]))
+
+def test_mind_map():
+    graph = PrerequisiteGraph.from_courses([
+        _course('CS 161', 'CS 106B and CS 103'), _course('CS 106B', 'CS 106A'),
+    ])
+    tree = graph.mind_map('CS 161', levels=1)
+    assert tree['id'] == 'CS 161' and tree['type'] == 'main'
+    assert tree['name'] == 'CS 161 Title of CS 161'
+    assert [child['id'] for child in tree['children']] == ['CS 106B', 'CS 103']
+    assert all('children' not in child for child in tree['children'])
+    assert tree['description'] == '3 prerequisite courses, longest chain 2'
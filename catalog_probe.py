@@ -0,0 +1,109 @@
+import asyncio
+import re
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple, TypeVar
+
+from catalog_indicators import COURSE_LISTING_INDICATORS, IndicatorMatches
+
+R = TypeVar('R')
+
+# Where catalogs usually live relative to the institution's domain
+DEFAULT_HOSTS = ('catalog.{domain}', '{domain}')
+# Values tried for the '*' segment of a template
+DEFAULT_SECTIONS = ('undergraduate',)
+DEFAULT_MAX_CANDIDATES = 12
+DEFAULT_MIN_SCORE = 0.8
+
+_TEMPLATE_LINE = re.compile(r'^\s*\d+\.\s+(/\S*)\s*$', re.MULTILINE)
+_LISTING_INDICATORS = frozenset(COURSE_LISTING_INDICATORS)
+
+def templates_from_instructions(instructions: str) -> List[str]:
+    """URL path templates listed as numbered lines (e.g. '1. /catalog/*/cs/#coursestext') in agent instructions"""
+    return _TEMPLATE_LINE.findall(instructions)
+
+def _split_domain(domain: str) -> Tuple[str, str]:
+    """Scheme (https unless one is given) and bare domain, without 'www.' or a path"""
+    match = re.match(r'([a-z][a-z0-9+.-]*)://', domain.strip().lower())
+    scheme = match.group(1) if match else 'https'
+    domain = domain.strip().lower()[match.end() if match else 0:].split('/')[0]
+    return scheme, domain[4:] if domain.startswith('www.') else domain
+
+def candidate_urls(
+    domain: str,
+    templates: Sequence[str],
+    hosts: Sequence[str] = DEFAULT_HOSTS,
+    sections: Sequence[str] = DEFAULT_SECTIONS,
+    max_candidates: int = DEFAULT_MAX_CANDIDATES
+) -> List[str]:
+    """
+    Expand path templates on an institution's domain into probe URLs, most likely first.
+
+    Templates that differ only in their anchor fetch the same page, so fragments are
+    dropped and the anchor is picked from the page content afterwards.
+
+    Args:
+        domain: Institution domain, e.g. 'mit.edu'; 'www.' and any path are ignored, and
+            URLs use https unless the domain carries another scheme
+        templates: Paths in priority order; '*' stands for one of sections
+        hosts: Host patterns tried for each template, with {domain} filled in
+        sections: Values substituted for '*'
+        max_candidates: Cap on the number of URLs returned
+    """
+    scheme, domain = _split_domain(domain)
+    urls = []
+    for template in templates:
+        path = template.split('#')[0]
+        paths = [path.replace('*', section) for section in sections] if '*' in path else [path]
+        for host in hosts:
+            for expanded in paths:
+                urls.append(f"{scheme}://{host.format(domain=domain)}{expanded}")
+    return list(dict.fromkeys(urls))[:max_candidates]
+
+def probe_score(matches: IndicatorMatches) -> float:
+    """
+    Confidence in [0, 1] that a page is a course listing, from an exhaustive indicator scan.
+
+    Up to three distinct indicators count 0.15 each, a course listing pattern
+    (e.g. 'cs 101', or a university-specific course number) 0.35, and a course
+    section anchor 0.2, so a page needs listings plus corroboration to reach 0.8.
+    """
+    score = 0.15 * min(3, len(matches.indicators))
+    if matches.university_pattern_matched or matches.indicators & _LISTING_INDICATORS:
+        score += 0.35
+    if matches.anchors:
+        score += 0.2
+    return round(score, 2)
+
+async def first_confident(
+    candidates: Sequence[str],
+    probe: Callable[[str], Awaitable[Optional[Tuple[float, R]]]],
+    min_score: float = DEFAULT_MIN_SCORE
+) -> Optional[Tuple[str, float, R]]:
+    """
+    Probe every candidate concurrently and return the first one, in candidate order, scoring min_score.
+
+    A candidate is only chosen once every candidate ahead of it has been ruled out, so
+    the answer does not depend on which server replied first; probes still in flight
+    are cancelled as soon as it is settled.
+
+    Args:
+        candidates: URLs in priority order
+        probe: Returns (score, result) for a URL, or None if there is nothing there
+        min_score: Lowest score accepted
+
+    Returns:
+        (url, score, result) of the chosen candidate, or None if none qualified
+    """
+    tasks = [asyncio.ensure_future(probe(url)) for url in candidates]
+    try:
+        for url, task in zip(candidates, tasks):
+            try:
+                outcome = await task
+            except Exception:
+                continue
+            if outcome is not None and outcome[0] >= min_score:
+                return url, outcome[0], outcome[1]
+        return None
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,167 @@
+"""
+Offline re-analysis of stored catalog pages, without touching the network.
+
+    python catalog_reanalyze.py --output verdicts.jsonl
+    python catalog_reanalyze.py --all --courses
+
+Runs verify_url's checks (see get_uni_courses.verify_stored) against the copies kept in
+the page store: by default for every cached catalog, with its university's patterns, or
+with --all for every stored URL. Use it to see what changes after editing the indicators
+or university patterns. With --courses, courses are also extracted from each page. The
+summary counts pages analyzed, pages missing from the store and changed verdicts.
+
+With --workers N, pages are analyzed by N processes (0 for one per core), each reading
+the memory-mapped store itself, so only URLs and verdicts cross process boundaries.
+"""
+import argparse
+import sys
+import time
+from typing import Any, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import BaseModel
+
+import get_uni_courses
+from catalog_analysis import AnalysisPool
+from catalog_extract import iter_courses
+from catalog_store import get_page_store
+from get_uni_courses import URLVerificationResult
+
+# Pages handed to a worker at a time
+WORKER_CHUNK_SIZE = 16
+
+class ReanalysisResult(BaseModel):
+    url: str
+    university_name: str = ""
+    # None when the page store has no copy of the URL
+    verification_status: Optional[URLVerificationResult] = None
+    # Verdict from the last online verification, when re-checking a cached catalog
+    previous_contains_cs_courses: Optional[bool] = None
+    courses: Optional[int] = None
+
+    @property
+    def changed(self) -> bool:
+        return (
+            self.verification_status is not None
+            and self.previous_contains_cs_courses is not None
+            and self.verification_status.contains_cs_courses != self.previous_contains_cs_courses
+        )
+
+class ReanalysisReport(BaseModel):
+    pages: int = 0
+    missing: int = 0
+    contains_cs_courses: int = 0
+    changed: int = 0
+    courses: int = 0
+    seconds: float = 0.0
+
+    def add(self, result: ReanalysisResult) -> None:
+        self.pages += 1
+        if result.verification_status is None:
+            self.missing += 1
+            return
+        self.contains_cs_courses += result.verification_status.contains_cs_courses
+        self.changed += result.changed
+        self.courses += result.courses or 0
+
+    def summary(self) -> str:
+        analyzed = self.pages - self.missing
+        rate = analyzed / self.seconds if self.seconds else 0.0
+        return (
+            f"Re-analyzed {analyzed} of {self.pages} pages ({self.missing} not stored) in {self.seconds:.1f}s "
+            f"({rate:.0f} pages/s): {self.contains_cs_courses} list CS courses, {self.changed} verdicts changed, "
+            f"{self.courses} courses"
+        )
+
+def reanalyze_page(
+    url: str,
+    university_name: str = "",
+    previous_contains_cs_courses: Optional[bool] = None,
+    courses: bool = False
+) -> ReanalysisResult:
+    """Re-check one stored page and optionally count the courses on it"""
+    result = ReanalysisResult(
+        url=url,
+        university_name=university_name,
+        verification_status=get_uni_courses.verify_stored(url, university_name),
+        previous_contains_cs_courses=previous_contains_cs_courses
+    )
+    if courses and result.verification_status is not None:
+        text = get_uni_courses.stored_page_text(result.verification_status.url)
+        result.courses = sum(1 for _ in iter_courses([text or '']))
+    return result
+
+def _reanalyze_target(target: Tuple[Any, ...]) -> ReanalysisResult:
+    return reanalyze_page(*target)
+
+def stored_targets(all_pages: bool = False) -> Iterator[Tuple[str, str, Optional[bool]]]:
+    """(url, university_name, previous verdict) for every cached catalog, or every stored URL"""
+    if all_pages:
+        store = get_page_store()
+        if store is None:
+            return
+        for url in store.urls():
+            yield url, "", None
+        return
+    for catalog in get_uni_courses.get_catalog_cache().values():
+        yield catalog.catalog_url, catalog.university_name, catalog.verification_status.contains_cs_courses
+
+def run_reanalysis(
+    targets: Iterable[Tuple[str, str, Optional[bool]]],
+    courses: bool = False,
+    output: Optional[TextIO] = None,
+    workers: Optional[int] = None
+) -> ReanalysisReport:
+    """
+    Re-analyze stored pages and tally the verdicts.
+
+    Args:
+        targets: (url, university_name, previous verdict or None), e.g. from stored_targets()
+        courses: Also extract courses from each page
+        output: If given, receives one JSON line per page
+        workers: Worker processes to analyze on (0 for one per core); None analyzes inline
+
+    Returns:
+        ReanalysisReport with page, verdict and course counts
+    """
+    report = ReanalysisReport()
+    start = time.perf_counter()
+    pool = AnalysisPool(workers or None) if workers is not None else None
+    try:
+        work = ((url, university_name, previous, courses) for url, university_name, previous in targets)
+        if pool is not None:
+            results = pool.map(_reanalyze_target, work, chunksize=WORKER_CHUNK_SIZE)
+        else:
+            results = map(_reanalyze_target, work)
+        for result in results:
+            report.add(result)
+            if output is not None:
+                output.write(result.model_dump_json() + '\n')
+    finally:
+        if pool is not None:
+            pool.close()
+    report.seconds = time.perf_counter() - start
+    return report
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-o', '--output', help="JSONL file for per-page results ('-' for stdout)")
+    parser.add_argument('--all', action='store_true', help='every stored URL instead of the cached catalogs')
+    parser.add_argument('--courses', action='store_true', help='also extract courses from each page')
+    parser.add_argument('-w', '--workers', type=int, help='worker processes (0 for one per core; default inline)')
+    args = parser.parse_args(argv)
+
+    if get_page_store() is None:
+        print("The page store is turned off; turn it on with CATALOG_PAGE_STORE=1", file=sys.stderr)
+        return 1
+    to_stdout = args.output == '-'
+    output = sys.stdout if to_stdout else open(args.output, 'w', encoding='utf-8') if args.output else None
+    try:
+        report = run_reanalysis(stored_targets(args.all), args.courses, output, args.workers)
+    finally:
+        if output is not None and not to_stdout:
+            output.close()
+    print(report.summary(), file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
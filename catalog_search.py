@@ -0,0 +1,863 @@
+"""
+Ranked course search across every indexed university.
+
+    python catalog_search.py update
+    python catalog_search.py add courses.jsonl
+    python catalog_search.py search "machine learning" --limit 10
+    python catalog_search.py complete "intro to prog"
+
+'update' indexes the courses of every cached catalog from the copies in the page store,
+without touching the network; 'add' reads JSON lines of {"university_name",
+"catalog_url", "courses": [CourseRecord, ...]}. Re-adding a university replaces its
+courses. With CATALOG_SEARCH_INDEX=1, catalogs are also indexed as
+get_uni_courses.get_university_courses lists them.
+
+The index is a directory of immutable, memory-mapped segment files plus a manifest
+naming the live segments and, per university, the segment holding its current courses.
+Each update writes a new segment; segments are merged once there are more than
+MAX_SEGMENTS of them or most of a segment's courses have been replaced.
+"""
+import argparse
+import bisect
+import functools
+import gzip
+import heapq
+import itertools
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import zlib
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from catalog_cache import canonicalize_university_name, default_cache_path
+from catalog_extract import CourseRecord, iter_courses
+
+try:
+    import fcntl
+except ImportError:
+    # Without flock, only one process at a time may update an index
+    fcntl = None
+
+MAGIC = b'CSIX'
+FORMAT_VERSION = 1
+MANIFEST_VERSION = 1
+
+# BM25 parameters, and field weights applied to term frequencies (a simple BM25F)
+K1 = 1.2
+B = 0.75
+CODE_WEIGHT = 3
+TITLE_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+# BM25 contributions are stored quantized to levels 1-255 of this many levels per unit,
+# the same in every segment so scores from different segments add up and compare
+IMPACT_SCALE = 8.0
+
+DEFAULT_LIMIT = 10
+# Postings scored per segment before a query settles for the best results so far
+DEFAULT_MAX_POSTINGS = 30_000
+# Completions precomputed for prefixes up to this many characters; longer ones scan the vocabulary
+PREFIX_TOP_LENGTH = 3
+COMPLETIONS_PER_PREFIX = 16
+MAX_COMPLETION_SCAN = 4096
+# Completions of a query's last word searched for as-you-type results
+MAX_PREFIX_EXPANSIONS = 8
+MAX_SEGMENTS = 8
+# Segments with more than this share of replaced courses are rewritten
+MAX_DEAD_SHARE = 0.5
+
+# The source records kept for merges are read back rarely; favour write speed
+SOURCE_COMPRESSION_LEVEL = 1
+
+STOPWORDS = frozenset({'a', 'an', 'and', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'with'})
+
+# Sections of a segment file, in file order; each is a u32 array except the string blob.
+# term_table is an open-addressing hash table of term id + 1 by CRC-32 of the term.
+_SECTIONS = (
+    'blob',
+    'term_names', 'term_stats', 'term_table', 'impact_runs', 'postings',
+    'prefix_names', 'prefix_ranges', 'prefix_terms',
+    'doc_fields', 'doc_universities', 'universities',
+)
+_HEADER = struct.Struct('<4sIIIIQ')
+_SECTION = struct.Struct('<QQ')
+_WORD = re.compile(r'\w+')
+_FIELD_SEPARATOR = '\x1f'
+
+class CatalogCourses(BaseModel):
+    university_name: str
+    catalog_url: str
+    courses: List[CourseRecord]
+
+class CourseHit(BaseModel):
+    university_name: str
+    catalog_url: str
+    code: str
+    title: str
+    credits: Optional[str] = None
+    score: float
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words of a text, without stopwords"""
+    return [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+def _code_tokens(code: str) -> List[str]:
+    # 'CS 101' is found as 'cs 101' and as 'cs101'
+    words = tokenize(code)
+    return words + [''.join(words)] if len(words) > 1 else words
+
+def _document_terms(course: CourseRecord) -> Counter:
+    terms = Counter(tokenize(course.description))
+    if DESCRIPTION_WEIGHT != 1:
+        for token in terms:
+            terms[token] *= DESCRIPTION_WEIGHT
+    for tokens, weight in ((_code_tokens(course.code), CODE_WEIGHT), (tokenize(course.title), TITLE_WEIGHT)):
+        for token in tokens:
+            terms[token] += weight
+    return terms
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def _swapped(section: memoryview) -> array:
+    values = array('I', section.tobytes())
+    values.byteswap()
+    return values
+
+def build_segment(catalogs: Iterable[CatalogCourses], path: str, base: Sequence['_Segment'] = ()) -> int:
+    """
+    Write a segment file for a set of catalogs, and next to it their source records for later merges.
+
+    Args:
+        catalogs: Catalogs to index, each university at most once
+        path: Segment file to write; replaced atomically
+        base: Segments searched alongside this one, whose document counts, lengths and
+            term frequencies are included in the BM25 statistics so scores stay comparable
+
+    Returns:
+        Number of courses indexed
+    """
+    source_path = _source_path(path) + '.tmp'
+    try:
+        return _write_segment(catalogs, path, source_path, base)
+    except BaseException:
+        if os.path.exists(source_path):
+            os.unlink(source_path)
+        raise
+
+def _write_segment(catalogs: Iterable[CatalogCourses], path: str, source_path: str, base: Sequence['_Segment']) -> int:
+    blob = bytearray()
+    doc_fields = array('I')
+    doc_universities = array('I')
+    doc_lengths = array('I')
+    universities = array('I')
+    postings: Dict[str, Tuple[array, array]] = {}
+
+    def string(value: str) -> Tuple[int, int]:
+        encoded = value.encode('utf-8')
+        blob.extend(encoded)
+        return len(blob) - len(encoded), len(encoded)
+
+    with gzip.open(source_path, 'wt', compresslevel=SOURCE_COMPRESSION_LEVEL, encoding='utf-8') as source:
+        for catalog in catalogs:
+            source.write(catalog.model_dump_json() + '\n')
+            university = len(universities) // 6
+            first = len(doc_universities)
+            for course in catalog.courses:
+                doc = len(doc_universities)
+                terms = _document_terms(course)
+                doc_fields.extend(string(_FIELD_SEPARATOR.join((course.code, course.title, course.credits or ''))))
+                doc_universities.append(university)
+                doc_lengths.append(sum(terms.values()))
+                for term, frequency in terms.items():
+                    entry = postings.get(term)
+                    if entry is None:
+                        entry = postings[term] = (array('I'), array('H'))
+                    entry[0].append(doc)
+                    entry[1].append(min(frequency, 0xFFFF))
+            universities.extend(string(catalog.university_name) + string(catalog.catalog_url))
+            universities.extend((first, len(doc_universities) - first))
+
+    doc_count = len(doc_universities)
+    collection_size = doc_count + sum(segment.doc_count for segment in base)
+    total_length = sum(doc_lengths)
+    average_length = (total_length + sum(segment.total_length for segment in base)) / max(collection_size, 1)
+
+    # Terms in UTF-8 byte order, so the reader can binary-search the raw bytes
+    terms = sorted(postings, key=lambda term: term.encode('utf-8'))
+    term_names = array('I')
+    term_stats = array('I')
+    impact_runs = array('I')
+    postings_out = array('I')
+    for term in terms:
+        docs, frequencies = postings.pop(term)
+        frequency = len(docs) + sum(segment.document_frequency(term) for segment in base)
+        scale = IMPACT_SCALE * (K1 + 1) * math.log(1 + (collection_size - frequency + 0.5) / (frequency + 0.5))
+        # Few distinct (frequency, length) pairs occur, so each level is computed once
+        level = functools.lru_cache(maxsize=None)(
+            lambda tf, length: min(255, max(1, round(scale * tf / (tf + K1 * (1 - B + B * length / average_length)))))
+        )
+        levels = list(map(level, frequencies, map(doc_lengths.__getitem__, docs)))
+        term_names.extend(string(term))
+        term_stats.extend((len(docs), len(impact_runs) // 3))
+        # Postings in decreasing impact, documents in increasing order within a level
+        order = sorted(range(len(docs)), key=levels.__getitem__, reverse=True)
+        runs = 0
+        for level, group in itertools.groupby(order, key=levels.__getitem__):
+            start = len(postings_out)
+            postings_out.extend(docs[i] for i in group)
+            impact_runs.extend((level, start, len(postings_out) - start))
+            runs += 1
+        term_stats.append(runs)
+
+    capacity = 8
+    while capacity < 2 * len(terms):
+        capacity *= 2
+    term_table = array('I', [0]) * capacity
+    for term_id, term in enumerate(terms):
+        slot = zlib.crc32(term.encode('utf-8')) & (capacity - 1)
+        while term_table[slot]:
+            slot = (slot + 1) & (capacity - 1)
+        term_table[slot] = term_id + 1
+
+    prefixes: Dict[str, List[int]] = {}
+    for term_id, term in enumerate(terms):
+        for length in range(1, min(len(term), PREFIX_TOP_LENGTH) + 1):
+            prefixes.setdefault(term[:length], []).append(term_id)
+    prefix_names = array('I')
+    prefix_ranges = array('I')
+    prefix_terms = array('I')
+    for prefix in sorted(prefixes, key=lambda prefix: prefix.encode('utf-8')):
+        top = heapq.nlargest(COMPLETIONS_PER_PREFIX, prefixes[prefix], key=lambda term_id: term_stats[3 * term_id])
+        prefix_names.extend(string(prefix))
+        prefix_ranges.extend((len(prefix_terms), len(top)))
+        prefix_terms.extend(top)
+
+    sections = {
+        'term_names': term_names, 'term_stats': term_stats, 'term_table': term_table, 'impact_runs': impact_runs, 'postings': postings_out,
+        'prefix_names': prefix_names, 'prefix_ranges': prefix_ranges, 'prefix_terms': prefix_terms,
+        'doc_fields': doc_fields, 'doc_universities': doc_universities, 'universities': universities,
+    }
+    payloads = [bytes(blob) if name == 'blob' else _little_endian(sections[name]) for name in _SECTIONS]
+    offset = _HEADER.size + _SECTION.size * len(_SECTIONS)
+    layout = []
+    for data in payloads:
+        offset += -offset % 8
+        layout.append((offset, len(data)))
+        offset += len(data)
+
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.segment-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, doc_count, len(terms), len(universities) // 6, total_length))
+            for section_offset, length in layout:
+                f.write(_SECTION.pack(section_offset, length))
+            for (section_offset, _), data in zip(layout, payloads):
+                f.write(b'\0' * (section_offset - f.tell()))
+                f.write(data)
+        os.replace(source_path, _source_path(path))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return doc_count
+
+def _source_path(segment_path: str) -> str:
+    return segment_path[:-len('.idx')] + '.jsonl.gz'
+
+def _threshold(scores: Dict[int, int], count: int) -> int:
+    """The count-th highest score"""
+    if len(scores) < count:
+        return 0
+    return heapq.nlargest(count, scores.values())[-1]
+
+class _Strings:
+    """Sequence view of a (offset, length) string table, so bisect can search it"""
+
+    def __init__(self, segment: '_Segment', table: memoryview):
+        self.segment = segment
+        self.table = table
+
+    def __len__(self) -> int:
+        return len(self.table) // 2
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.segment._bytes(self.table[2 * i], self.table[2 * i + 1])
+
+class _Segment:
+    """A segment file built by build_segment, memory-mapped read-only"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)[:-len('.idx')]
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.doc_count, self.term_count, self.university_count, self.total_length = (
+            _HEADER.unpack_from(self._mmap, 0)
+        )
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} course search segment")
+        view = memoryview(self._mmap)
+        self._views = []
+        for i, name in enumerate(_SECTIONS):
+            offset, length = _SECTION.unpack_from(self._mmap, _HEADER.size + i * _SECTION.size)
+            if name == 'blob':
+                self._blob_offset = offset
+                continue
+            section = view[offset:offset + length]
+            section = memoryview(_swapped(section)) if sys.byteorder == 'big' else section.cast('I')
+            self._views.append(section)
+            setattr(self, '_' + name, section)
+        self._views.append(view)
+        self._terms = _Strings(self, self._term_names)
+        self._prefixes = _Strings(self, self._prefix_names)
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        self._mmap.close()
+
+    def _bytes(self, offset: int, length: int) -> bytes:
+        start = self._blob_offset + offset
+        return self._mmap[start:start + length]
+
+    def term_id(self, term: bytes) -> Optional[int]:
+        table = self._term_table
+        mask = len(table) - 1
+        slot = zlib.crc32(term) & mask
+        while True:
+            value = table[slot]
+            if not value:
+                return None
+            if self._terms[value - 1] == term:
+                return value - 1
+            slot = (slot + 1) & mask
+
+    def document_frequency(self, term: str) -> int:
+        term_id = self.term_id(term.encode('utf-8'))
+        return 0 if term_id is None else self._term_stats[3 * term_id]
+
+    @functools.cached_property
+    def university_keys(self) -> List[str]:
+        """Canonical name of each university in the segment"""
+        table = self._universities
+        return [
+            canonicalize_university_name(self._bytes(table[6 * i], table[6 * i + 1]).decode('utf-8'))
+            for i in range(self.university_count)
+        ]
+
+    def university_docs(self, university: int) -> int:
+        return self._universities[6 * university + 5]
+
+    def completions(self, prefix: str, limit: int) -> List[Tuple[bytes, int]]:
+        """Up to limit (term, document frequency) pairs of terms starting with prefix, most frequent first"""
+        if len(prefix) <= PREFIX_TOP_LENGTH:
+            key = prefix.encode('utf-8')
+            i = bisect.bisect_left(self._prefixes, key)
+            if i == len(self._prefixes) or self._prefixes[i] != key:
+                return []
+            start, count = self._prefix_ranges[2 * i], self._prefix_ranges[2 * i + 1]
+            term_ids = self._prefix_terms[start:start + min(count, limit)]
+        else:
+            key = prefix.encode('utf-8')
+            low = bisect.bisect_left(self._terms, key)
+            # No UTF-8 sequence contains 0xff, so this sorts after every term with the prefix
+            high = bisect.bisect_left(self._terms, key + b'\xff', low)
+            term_ids = heapq.nlargest(
+                limit, range(low, min(high, low + MAX_COMPLETION_SCAN)), key=lambda term_id: self._term_stats[3 * term_id]
+            )
+        return [(self._terms[term_id], self._term_stats[3 * term_id]) for term_id in term_ids]
+
+    def top(
+        self,
+        query: Dict[bytes, int],
+        limit: int,
+        max_postings: int,
+        dead: frozenset
+    ) -> List[Tuple[int, int]]:
+        """
+        Best-scoring live documents for weighted query terms, as (score in levels, doc) pairs.
+
+        Runs of postings are scored in decreasing impact across all query terms, so the
+        documents a term matters most to are seen first. Once no document not yet seen
+        could beat the top, later runs only add to the documents already scored. After
+        max_postings postings' worth of work the best documents found so far are returned.
+        """
+        runs = []
+        heads: List[List[int]] = []
+        for term, weight in query.items():
+            term_id = self.term_id(term)
+            if term_id is None:
+                continue
+            first, count = self._term_stats[3 * term_id + 1], self._term_stats[3 * term_id + 2]
+            scores = []
+            for run in range(first, first + count):
+                level, start, length = self._impact_runs[3 * run:3 * run + 3]
+                scores.append(level * weight)
+                runs.append((level * weight, len(heads), start, length))
+            heads.append(scores)
+        # Stable, so each term's runs stay in their own decreasing order
+        runs.sort(key=itemgetter(0), reverse=True)
+        universities = self._doc_universities
+        work = 0
+
+        if len(heads) == 1:
+            # Postings of a single term come in final order: the first live ones are the best
+            top = []
+            for score, _, start, length in runs:
+                for doc in self._postings[start:start + length]:
+                    if not dead or universities[doc] not in dead:
+                        top.append((score, doc))
+                        if len(top) == limit:
+                            return top
+                work += length
+                if work >= max_postings:
+                    break
+            return top
+
+        # Some of the best documents may belong to replaced universities
+        wanted = 2 * limit if dead else limit
+        remaining = [scores[0] for scores in heads]
+        seen = [0] * len(heads)
+        scores: Dict[int, int] = {}
+        closed = False
+        unchecked = 0
+        for score, term, start, length in runs:
+            if work >= max_postings:
+                break
+            seen[term] += 1
+            remaining[term] = heads[term][seen[term]] if seen[term] < len(heads[term]) else 0
+            # A run cut short keeps its lowest documents, which win ties anyway
+            length = min(length, max_postings - work)
+            docs = self._postings[start:start + length]
+            # Checking takes a pass over the scores, so it waits for half as many postings
+            if not closed and len(scores) >= wanted and 2 * (unchecked + length) >= len(scores):
+                # The most a document not scored yet can still get; at best it ties the top
+                bound = score + sum(remaining) - remaining[term]
+                threshold = _threshold(scores, wanted)
+                closed = threshold >= bound
+                unchecked = 0
+                if closed and not dead:
+                    # Neither can a document that stays below the top with everything left
+                    scores = {doc: value for doc, value in scores.items() if value + bound >= threshold}
+            if not closed and not any(remaining) and len(scores) + length > wanted:
+                # The last run: its new documents all end on this score, so only the lowest
+                # live ones can make the top
+                for doc in scores.keys() & docs:
+                    scores[doc] += score
+                added = 0
+                for doc in docs:
+                    if doc not in scores and (not dead or universities[doc] not in dead):
+                        scores[doc] = score
+                        added += 1
+                        if added == wanted:
+                            break
+                work += length
+            elif not closed:
+                get = scores.get
+                docs = docs.tolist()
+                scores.update(zip(docs, [get(doc, 0) + score for doc in docs]))
+                unchecked += length
+                work += length
+            elif length <= 8 * len(scores):
+                for doc in scores.keys() & docs:
+                    scores[doc] += score
+                work += length
+            else:
+                # Look the scored documents up in the run instead (its documents are sorted)
+                for doc in scores:
+                    i = bisect.bisect_left(docs, doc)
+                    if i < length and docs[i] == doc:
+                        scores[doc] += score
+                work += len(scores)
+
+        best = self._best(scores, wanted)
+        live = [(score, doc) for score, doc in best if not dead or universities[doc] not in dead]
+        if len(live) < limit and len(scores) > wanted:
+            live = [(score, doc) for score, doc in self._best(scores, len(scores)) if universities[doc] not in dead]
+        return live[:limit]
+
+    @staticmethod
+    def _best(scores: Dict[int, int], count: int) -> List[Tuple[int, int]]:
+        """The count highest (score, doc) pairs, best first; ties go to the lower doc"""
+        if len(scores) > count:
+            threshold = _threshold(scores, count)
+            above = list(itertools.compress(scores, map(threshold.__lt__, scores.values())))
+            tied = sorted(itertools.compress(scores, map(threshold.__eq__, scores.values())))[:count - len(above)]
+            candidates = [(scores[doc], doc) for doc in above] + [(threshold, doc) for doc in tied]
+        else:
+            candidates = [(score, doc) for doc, score in scores.items()]
+        candidates.sort(key=lambda candidate: (-candidate[0], candidate[1]))
+        return candidates
+
+    def hit(self, doc: int, score: int) -> CourseHit:
+        code, title, credits = self._bytes(self._doc_fields[2 * doc], self._doc_fields[2 * doc + 1]).decode(
+            'utf-8'
+        ).split(_FIELD_SEPARATOR)
+        university = self._universities[6 * self._doc_universities[doc]:6 * self._doc_universities[doc] + 4]
+        return CourseHit(
+            university_name=self._bytes(university[0], university[1]).decode('utf-8'),
+            catalog_url=self._bytes(university[2], university[3]).decode('utf-8'),
+            code=code,
+            title=title,
+            credits=credits or None,
+            score=round(score / IMPACT_SCALE, 3)
+        )
+
+    def catalogs(self) -> Iterator[CatalogCourses]:
+        """The source records the segment was built from"""
+        with gzip.open(_source_path(self.path), 'rt', encoding='utf-8') as f:
+            for line in f:
+                yield CatalogCourses.model_validate_json(line)
+
+class CourseIndex:
+    """
+    Incrementally updated course search index (see the module docstring for the layout).
+
+    Any number of processes can search an index while one updates it: updates write new
+    segment files and then replace the manifest atomically, and searchers reload the
+    manifest when it changes. Courses of a university replaced by a newer segment are
+    skipped until a merge drops them.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_cache_path('search')
+        os.makedirs(self.path, exist_ok=True)
+        self._manifest_path = os.path.join(self.path, 'manifest.json')
+        self._lock = threading.Lock()
+        self._manifest_stat: Optional[Tuple[int, int]] = None
+        self._manifest = {'version': MANIFEST_VERSION, 'next_segment': 1, 'segments': [], 'universities': {}}
+        self._segments: Dict[str, _Segment] = {}
+        # Per segment, the indices of universities whose courses live in a newer segment
+        self._dead: Dict[str, frozenset] = {}
+
+    def _segment_path(self, name: str) -> str:
+        return os.path.join(self.path, f'{name}.idx')
+
+    def _refresh(self) -> None:
+        try:
+            stat = os.stat(self._manifest_path)
+        except FileNotFoundError:
+            return
+        if (stat.st_ino, stat.st_mtime_ns) == self._manifest_stat:
+            return
+        with open(self._manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != MANIFEST_VERSION:
+            raise ValueError(f"{self._manifest_path} is not a version {MANIFEST_VERSION} search manifest")
+        for name in manifest['segments']:
+            if name not in self._segments:
+                try:
+                    self._segments[name] = _Segment(self._segment_path(name))
+                except FileNotFoundError:
+                    # Merged away since the manifest was read; the new manifest is in place
+                    self._manifest_stat = None
+                    return self._refresh()
+        for name in set(self._segments) - set(manifest['segments']):
+            self._segments.pop(name).close()
+        live = manifest['universities']
+        self._dead = {
+            name: frozenset(
+                university for university, key in enumerate(segment.university_keys) if live.get(key) != name
+            )
+            for name, segment in self._segments.items()
+        }
+        self._manifest, self._manifest_stat = manifest, (stat.st_ino, stat.st_mtime_ns)
+
+    def _ordered_segments(self) -> List[_Segment]:
+        return [self._segments[name] for name in self._manifest['segments']]
+
+    def __len__(self) -> int:
+        """Number of live courses"""
+        with self._lock:
+            self._refresh()
+            return sum(
+                segment.doc_count - sum(segment.university_docs(university) for university in self._dead[segment.name])
+                for segment in self._ordered_segments()
+            )
+
+    def search(
+        self,
+        query: str,
+        limit: int = DEFAULT_LIMIT,
+        prefix: bool = False,
+        max_postings: int = DEFAULT_MAX_POSTINGS
+    ) -> List[CourseHit]:
+        """
+        Rank courses by BM25 relevance to a query (code, title and description; code and title weigh more).
+
+        Args:
+            query: Free text, e.g. 'machine learning' or 'CS 101'
+            limit: Maximum number of hits
+            prefix: Treat the last word as a prefix, searching its most frequent
+                completions too (for results as the user types)
+            max_postings: Postings scored per segment before settling for the best results
+                found; queries over very common words are approximate beyond this
+
+        Returns:
+            CourseHit list, best first
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            self._refresh()
+            segments = self._ordered_segments()
+            dead = dict(self._dead)
+        if not tokens:
+            return []
+        hits = []
+        for segment in segments:
+            terms = {token.encode('utf-8'): 1 for token in (tokens[:-1] if prefix else tokens)}
+            if prefix:
+                for term, _ in segment.completions(tokens[-1], MAX_PREFIX_EXPANSIONS):
+                    terms.setdefault(term, 1)
+            for score, doc in segment.top(terms, limit, max_postings, dead[segment.name]):
+                hits.append((score, segment, doc))
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        return [segment.hit(doc, score) for score, segment, doc in hits[:limit]]
+
+    def complete(self, text: str, limit: int = DEFAULT_LIMIT) -> List[str]:
+        """
+        Complete the last word of a partial query with indexed words, most frequent first.
+
+        Returns:
+            The query with its last word completed, e.g. 'intro to prog' -> 'intro to programming'
+        """
+        words = list(_WORD.finditer(text.lower()))
+        if not words or words[-1].end() != len(text.rstrip()) or text != text.rstrip():
+            return []
+        partial = words[-1].group()
+        with self._lock:
+            self._refresh()
+            segments = self._ordered_segments()
+        counts: Counter = Counter()
+        for segment in segments:
+            for term, frequency in segment.completions(partial, limit):
+                counts[term.decode('utf-8')] += frequency
+        head = text[:words[-1].start()]
+        return [head + term for term, _ in counts.most_common(limit)]
+
+    @contextmanager
+    def _writing(self):
+        with open(os.path.join(self.path, 'write.lock'), 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                with self._lock:
+                    self._refresh()
+                    yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _write_manifest(self, manifest: dict) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=self.path, prefix='.manifest-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, self._manifest_path)
+        self._refresh()
+
+    def _new_segment(self, catalogs: Iterable[CatalogCourses], base: Sequence[_Segment]) -> Tuple[str, List[str]]:
+        """Build the next segment; returns its name and the universities it holds"""
+        name = f"{self._manifest['next_segment']:06d}"
+        self._manifest['next_segment'] += 1
+        universities = []
+
+        def tracked() -> Iterator[CatalogCourses]:
+            for catalog in catalogs:
+                universities.append(canonicalize_university_name(catalog.university_name))
+                yield catalog
+
+        build_segment(tracked(), self._segment_path(name), base)
+        return name, universities
+
+    def add_catalogs(self, catalogs: Iterable[CatalogCourses]) -> int:
+        """
+        Index catalogs as one new segment, replacing earlier courses of the same universities.
+
+        Returns:
+            Number of courses indexed
+        """
+        latest: Dict[str, CatalogCourses] = {}
+        for catalog in catalogs:
+            latest[canonicalize_university_name(catalog.university_name)] = catalog
+        if not latest:
+            return 0
+        with self._writing():
+            manifest = json.loads(json.dumps(self._manifest))
+            self._manifest = manifest
+            name, universities = self._new_segment(latest.values(), self._ordered_segments())
+            manifest['segments'].append(name)
+            manifest['universities'].update(dict.fromkeys(universities, name))
+            self._write_manifest(manifest)
+            self._maintain()
+        return sum(len(catalog.courses) for catalog in latest.values())
+
+    def add_catalog(self, university_name: str, catalog_url: str, courses: Iterable[CourseRecord]) -> int:
+        """Index (or re-index) one university's courses"""
+        return self.add_catalogs([CatalogCourses(
+            university_name=university_name, catalog_url=catalog_url, courses=list(courses)
+        )])
+
+    def _dead_share(self, segment: _Segment) -> float:
+        dead = sum(segment.university_docs(university) for university in self._dead[segment.name])
+        return dead / segment.doc_count if segment.doc_count else 1.0
+
+    def _maintain(self) -> None:
+        """Drop segments without live courses and merge small or mostly replaced ones; call while writing"""
+        segments = self._ordered_segments()
+        empty = [segment for segment in segments if len(self._dead[segment.name]) == segment.university_count]
+        segments = [segment for segment in segments if segment not in empty]
+        merge = [segment for segment in segments if self._dead_share(segment) > MAX_DEAD_SHARE]
+        if len(segments) - len(merge) > MAX_SEGMENTS:
+            # Everything but the largest segment, which is usually the bulk of the index
+            largest = max(segments, key=lambda segment: segment.doc_count * (1 - self._dead_share(segment)))
+            merge = [segment for segment in segments if segment is not largest]
+        if merge or empty:
+            self._merge(merge, empty)
+
+    def _merge(self, segments: List[_Segment], drop: Sequence[_Segment] = ()) -> None:
+        """Rewrite the live courses of segments as one new segment, and drop segments without any"""
+        manifest = json.loads(json.dumps(self._manifest))
+        self._manifest = manifest
+        live = manifest['universities']
+        merged = {segment.name for segment in segments}
+        removed = merged | {segment.name for segment in drop}
+
+        def catalogs() -> Iterator[CatalogCourses]:
+            for segment in segments:
+                for catalog in segment.catalogs():
+                    if live.get(canonicalize_university_name(catalog.university_name)) == segment.name:
+                        yield catalog
+
+        manifest['segments'] = [name for name in manifest['segments'] if name not in removed]
+        if segments:
+            base = [segment for segment in self._ordered_segments() if segment.name not in removed]
+            name, universities = self._new_segment(catalogs(), base)
+            manifest['segments'].append(name)
+            live.update(dict.fromkeys(universities, name))
+        self._write_manifest(manifest)
+        for name in removed:
+            os.unlink(self._segment_path(name))
+            os.unlink(_source_path(self._segment_path(name)))
+
+    def compact(self) -> None:
+        """Merge every segment into one, with exact collection statistics"""
+        with self._writing():
+            segments = self._ordered_segments()
+            if segments:
+                self._merge(segments)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._refresh()
+            segments = self._ordered_segments()
+            return {
+                'segments': len(segments),
+                'universities': len(self._manifest['universities']),
+                'documents': sum(segment.doc_count for segment in segments),
+                'terms': sum(segment.term_count for segment in segments),
+                'bytes': sum(os.path.getsize(segment.path) for segment in segments),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
+            self._manifest_stat = None
+
+_search_index: Optional[CourseIndex] = None
+_search_index_loaded = False
+
+def get_search_index() -> Optional[CourseIndex]:
+    """
+    Return the process-wide course index that verified catalogs are added to, or None.
+
+    Indexing is turned on with CATALOG_SEARCH_INDEX=1; CATALOG_SEARCH_INDEX_PATH sets
+    its directory (default: 'search' in the cache directory).
+    """
+    global _search_index, _search_index_loaded
+    if not _search_index_loaded:
+        _search_index_loaded = True
+        if os.getenv('CATALOG_SEARCH_INDEX', '0').lower() in ('1', 'true', 'yes'):
+            _search_index = CourseIndex(os.getenv('CATALOG_SEARCH_INDEX_PATH') or None)
+    return _search_index
+
+def stored_catalogs() -> Iterator[CatalogCourses]:
+    """Courses of every cached catalog listing CS courses, extracted from its copy in the page store"""
+    # Imported here: get_uni_courses adds catalogs to the index as it verifies them
+    import get_uni_courses
+
+    for catalog in get_uni_courses.get_catalog_cache().values():
+        if not catalog.verification_status.contains_cs_courses:
+            continue
+        text = get_uni_courses.stored_page_text(catalog.catalog_url)
+        if text is not None:
+            yield CatalogCourses(
+                university_name=catalog.university_name,
+                catalog_url=catalog.catalog_url,
+                courses=list(iter_courses([text]))
+            )
+
+def load_catalogs(path: str) -> Iterator[CatalogCourses]:
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield CatalogCourses.model_validate_json(line)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--index', help="index directory (default: CATALOG_SEARCH_INDEX_PATH or 'search' in the cache)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('update', help='index cached catalogs from the page store')
+    add = commands.add_parser('add', help='index catalogs from a JSON lines file')
+    add.add_argument('source')
+    commands.add_parser('compact', help='merge all segments into one')
+    commands.add_parser('stats')
+    search = commands.add_parser('search')
+    search.add_argument('query')
+    search.add_argument('-n', '--limit', type=int, default=DEFAULT_LIMIT)
+    search.add_argument('--prefix', action='store_true', help='treat the last word as a prefix')
+    complete = commands.add_parser('complete')
+    complete.add_argument('text')
+    complete.add_argument('-n', '--limit', type=int, default=DEFAULT_LIMIT)
+    args = parser.parse_args(argv)
+
+    index = CourseIndex(args.index or os.getenv('CATALOG_SEARCH_INDEX_PATH') or None)
+    try:
+        if args.command in ('update', 'add'):
+            catalogs = stored_catalogs() if args.command == 'update' else load_catalogs(args.source)
+            count = index.add_catalogs(catalogs)
+            print(f"Indexed {count} courses; index now holds {len(index)}", file=sys.stderr)
+        elif args.command == 'compact':
+            index.compact()
+            print(json.dumps(index.stats()))
+        elif args.command == 'stats':
+            print(json.dumps(index.stats()))
+        elif args.command == 'search':
+            for hit in index.search(args.query, args.limit, args.prefix):
+                print(hit.model_dump_json())
+        else:
+            for completion in index.complete(args.text, args.limit):
+                print(completion)
+    finally:
+        index.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
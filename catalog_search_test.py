@@ -0,0 +1,126 @@
+"""
+Tests for course search: top-k against brute-force BM25, and re-indexing and merging universities.
+
+    python -m pytest catalog_search_test.py
+"""
+import math
+import os
+import random
+from collections import Counter
+
+import pytest
+
+from catalog_extract import CourseRecord
+from catalog_search import (
+    B, IMPACT_SCALE, K1, MAX_SEGMENTS, CatalogCourses, CourseIndex, _document_terms, tokenize
+)
+
+WORDS = (
+    "introduction programming systems data structures algorithms learning software networks "
+    "databases theory computation intelligence graphics security distributed compilers design "
+    "analysis discrete linear algebra probability statistics calculus robotics vision language"
+).split()
+
+def _catalog(rng, university, courses=120):
+    # Zipf-like word use, so common terms have postings at many impact levels
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+    return CatalogCourses(
+        university_name=university,
+        catalog_url=f"https://{university.split()[0].lower()}.edu/catalog",
+        courses=[
+            CourseRecord(
+                code=f"CS {100 + i}",
+                title=' '.join(rng.choices(WORDS, weights, k=rng.randint(1, 4))),
+                description=' '.join(rng.choices(WORDS, weights, k=rng.randint(0, 30)))
+            )
+            for i in range(courses)
+        ]
+    )
+
+def _brute_force(catalogs, query):
+    """Score in impact levels of every course matching a query, from the quantized BM25 formula"""
+    documents = {
+        (catalog.university_name, course.code): _document_terms(course)
+        for catalog in catalogs for course in catalog.courses
+    }
+    count = len(documents)
+    average = sum(sum(terms.values()) for terms in documents.values()) / count
+    frequencies = Counter(term for terms in documents.values() for term in terms)
+    scores = Counter()
+    for term in dict.fromkeys(tokenize(query)):
+        frequency = frequencies[term]
+        scale = IMPACT_SCALE * (K1 + 1) * math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+        for key, terms in documents.items():
+            tf = terms.get(term)
+            if tf:
+                length = sum(terms.values())
+                scores[key] += min(255, max(1, round(scale * tf / (tf + K1 * (1 - B + B * length / average)))))
+    return scores
+
+def _assert_top_k(index, catalogs, query, limit):
+    expected = _brute_force(catalogs, query)
+    hits = index.search(query, limit=limit)
+    best = sorted(expected.values(), reverse=True)[:limit]
+    assert [hit.score for hit in hits] == [round(score / IMPACT_SCALE, 3) for score in best]
+    for hit in hits:
+        assert hit.score == round(expected[hit.university_name, hit.code] / IMPACT_SCALE, 3)
+    assert len({(hit.university_name, hit.code) for hit in hits}) == len(hits)
+
+@pytest.fixture
+def index(tmp_path):
+    index = CourseIndex(str(tmp_path / 'search'))
+    yield index
+    index.close()
+
+def test_top_k_matches_brute_force(index):
+    rng = random.Random(3)
+    catalogs = [_catalog(rng, f"{name} University") for name in ('Alpha', 'Beta', 'Gamma', 'Delta')]
+    index.add_catalogs(catalogs)
+    queries = [WORDS[0], WORDS[-1], 'data structures', 'linear algebra probability', 'theory of computation']
+    queries += [' '.join(rng.sample(WORDS, rng.randint(1, 3))) for _ in range(40)]
+    for query in queries:
+        for limit in (1, 5, 20):
+            _assert_top_k(index, catalogs, query, limit)
+
+def test_reindexing_replaces_a_university(tmp_path, index):
+    rng = random.Random(5)
+    alpha, beta = _catalog(rng, 'Alpha University', 40), _catalog(rng, 'Beta University', 40)
+    index.add_catalogs([alpha, beta])
+    replacement = CatalogCourses(
+        university_name='alpha university',
+        catalog_url='https://alpha.edu/new-catalog',
+        courses=[CourseRecord(code=f"QC {i}", title='Quantum cryptography') for i in range(3)]
+    )
+    index.add_catalogs([replacement])
+    assert len(index) == 43
+
+    hits = index.search('quantum', limit=10)
+    assert sorted(hit.code for hit in hits) == ['QC 0', 'QC 1', 'QC 2']
+    assert {hit.catalog_url for hit in hits} == {'https://alpha.edu/new-catalog'}
+    # None of the replaced courses are found any more
+    assert not any(hit.university_name == 'Alpha University' for hit in index.search('data structures', limit=100))
+
+    # Another handle on the same directory sees the update
+    other = CourseIndex(index.path)
+    assert len(other) == 43 and [hit.code for hit in other.search('cryptography', limit=1)] == ['QC 0']
+    other.close()
+
+def test_merges_keep_live_courses_and_exact_scores(tmp_path, index):
+    rng = random.Random(11)
+    catalogs = {}
+    for i in range(3 * MAX_SEGMENTS):
+        # Re-add the first few universities over and over, leaving segments mostly replaced
+        name = f"University {i % (MAX_SEGMENTS + 4)}"
+        catalogs[name] = _catalog(rng, name, 30)
+        index.add_catalogs([catalogs[name]])
+        stats = index.stats()
+        assert stats['segments'] <= MAX_SEGMENTS + 1
+        assert len(index) == sum(len(catalog.courses) for catalog in catalogs.values())
+    names = {name for name in os.listdir(index.path) if name.endswith('.idx')}
+    assert len(names) == index.stats()['segments']
+
+    index.compact()
+    assert index.stats()['segments'] == 1
+    assert index.stats()['documents'] == len(index)
+    for query in ('data structures', 'algorithms', 'vision language learning'):
+        _assert_top_k(index, list(catalogs.values()), query, 10)
@@ -0,0 +1,583 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from pydantic import BaseModel
+
+from catalog_cache import default_cache_path
+
+try:
+    import fcntl
+except ImportError:
+    # Without flock, only one process at a time may write to a store
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_SEGMENT_SIZE = 256 * 1024 * 1024
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024 * 1024
+# Log records appended since the index was built before a writer rebuilds it
+INDEX_REBUILD_THRESHOLD = 4096
+# A store over its size cap is compacted down to this fraction of it, so it isn't compacted on every put
+COMPACTION_TARGET = 0.75
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+FORMAT_VERSION = 1
+
+CODEC_GZIP = 1
+CODEC_ZSTD = 2
+_CODECS = {'gzip': CODEC_GZIP, 'zstd': CODEC_ZSTD}
+
+# Segment blob: magic, content hash, codec, compressed length; the compressed body follows
+_BLOB = struct.Struct('<4s16sBI')
+_BLOB_MAGIC = b'CPGB'
+# Log record: content hash, segment, body offset, compressed length, raw length, stored_at,
+# codec, URL length, content type length; the URL and content type follow
+_RECORD = struct.Struct('<16sIQIIdBHH')
+# Index: magic, version, log bytes covered, capacity; then capacity slots of
+# (URL hash, log offset + 1), 0 marking an empty slot
+_INDEX_HEADER = struct.Struct('<4sIQQ')
+_INDEX_MAGIC = b'CPIX'
+_SLOT = struct.Struct('<QQ')
+
+class StoredPage(BaseModel):
+    url: str
+    content_hash: str
+    content_type: Optional[str] = None
+    stored_at: float
+    body: bytes
+
+class _Record(NamedTuple):
+    digest: bytes
+    segment: int
+    offset: int
+    stored_length: int
+    raw_length: int
+    stored_at: float
+    codec: int
+    url: str
+    content_type: Optional[str]
+    end: int
+
+    @property
+    def location(self) -> Tuple[int, int, int, int, int]:
+        """Where the body is: segment, offset, stored length, raw length, codec"""
+        return self.segment, self.offset, self.stored_length, self.raw_length, self.codec
+
+def _url_hash(url: str) -> int:
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def _parse_records(data: bytes, base: int) -> Iterator[Tuple[int, _Record]]:
+    """(log offset, record) for each complete record in a slice of the log starting at base"""
+    position = 0
+    while position + _RECORD.size <= len(data):
+        digest, segment, offset, stored_length, raw_length, stored_at, codec, url_length, type_length = (
+            _RECORD.unpack_from(data, position)
+        )
+        end = position + _RECORD.size + url_length + type_length
+        if end > len(data):
+            # A record still being appended
+            return
+        url = data[position + _RECORD.size:position + _RECORD.size + url_length].decode('utf-8')
+        content_type = data[end - type_length:end].decode('utf-8') if type_length else None
+        yield base + position, _Record(
+            digest, segment, offset, stored_length, raw_length, stored_at, codec, url, content_type, base + end
+        )
+        position = end
+
+class PageStore:
+    """
+    Append-only, content-addressed store of fetched page bodies.
+
+    The store is a directory holding:
+
+        segments/NNNNNN.seg   compressed bodies, each distinct body (by blake2b hash) once
+        pages.log             one record per stored page: URL, content hash, body location
+        pages.idx             hash table from URL to its latest log record, memory-mapped
+
+    Nothing is rewritten in place: new bodies go to the end of the current segment and
+    new records to the end of the log, and the index is rebuilt into a new file that
+    replaces the old one atomically. Readers look a URL up in the mapped index plus the
+    records appended since it was built, so any number of processes can read while
+    others write; writers serialize on an flock of the log. Bodies are compressed with
+    zstd when the zstandard package is installed, otherwise gzip.
+
+    Compaction copies the latest body of each URL into new segments and swaps in a new
+    log, then deletes the old segments; other processes reopen the log when they next
+    touch the store. With max_bytes, a put that takes the segments past it compacts the
+    store, dropping the least recently stored pages, down to COMPACTION_TARGET of it.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        compression: Optional[str] = None,
+        segment_size: int = DEFAULT_SEGMENT_SIZE,
+        max_bytes: Optional[int] = None
+    ):
+        self.path = path or default_cache_path('pages')
+        self.compression = compression or ('zstd' if zstandard is not None else 'gzip')
+        if self.compression not in _CODECS:
+            raise ValueError(f"Unknown compression {self.compression!r} (expected 'zstd' or 'gzip')")
+        if self.compression == 'zstd' and zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        self.segment_size = segment_size
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(self.path, 'segments'), exist_ok=True)
+        self._log_path = os.path.join(self.path, 'pages.log')
+        self._index_path = os.path.join(self.path, 'pages.idx')
+        self._lock = threading.Lock()
+        self._index: Optional[mmap.mmap] = None
+        self._segments: Dict[int, mmap.mmap] = {}
+        self._open_log()
+        self._appended = 0
+
+    def _open_log(self) -> None:
+        self._log_fd = os.open(self._log_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        self._log_inode = os.fstat(self._log_fd).st_ino
+        self._reset()
+
+    def _reset(self) -> None:
+        """Forget everything read from the current log, index and segments"""
+        if self._index is not None:
+            self._index.close()
+        for mapped in self._segments.values():
+            mapped.close()
+        self._segments.clear()
+        self._index = None
+        self._index_inode: Optional[int] = None
+        self._covered = 0
+        # Records appended after the index was built: URL -> log offset, and where they end
+        self._tail: Dict[str, int] = {}
+        self._tail_end = 0
+        # Loaded on first use, then kept up to date from the records appended since:
+        # URL -> log offset of its latest record, body location by content hash
+        self._latest: Optional[Dict[str, int]] = None
+        self._contents: Optional[Dict[bytes, Tuple[int, int, int, int, int]]] = None
+        self._loaded_end = 0
+
+    def _reopen_if_replaced(self) -> bool:
+        """Switch to a log swapped in by a compaction, by any process"""
+        try:
+            inode = os.stat(self._log_path).st_ino
+        except FileNotFoundError:
+            return False
+        if inode == self._log_inode:
+            return False
+        os.close(self._log_fd)
+        self._open_log()
+        return True
+
+    def _map_index(self) -> None:
+        try:
+            inode = os.stat(self._index_path).st_ino
+        except FileNotFoundError:
+            return
+        if inode == self._index_inode:
+            return
+        with open(self._index_path, 'rb') as f:
+            index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, covered, _ = _INDEX_HEADER.unpack_from(index, 0)
+        if magic != _INDEX_MAGIC or version != FORMAT_VERSION:
+            index.close()
+            raise ValueError(f"{self._index_path} is not a version {FORMAT_VERSION} page store index")
+        if self._index is not None:
+            self._index.close()
+        self._index, self._index_inode, self._covered = index, inode, covered
+        self._tail, self._tail_end = {}, covered
+
+    def _refresh(self) -> None:
+        """Pick up a new log or rebuilt index and the records appended since, by any process"""
+        self._reopen_if_replaced()
+        self._map_index()
+        # An index built for a log swapped in after the check above must not be read against the old one
+        while self._reopen_if_replaced():
+            self._map_index()
+        start = self._tail_end if self._latest is None else min(self._tail_end, self._loaded_end)
+        end = start
+        for offset, record in self._scan(start):
+            if offset >= self._tail_end:
+                self._tail[record.url] = offset
+            if self._latest is not None and offset >= self._loaded_end:
+                self._latest[record.url] = offset
+                self._contents.setdefault(record.digest, record.location)
+            end = record.end
+        self._tail_end = max(self._tail_end, end)
+        if self._latest is not None:
+            self._loaded_end = max(self._loaded_end, end)
+
+    def _load(self) -> None:
+        """Read the whole log once into the latest-record and body maps"""
+        if self._latest is None:
+            self._latest, self._contents, self._loaded_end = {}, {}, 0
+        self._refresh()
+
+    def _read_record(self, offset: int) -> _Record:
+        header = os.pread(self._log_fd, _RECORD.size, offset)
+        url_length, type_length = _RECORD.unpack(header)[-2:]
+        data = header + os.pread(self._log_fd, url_length + type_length, offset + _RECORD.size)
+        return next(_parse_records(data, offset))[1]
+
+    def _find(self, url: str) -> Optional[_Record]:
+        self._refresh()
+        offset = self._tail.get(url)
+        if offset is not None:
+            return self._read_record(offset)
+        index = self._index
+        if index is None:
+            return None
+        capacity = _INDEX_HEADER.unpack_from(index, 0)[3]
+        key = _url_hash(url)
+        slot = key & (capacity - 1)
+        while True:
+            slot_key, value = _SLOT.unpack_from(index, _INDEX_HEADER.size + slot * _SLOT.size)
+            if not value:
+                return None
+            if slot_key == key:
+                record = self._read_record(value - 1)
+                if record.url == url:
+                    return record
+            slot = (slot + 1) & (capacity - 1)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.path, 'segments', f'{segment:06d}.seg')
+
+    def _segment(self, segment: int, end: int) -> mmap.mmap:
+        """Mapping of a segment file covering at least its first end bytes"""
+        mapped = self._segments.get(segment)
+        if mapped is None or len(mapped) < end:
+            if mapped is not None:
+                mapped.close()
+            with open(self._segment_path(segment), 'rb') as f:
+                mapped = self._segments[segment] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapped
+
+    def _body(self, record: _Record) -> bytes:
+        mapped = self._segment(record.segment, record.offset + record.stored_length)
+        # Decompress straight out of the mapping
+        data = memoryview(mapped)[record.offset:record.offset + record.stored_length]
+        try:
+            if record.codec == CODEC_ZSTD:
+                if zstandard is None:
+                    raise ValueError("Page stored with zstd, but the zstandard package is not installed")
+                return zstandard.ZstdDecompressor().decompress(data, max_output_size=record.raw_length)
+            return zlib.decompress(data, wbits=31)
+        finally:
+            data.release()
+
+    def _read_body(self, record: _Record) -> Optional[Tuple[_Record, bytes]]:
+        try:
+            return record, self._body(record)
+        except FileNotFoundError:
+            # Compacted since the record was read: look the URL up in the new log
+            record = self._find(record.url)
+            return (record, self._body(record)) if record is not None else None
+
+    def get(self, url: str) -> Optional[StoredPage]:
+        """Latest stored copy of a URL, or None"""
+        with self._lock:
+            record = self._find(url)
+            found = self._read_body(record) if record is not None else None
+        if found is None:
+            return None
+        record, body = found
+        return StoredPage(
+            url=url,
+            content_hash=record.digest.hex(),
+            content_type=record.content_type,
+            stored_at=record.stored_at,
+            body=body
+        )
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return self._find(url) is not None
+
+    @contextmanager
+    def _writing(self):
+        while True:
+            if fcntl is not None:
+                fcntl.flock(self._log_fd, fcntl.LOCK_EX)
+            # A writer that waited out a compaction holds the lock of the replaced log
+            if not self._reopen_if_replaced():
+                break
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._log_fd, fcntl.LOCK_UN)
+
+    def _compress(self, body: bytes) -> Tuple[int, bytes]:
+        if self.compression == 'zstd':
+            return CODEC_ZSTD, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+        return CODEC_GZIP, zlib.compress(body, GZIP_LEVEL, wbits=31)
+
+    def _segment_numbers(self) -> List[int]:
+        return sorted(int(name[:-4]) for name in os.listdir(os.path.join(self.path, 'segments')) if name.endswith('.seg'))
+
+    def _segment_bytes(self) -> int:
+        return sum(os.path.getsize(self._segment_path(segment)) for segment in self._segment_numbers())
+
+    def _write_blob(self, segment: int, digest: bytes, codec: int, data) -> Tuple[int, int]:
+        """Append a blob to the last segment, from segment on, with room for it; returns (segment, body offset)"""
+        path = self._segment_path(segment)
+        if os.path.exists(path) and os.path.getsize(path) + _BLOB.size + len(data) > self.segment_size:
+            segment += 1
+            path = self._segment_path(segment)
+        with open(path, 'ab') as f:
+            offset = f.tell() + _BLOB.size
+            f.write(_BLOB.pack(_BLOB_MAGIC, digest, codec, len(data)))
+            f.write(data)
+        return segment, offset
+
+    def _append_body(self, digest: bytes, body: bytes) -> Tuple[int, int, int, int, int]:
+        codec, data = self._compress(body)
+        segments = self._segment_numbers()
+        segment, offset = self._write_blob(segments[-1] if segments else 1, digest, codec, data)
+        return segment, offset, len(data), len(body), codec
+
+    @staticmethod
+    def _pack_record(
+        digest: bytes,
+        location: Tuple[int, int, int, int, int],
+        stored_at: float,
+        url: str,
+        content_type: Optional[str]
+    ) -> bytes:
+        segment, offset, stored_length, raw_length, codec = location
+        url_bytes = url.encode('utf-8')
+        type_bytes = (content_type or '').encode('utf-8')
+        return _RECORD.pack(
+            digest, segment, offset, stored_length, raw_length, stored_at, codec, len(url_bytes), len(type_bytes)
+        ) + url_bytes + type_bytes
+
+    def put(self, url: str, body: bytes, content_type: Optional[str] = None) -> str:
+        """
+        Store a page body for a URL, keeping a single copy of identical bodies.
+
+        Returns:
+            Hex content hash of the body
+        """
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        with self._lock, self._writing():
+            self._load()
+            if os.fstat(self._log_fd).st_size > self._loaded_end:
+                # A record torn by a writer that died mid-append; appending after it would misalign the log
+                os.ftruncate(self._log_fd, self._loaded_end)
+            current = self._find(url)
+            if current is not None and current.digest == digest and current.content_type == content_type:
+                return digest.hex()
+            location = self._contents.get(digest)
+            appended = location is None
+            if appended:
+                location = self._contents[digest] = self._append_body(digest, body)
+            # Bodies are written before the record that points at them, so readers never see a dangling record
+            os.write(self._log_fd, self._pack_record(digest, location, time.time(), url, content_type))
+            self._appended += 1
+            self._refresh()
+            if appended and self.max_bytes is not None and self._segment_bytes() > self.max_bytes:
+                self._compact(int(self.max_bytes * COMPACTION_TARGET))
+            elif len(self._tail) >= INDEX_REBUILD_THRESHOLD:
+                self._build_index()
+        return digest.hex()
+
+    def _compact(self, max_bytes: Optional[int]) -> None:
+        """Rewrite the store with only the latest record of each URL; call with the write lock held"""
+        self._load()
+        records = sorted(
+            (self._read_record(offset) for offset in self._latest.values()),
+            key=lambda record: record.stored_at,
+            reverse=True
+        )
+        kept, size, counted = [], 0, set()
+        for record in records:
+            added = 0 if record.digest in counted else _BLOB.size + record.stored_length
+            if max_bytes is not None and size + added > max_bytes:
+                break
+            kept.append(record)
+            size += added
+            counted.add(record.digest)
+
+        old_segments = self._segment_numbers()
+        segment = old_segments[-1] + 1 if old_segments else 1
+        locations: Dict[bytes, Tuple[int, int, int, int, int]] = {}
+        log = bytearray()
+        for record in reversed(kept):
+            location = locations.get(record.digest)
+            if location is None:
+                mapped = self._segment(record.segment, record.offset + record.stored_length)
+                segment, offset = self._write_blob(
+                    segment, record.digest, record.codec, mapped[record.offset:record.offset + record.stored_length]
+                )
+                location = locations[record.digest] = (
+                    segment, offset, record.stored_length, record.raw_length, record.codec
+                )
+            log += self._pack_record(record.digest, location, record.stored_at, record.url, record.content_type)
+        for number in range(old_segments[-1] + 1 if old_segments else 1, segment + 1):
+            if os.path.exists(self._segment_path(number)):
+                with open(self._segment_path(number), 'rb') as f:
+                    os.fsync(f.fileno())
+
+        temp_path = f'{self._log_path}.{os.getpid()}.tmp'
+        log_fd = os.open(temp_path, os.O_RDWR | os.O_APPEND | os.O_CREAT | os.O_TRUNC, 0o644)
+        # Locked before it is visible, so other writers queue on the new log
+        if fcntl is not None:
+            fcntl.flock(log_fd, fcntl.LOCK_EX)
+        os.write(log_fd, bytes(log))
+        os.fsync(log_fd)
+        # The old index points into the old log
+        try:
+            os.unlink(self._index_path)
+        except FileNotFoundError:
+            pass
+        os.replace(temp_path, self._log_path)
+        os.close(self._log_fd)
+        self._log_fd, self._log_inode = log_fd, os.fstat(log_fd).st_ino
+        self._reset()
+        for number in old_segments:
+            os.unlink(self._segment_path(number))
+        self._build_index()
+
+    def compact(self, max_bytes: Optional[int] = None) -> None:
+        """
+        Drop superseded records and the bodies only they point at.
+
+        With max_bytes, the least recently stored pages are dropped too, until the
+        remaining bodies take at most that many bytes.
+        """
+        with self._lock, self._writing():
+            self._compact(max_bytes)
+
+    def _scan(self, start: int = 0) -> Iterator[Tuple[int, _Record]]:
+        """Every complete record in the log from offset start, oldest first"""
+        size = os.fstat(self._log_fd).st_size
+        chunk_size = 1024 * 1024
+        position = start
+        while position < size:
+            data = os.pread(self._log_fd, min(chunk_size, size - position), position)
+            end = position
+            for offset, record in _parse_records(data, position):
+                end = record.end
+                yield offset, record
+            if end == position:
+                if len(data) < chunk_size:
+                    return
+                # A record longer than the chunk: read more at once
+                chunk_size *= 2
+            position = end
+
+    def _build_index(self) -> None:
+        """Rebuild pages.idx from the log and swap it in atomically; call with the write lock held"""
+        self._load()
+        covered = self._loaded_end
+        latest = self._latest
+        capacity = 16
+        while capacity < 2 * len(latest):
+            capacity *= 2
+        slots = bytearray(capacity * _SLOT.size)
+        for url, offset in latest.items():
+            key = _url_hash(url)
+            slot = key & (capacity - 1)
+            while _SLOT.unpack_from(slots, slot * _SLOT.size)[1]:
+                slot = (slot + 1) & (capacity - 1)
+            _SLOT.pack_into(slots, slot * _SLOT.size, key, offset + 1)
+        temp_path = f'{self._index_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, FORMAT_VERSION, covered, capacity))
+            f.write(slots)
+        os.replace(temp_path, self._index_path)
+        self._refresh()
+
+    def build_index(self) -> None:
+        """Fold every record appended so far into the memory-mapped index"""
+        with self._lock, self._writing():
+            self._build_index()
+
+    def urls(self) -> Iterator[str]:
+        """Every stored URL"""
+        with self._lock:
+            self._load()
+            urls = list(self._latest)
+        return iter(urls)
+
+    def iter_pages(self) -> Iterator[StoredPage]:
+        """Latest stored copy of every URL"""
+        with self._lock:
+            self._load()
+            records = [self._read_record(offset) for offset in self._latest.values()]
+        for record in records:
+            with self._lock:
+                found = self._read_body(record)
+            if found is None:
+                continue
+            record, body = found
+            yield StoredPage(
+                url=record.url,
+                content_hash=record.digest.hex(),
+                content_type=record.content_type,
+                stored_at=record.stored_at,
+                body=body
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self._latest)
+
+    def stats(self) -> Dict[str, int]:
+        """URL and body counts, and raw vs stored body bytes"""
+        with self._lock:
+            self._refresh()
+            records = list(self._scan())
+        urls = {record.url for _, record in records}
+        bodies = {record.digest: record for _, record in records}
+        segments = os.path.join(self.path, 'segments')
+        return {
+            'urls': len(urls),
+            'records': len(records),
+            'bodies': len(bodies),
+            'raw_bytes': sum(record.raw_length for record in bodies.values()),
+            'stored_bytes': sum(record.stored_length for record in bodies.values()),
+            'segment_bytes': sum(os.path.getsize(os.path.join(segments, name)) for name in os.listdir(segments)),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._appended and self._tail:
+                with self._writing():
+                    self._build_index()
+            self._reset()
+            os.close(self._log_fd)
+
+_page_store: Optional[PageStore] = None
+_page_store_loaded = False
+
+def get_page_store() -> Optional[PageStore]:
+    """
+    Return the process-wide page store that fetched pages are kept in, or None.
+
+    The store is turned on with CATALOG_PAGE_STORE=1; CATALOG_PAGE_STORE_PATH sets its
+    directory (default: 'pages' in the cache directory), CATALOG_PAGE_STORE_COMPRESSION
+    its codec ('zstd' or 'gzip') and CATALOG_PAGE_STORE_MAX_BYTES its size cap (default
+    DEFAULT_MAX_BYTES, 0 for none).
+    """
+    global _page_store, _page_store_loaded
+    if not _page_store_loaded:
+        _page_store_loaded = True
+        if os.getenv('CATALOG_PAGE_STORE', '0').lower() in ('1', 'true', 'yes'):
+            max_bytes = int(os.getenv('CATALOG_PAGE_STORE_MAX_BYTES', DEFAULT_MAX_BYTES))
+            _page_store = PageStore(
+                path=os.getenv('CATALOG_PAGE_STORE_PATH') or None,
+                compression=os.getenv('CATALOG_PAGE_STORE_COMPRESSION') or None,
+                max_bytes=max_bytes or None
+            )
+    return _page_store
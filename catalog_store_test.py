@@ -0,0 +1,154 @@
+"""
+Tests for the page store: round trips, recovery from a torn log, compaction and the size cap.
+
+    python -m pytest catalog_store_test.py
+"""
+import os
+import random
+
+import pytest
+
+import catalog_store
+from catalog_store import PageStore
+
+def _body(seed, size=2000):
+    rng = random.Random(seed)
+    # Random enough not to compress away, so the size cap is exercised
+    return bytes(rng.getrandbits(8) for _ in range(size))
+
+@pytest.fixture
+def store(tmp_path):
+    store = PageStore(str(tmp_path / 'pages'), compression='gzip')
+    yield store
+    store.close()
+
+def test_round_trip_and_reopen(tmp_path):
+    store = PageStore(str(tmp_path / 'pages'), compression='gzip')
+    store.put('https://a.edu/courses', b'<p>CS 106A</p>', 'text/html')
+    store.put('https://b.edu/courses', b'<p>CS 61A</p>')
+    store.put('https://a.edu/courses', b'<p>CS 106B</p>', 'text/html; charset=utf-8')
+    page = store.get('https://a.edu/courses')
+    assert page.body == b'<p>CS 106B</p>' and page.content_type == 'text/html; charset=utf-8'
+    assert store.get('https://c.edu/courses') is None
+    assert sorted(store.urls()) == ['https://a.edu/courses', 'https://b.edu/courses']
+    assert len(store) == 2
+    store.close()
+
+    reopened = PageStore(str(tmp_path / 'pages'))
+    assert reopened.get('https://a.edu/courses').body == b'<p>CS 106B</p>'
+    assert reopened.get('https://b.edu/courses').content_type is None
+    assert {page.url: page.body for page in reopened.iter_pages()} == {
+        'https://a.edu/courses': b'<p>CS 106B</p>', 'https://b.edu/courses': b'<p>CS 61A</p>'
+    }
+    reopened.close()
+
+def test_identical_bodies_are_stored_once(store):
+    body = _body(1)
+    for url in ('https://a.edu/1', 'https://a.edu/2', 'https://a.edu/1'):
+        store.put(url, body)
+    stats = store.stats()
+    assert stats['urls'] == 2 and stats['records'] == 2 and stats['bodies'] == 1
+
+def test_bodies_stored_by_another_handle_are_reused(tmp_path):
+    body = _body(2)
+    store = PageStore(str(tmp_path / 'pages'), compression='gzip')
+    store.put('https://a.edu/1', body, 'text/html')
+    store.close()
+    reopened = PageStore(str(tmp_path / 'pages'))
+    other = PageStore(str(tmp_path / 'pages'))
+    reopened.put('https://a.edu/2', body)
+    other.put('https://a.edu/3', body, 'text/html')
+    for url in ('https://a.edu/1', 'https://a.edu/2', 'https://a.edu/3'):
+        assert other.get(url).body == body and reopened.get(url).body == body
+    stats = reopened.stats()
+    assert stats['records'] == 3 and stats['bodies'] == 1
+    assert stats['segment_bytes'] < 2 * stats['stored_bytes']
+    other.close()
+    reopened.close()
+
+def test_index_and_tail_agree(store):
+    for i in range(50):
+        store.put(f'https://a.edu/{i % 20}', f'<p>version {i}</p>'.encode())
+        if i == 25:
+            store.build_index()
+    for i in range(20):
+        latest = max(j for j in range(50) if j % 20 == i)
+        assert store.get(f'https://a.edu/{i}').body == f'<p>version {latest}</p>'.encode()
+    assert len(store) == 20
+
+def test_torn_log_tail_is_ignored_and_overwritten(tmp_path):
+    store = PageStore(str(tmp_path / 'pages'), compression='gzip')
+    store.put('https://a.edu/courses', b'<p>CS 106A</p>')
+    store.close()
+    log_path = tmp_path / 'pages' / 'pages.log'
+    complete = log_path.read_bytes()
+    # A writer killed halfway through appending its record
+    with open(log_path, 'ab') as f:
+        f.write(complete[:20])
+
+    reopened = PageStore(str(tmp_path / 'pages'))
+    assert list(reopened.urls()) == ['https://a.edu/courses']
+    assert reopened.get('https://a.edu/courses').body == b'<p>CS 106A</p>'
+    reopened.put('https://b.edu/courses', b'<p>CS 61A</p>')
+    reopened.close()
+
+    reopened = PageStore(str(tmp_path / 'pages'))
+    assert sorted(reopened.urls()) == ['https://a.edu/courses', 'https://b.edu/courses']
+    assert reopened.get('https://b.edu/courses').body == b'<p>CS 61A</p>'
+    reopened.close()
+
+def test_compact_keeps_latest_copies(store):
+    for i in range(10):
+        store.put('https://a.edu/courses', _body(i))
+    store.put('https://b.edu/courses', _body(100))
+    before = store.stats()
+    store.compact()
+    after = store.stats()
+    assert after['records'] == 2 and after['bodies'] == 2
+    assert after['segment_bytes'] < before['segment_bytes']
+    assert store.get('https://a.edu/courses').body == _body(9)
+    assert store.get('https://b.edu/courses').body == _body(100)
+    assert len(store) == 2
+
+def test_size_cap_drops_least_recently_stored(tmp_path):
+    store = PageStore(str(tmp_path / 'pages'), compression='gzip', max_bytes=20000)
+    for i in range(30):
+        store.put(f'https://a.edu/{i}', _body(i))
+        assert store.stats()['segment_bytes'] <= 20000
+    urls = sorted(store.urls(), key=lambda url: int(url.rsplit('/', 1)[1]))
+    # The newest pages survive, down to the compaction target
+    assert urls == [f'https://a.edu/{i}' for i in range(30 - len(urls), 30)]
+    assert 0 < len(urls) < 10
+    assert store.get('https://a.edu/29').body == _body(29)
+    assert store.get('https://a.edu/0') is None
+    store.close()
+
+def test_other_handles_follow_a_compaction(tmp_path):
+    writer = PageStore(str(tmp_path / 'pages'), compression='gzip')
+    reader = PageStore(str(tmp_path / 'pages'))
+    for i in range(5):
+        writer.put('https://a.edu/courses', _body(i))
+    assert reader.get('https://a.edu/courses').body == _body(4)
+    writer.compact()
+    assert reader.get('https://a.edu/courses').body == _body(4)
+    # A second writer queues on the new log rather than appending to the replaced one
+    reader.put('https://b.edu/courses', b'<p>CS 61A</p>')
+    assert writer.get('https://b.edu/courses').body == b'<p>CS 61A</p>'
+    assert sorted(writer.urls()) == ['https://a.edu/courses', 'https://b.edu/courses']
+    assert len(os.listdir(tmp_path / 'pages' / 'segments')) == 1
+    reader.close()
+    writer.close()
+
+def test_store_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.setenv('CATALOG_CACHE_DIR', str(tmp_path))
+    monkeypatch.delenv('CATALOG_PAGE_STORE', raising=False)
+    monkeypatch.setattr(catalog_store, '_page_store', None)
+    monkeypatch.setattr(catalog_store, '_page_store_loaded', False)
+    assert catalog_store.get_page_store() is None
+
+    monkeypatch.setenv('CATALOG_PAGE_STORE', '1')
+    monkeypatch.setenv('CATALOG_PAGE_STORE_MAX_BYTES', '1000000')
+    monkeypatch.setattr(catalog_store, '_page_store_loaded', False)
+    store = catalog_store.get_page_store()
+    assert store is not None and store.max_bytes == 1000000
+    store.close()
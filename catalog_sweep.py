@@ -0,0 +1,124 @@
+"""
+Incremental re-check of every cached catalog.
+
+    python catalog_sweep.py --concurrency 16 --output changes.jsonl
+
+Each cached catalog page is revalidated and fingerprinted. Pages that are not modified,
+or whose course sections all match the fingerprints stored by the last sweep, are
+skipped; the rest are verified again and their changed sections re-parsed. With
+--output, one JSON line per re-processed page lists its changed sections and their
+courses. The summary reports how many pages and sections were skipped.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import AsyncIterator, Iterable, List, Optional, TextIO
+
+from pydantic import BaseModel
+
+import catalog_fetch
+import get_uni_courses
+from get_uni_courses import CatalogSweepResult, UniversityCatalogOutput
+
+class SweepReport(BaseModel):
+    pages: int = 0
+    pages_not_modified: int = 0
+    pages_unchanged: int = 0
+    pages_processed: int = 0
+    pages_failed: int = 0
+    sections: int = 0
+    sections_skipped: int = 0
+    sections_processed: int = 0
+
+    @property
+    def pages_skipped(self) -> int:
+        return self.pages_not_modified + self.pages_unchanged
+
+    def add(self, result: CatalogSweepResult) -> None:
+        self.pages += 1
+        if result.status == 'failed':
+            self.pages_failed += 1
+            return
+        if result.status == 'not_modified':
+            self.pages_not_modified += 1
+        elif result.status == 'unchanged':
+            self.pages_unchanged += 1
+        else:
+            self.pages_processed += 1
+        self.sections += result.sections
+        self.sections_processed += len(result.changed_sections)
+        self.sections_skipped += result.sections - len(result.changed_sections)
+
+    def summary(self) -> str:
+        return (
+            f"Swept {self.pages} pages: {self.pages_skipped} skipped ({self.pages_not_modified} not modified, "
+            f"{self.pages_unchanged} unchanged), {self.pages_processed} re-processed, {self.pages_failed} failed; "
+            f"{self.sections} sections: {self.sections_skipped} skipped, {self.sections_processed} re-processed"
+        )
+
+async def iter_sweep(
+    catalogs: Iterable[UniversityCatalogOutput],
+    max_concurrency: int = get_uni_courses.DEFAULT_MAX_CONCURRENCY,
+    max_distance: Optional[int] = None
+) -> AsyncIterator[CatalogSweepResult]:
+    """Sweep catalogs concurrently (see get_uni_courses.sweep_catalog), yielding results as they complete"""
+    sweeps = (get_uni_courses.sweep_catalog(catalog, max_distance) for catalog in catalogs)
+    async for result in get_uni_courses.iter_completed(sweeps, max_concurrency):
+        yield result
+
+async def run_sweep(
+    catalogs: Iterable[UniversityCatalogOutput],
+    max_concurrency: int = get_uni_courses.DEFAULT_MAX_CONCURRENCY,
+    max_distance: Optional[int] = None,
+    output: Optional[TextIO] = None
+) -> SweepReport:
+    """
+    Sweep catalogs and tally what was skipped.
+
+    Args:
+        catalogs: Cached lookup results, e.g. get_catalog_cache().values()
+        max_concurrency: Pages checked at once
+        max_distance: See get_uni_courses.sweep_catalog
+        output: If given, receives one JSON line per re-processed or failed page
+
+    Returns:
+        SweepReport with page and section counts
+    """
+    report = SweepReport()
+    try:
+        async for result in iter_sweep(catalogs, max_concurrency, max_distance):
+            report.add(result)
+            if output is not None and not result.skipped:
+                output.write(result.model_dump_json() + '\n')
+                output.flush()
+    finally:
+        await catalog_fetch.get_fetcher().aclose()
+    return report
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-o', '--output', help="JSONL file for re-processed pages ('-' for stdout)")
+    parser.add_argument('-c', '--concurrency', type=int, default=get_uni_courses.DEFAULT_MAX_CONCURRENCY)
+    parser.add_argument('--max-distance', type=int, default=os.getenv('CATALOG_SWEEP_MAX_DISTANCE'),
+                        help='simhash bits a changed section may differ by and still be skipped')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    catalogs = get_uni_courses.get_catalog_cache().values()
+    to_stdout = args.output == '-'
+    output = sys.stdout if to_stdout else open(args.output, 'w', encoding='utf-8') if args.output else None
+    try:
+        report = asyncio.run(run_sweep(catalogs, args.concurrency, args.max_distance, output))
+    finally:
+        if output is not None and not to_stdout:
+            output.close()
+    if args.json:
+        print(json.dumps({**report.model_dump(), 'pages_skipped': report.pages_skipped}), file=sys.stderr)
+    else:
+        print(report.summary(), file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, field_validator
+
+RULES_FORMAT = 1
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'url_rules.json')
+DEFAULT_RELOAD_INTERVAL = 5.0
+
+class URLRule(BaseModel):
+    """Rewrite of an outdated catalog URL to the page that replaced it"""
+    host: str
+    path_prefix: str = ''
+    # Substring the university name must contain; empty applies to every university
+    university: str = ''
+    target: str
+
+    @field_validator('host', 'path_prefix', 'university')
+    @classmethod
+    def _lowercase(cls, value: str) -> str:
+        return value.lower()
+
+    def applies(self, path: str, university_lower: str) -> bool:
+        return path.startswith(self.path_prefix) and self.university in university_lower
+
+class URLRuleSet(BaseModel):
+    """Contents of a versioned rules file"""
+    format: int = RULES_FORMAT
+    version: str = ''
+    rules: List[URLRule] = []
+
+    @field_validator('format')
+    @classmethod
+    def _supported_format(cls, value: int) -> int:
+        if value != RULES_FORMAT:
+            raise ValueError(f"Unsupported URL rules format {value} (expected {RULES_FORMAT})")
+        return value
+
+_NETLOC_END = re.compile(r'[/?#]')
+_PATH_END = re.compile(r'[?#]')
+
+def split_host_path(url: str) -> Tuple[str, str]:
+    """
+    Lowercased host (without credentials or port) and path of an absolute URL.
+
+    Equivalent to urlsplit() for the parts the rules look at, at a fraction of the cost.
+    """
+    url = url.strip().lower()
+    scheme_end = url.find('//')
+    rest = url[scheme_end + 2:] if scheme_end >= 0 else url
+    end = _NETLOC_END.search(rest)
+    netloc, tail = (rest[:end.start()], rest[end.start():]) if end else (rest, '')
+    path = ''
+    if tail.startswith('/'):
+        path_end = _PATH_END.search(tail)
+        path = tail[:path_end.start()] if path_end else tail
+    host = netloc.rpartition('@')[2]
+    if host.startswith('['):
+        return host.partition(']')[0] + ']', path
+    return host.partition(':')[0].rstrip('.'), path
+
+def build_index(rules: List[URLRule]) -> Dict[str, Tuple[URLRule, ...]]:
+    """Group rules by host, keeping file order within each host"""
+    index: Dict[str, List[URLRule]] = {}
+    for rule in rules:
+        index.setdefault(rule.host, []).append(rule)
+    return {host: tuple(host_rules) for host, host_rules in index.items()}
+
+class URLRuleRegistry:
+    """
+    URL normalization rules loaded from a JSON file and indexed by host.
+
+    A rule for 'catalog.mit.edu' also covers its subdomains, and one for 'mit.edu'
+    covers the whole registered domain. Lookup walks the URL's host and parent
+    domains, so its cost depends on the number of labels, not on the number of rules.
+    The file is re-read when its modification time changes, checked at most every
+    reload_interval seconds (never if it is negative); a file that fails to parse leaves the previous rules in place.
+    """
+
+    def __init__(self, path: Optional[str] = None, reload_interval: float = DEFAULT_RELOAD_INTERVAL):
+        self.path = path or DEFAULT_RULES_PATH
+        self.reload_interval = reload_interval
+        self.version = ''
+        self.load_error: Optional[str] = None
+        self._index: Dict[str, Tuple[URLRule, ...]] = {}
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def __len__(self) -> int:
+        return sum(len(rules) for rules in self._index.values())
+
+    def reload(self) -> bool:
+        """Re-read the rules file; returns False (keeping the current rules) if it cannot be loaded"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime
+                with open(self.path, encoding='utf-8') as f:
+                    rule_set = URLRuleSet.model_validate(json.load(f))
+            except (OSError, ValueError) as e:
+                self.load_error = str(e)
+                return False
+            # Swap in the new index in one assignment so concurrent lookups see either version
+            self._index = build_index(rule_set.rules)
+            self.version = rule_set.version
+            self._mtime = mtime
+            self.load_error = None
+            return True
+
+    def _maybe_reload(self) -> None:
+        if time.monotonic() - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+
+    def find(self, url: str, university_name: str) -> Optional[URLRule]:
+        """First rule that applies to a URL, most specific host first"""
+        if self.reload_interval >= 0:
+            self._maybe_reload()
+        index = self._index
+        host, path = split_host_path(url)
+        university_lower = university_name.lower()
+        while host:
+            for rule in index.get(host, ()):
+                if rule.applies(path, university_lower):
+                    return rule
+            host = host.partition('.')[2]
+        return None
+
+    def normalize(self, url: str, university_name: str) -> str:
+        rule = self.find(url, university_name)
+        return rule.target if rule is not None else url
+
+_registry: Optional[URLRuleRegistry] = None
+
+def get_url_rules() -> URLRuleRegistry:
+    """Return the process-wide rule registry, loading CATALOG_URL_RULES_PATH on first use"""
+    global _registry
+    if _registry is None:
+        _registry = URLRuleRegistry(
+            path=os.getenv('CATALOG_URL_RULES_PATH') or None,
+            reload_interval=float(os.getenv('CATALOG_URL_RULES_RELOAD', DEFAULT_RELOAD_INTERVAL))
+        )
+    return _registry
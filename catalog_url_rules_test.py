@@ -0,0 +1,62 @@
+"""
+Tests for URL rules: matching by host and parent domain, and hot reloading of the rules file.
+
+    python -m pytest catalog_url_rules_test.py
+"""
+import json
+import os
+
+from catalog_url_rules import URLRuleRegistry, split_host_path
+
+RULES = [
+    {'host': 'catalog.mit.edu', 'path_prefix': '/subjects', 'target': 'https://catalog.mit.edu/subjects/6/'},
+    {'host': 'mit.edu', 'target': 'https://catalog.mit.edu/'},
+    {'host': 'catalog.wustl.edu', 'university': 'Washington University', 'target': 'https://bulletin.wustl.edu/'},
+]
+
+def _write(path, rules, version, mtime):
+    path.write_text(json.dumps({'format': 1, 'version': version, 'rules': rules}))
+    os.utime(path, (mtime, mtime))
+
+def test_split_host_path():
+    assert split_host_path('HTTPS://user@Catalog.MIT.edu.:443/Subjects/6?x=1#top') == ('catalog.mit.edu', '/subjects/6')
+    assert split_host_path('http://[::1]:8080') == ('[::1]', '')
+
+def test_rules_cover_subdomains_most_specific_first(tmp_path):
+    path = tmp_path / 'url_rules.json'
+    _write(path, RULES, 'v1', 1000)
+    registry = URLRuleRegistry(str(path), reload_interval=-1)
+    assert len(registry) == 3 and registry.version == 'v1'
+    assert registry.normalize('http://catalog.mit.edu/subjects/6-1', 'MIT') == 'https://catalog.mit.edu/subjects/6/'
+    # Paths the specific rule doesn't cover fall through to the parent domain
+    assert registry.normalize('http://catalog.mit.edu/archive', 'MIT') == 'https://catalog.mit.edu/'
+    assert registry.normalize('http://www.eecs.mit.edu/courses', 'MIT') == 'https://catalog.mit.edu/'
+    # A suffix that isn't a whole label is a different host
+    assert registry.normalize('http://notmit.edu/courses', 'MIT') == 'http://notmit.edu/courses'
+    assert registry.normalize('http://catalog.wustl.edu/', 'Washington University in St. Louis') == 'https://bulletin.wustl.edu/'
+    assert registry.normalize('http://catalog.wustl.edu/', 'University of Washington') == 'http://catalog.wustl.edu/'
+
+def test_rules_file_is_reloaded_when_it_changes(tmp_path):
+    path = tmp_path / 'url_rules.json'
+    _write(path, RULES, 'v1', 1000)
+    registry = URLRuleRegistry(str(path), reload_interval=0)
+    assert registry.normalize('http://www.mit.edu/', 'MIT') == 'https://catalog.mit.edu/'
+
+    _write(path, [{'host': 'www.mit.edu', 'target': 'https://student.mit.edu/catalog/'}], 'v2', 2000)
+    assert registry.normalize('http://www.mit.edu/', 'MIT') == 'https://student.mit.edu/catalog/'
+    assert registry.version == 'v2' and len(registry) == 1
+
+    # A file that fails to parse leaves the previous rules in place
+    path.write_text('{"format": 2, "rules": []}')
+    os.utime(path, (3000, 3000))
+    assert registry.normalize('http://www.mit.edu/', 'MIT') == 'https://student.mit.edu/catalog/'
+    assert registry.version == 'v2' and 'Unsupported URL rules format 2' in registry.load_error
+
+def test_reloading_waits_for_the_interval(tmp_path):
+    path = tmp_path / 'url_rules.json'
+    _write(path, RULES, 'v1', 1000)
+    registry = URLRuleRegistry(str(path), reload_interval=3600)
+    _write(path, [], 'v2', 2000)
+    assert registry.normalize('http://www.mit.edu/', 'MIT') == 'https://catalog.mit.edu/'
+    assert registry.reload() and registry.version == 'v2'
+    assert registry.normalize('http://www.mit.edu/', 'MIT') == 'http://www.mit.edu/'
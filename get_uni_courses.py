@@ -1,15 +1,41 @@
-from agents import Agent, Runner, InputGuardrail, GuardrailFunctionOutput
-from agents import set_default_openai_key
-from agents import set_tracing_export_api_key
 from pydantic import BaseModel
+import asyncio
+import codecs
+import itertools
 import os
-import requests
-from typing import Optional
+import sys
+from types import ModuleType
+from typing import TYPE_CHECKING, AsyncIterable, AsyncIterator, Awaitable, Iterable, Iterator, List, Optional, Tuple, TypeVar
 from urllib.parse import urlparse
 import re
 
-set_default_openai_key(os.getenv("OPENAI_API_KEY"))
-set_tracing_export_api_key(os.getenv("OPENAI_API_KEY"))
+from catalog_dedup import SingleFlight, TTLCache
+from catalog_extract import CourseRecord, aiter_courses, iter_courses
+from catalog_indicators import COURSE_SECTION_PATTERNS, IndicatorMatches, matcher_for, university_keys
+from catalog_metrics import metrics
+from catalog_probe import DEFAULT_MIN_SCORE, candidate_urls, first_confident, probe_score, templates_from_instructions
+
+# The agents SDK (and the OpenAI client under it) takes about a second to import, so it
+# is only loaded when an agent is first needed; verify_url and friends never touch it.
+# catalog_fetch (requests and httpx) and the cache, store, index and pool modules add
+# a few hundred ms more between them, so they are imported where first used too
+if TYPE_CHECKING:
+    from agents import Agent, ModelProvider, RunConfig
+    from catalog_cache import CatalogCache, PageCache
+
+T = TypeVar('T')
+
+_sdk: Optional[ModuleType] = None
+
+def _agents_sdk() -> ModuleType:
+    """Import the agents SDK and configure the OpenAI keys on first use"""
+    global _sdk
+    if _sdk is None:
+        import agents
+        agents.set_default_openai_key(os.getenv("OPENAI_API_KEY"))
+        agents.set_tracing_export_api_key(os.getenv("OPENAI_API_KEY"))
+        _sdk = agents
+    return _sdk
 
 class URLVerificationResult(BaseModel):
     url: str
@@ -23,173 +49,483 @@ class URLNormalizer:
     @staticmethod
     def normalize_url(url: str, university_name: str) -> str:
         """Normalize URLs based on university-specific patterns"""
-        url_lower = url.lower()
-        university_lower = university_name.lower()
-
-        # Common URL transformations for specific universities
-        university_patterns = {
-            'stanford': {
-                'old_patterns': [
-                    'exploredegrees.stanford.edu/schoolofengineering/computerscience',
-                    'exploredegrees.stanford.edu/computerscience'
-                ],
-                'new_pattern': 'bulletin.stanford.edu/departments/COMPUTSCI/courses'
-            },
-            'berkeley': {
-                'old_patterns': ['guide.berkeley.edu/courses'],
-                'new_pattern': 'www2.eecs.berkeley.edu/Courses/CS'
-            },
-            'mit': {
-                'old_patterns': ['catalog.mit.edu'],
-                'new_pattern': 'student.mit.edu/catalog/m6a.html'
-            }
-        }
-
-        # Check for university-specific transformations
-        for uni, patterns in university_patterns.items():
-            if uni in university_lower:
-                for old_pattern in patterns['old_patterns']:
-                    if old_pattern in url_lower:
-                        return f"https://{patterns['new_pattern']}"
-
-        return url
-
-def verify_url(url: str, university_name: str = "") -> URLVerificationResult:
-    try:
-        # Parse URL
+        # Rules live in url_rules.json, indexed by host (see catalog_url_rules)
+        from catalog_url_rules import get_url_rules
+        return get_url_rules().normalize(url, university_name)
+
+def _invalid_result(url: str, error_message: str) -> URLVerificationResult:
+    return URLVerificationResult(
+        url=url,
+        is_valid=False,
+        domain_verified=False,
+        is_accessible=False,
+        contains_cs_courses=False,
+        error_message=error_message
+    )
+
+def _prepare_url(url: str, university_name: str) -> Tuple[str, bool]:
+    """Validate and normalize a URL, returning it with its domain verification flag"""
+    # Parse URL
+    parsed = urlparse(url)
+    if not parsed.scheme or not parsed.netloc:
+        raise ValueError("Invalid URL format")
+
+    # Normalize URL based on university patterns
+    normalized_url = URLNormalizer.normalize_url(url, university_name)
+    
+    # If URL was normalized, update the parsed URL
+    if normalized_url != url:
+        url = normalized_url
         parsed = urlparse(url)
-        if not parsed.scheme or not parsed.netloc:
-            return URLVerificationResult(
-                url=url,
-                is_valid=False,
-                domain_verified=False,
-                is_accessible=False,
-                contains_cs_courses=False,
-                error_message="Invalid URL format"
-            )
 
-        # Normalize URL based on university patterns
-        normalized_url = URLNormalizer.normalize_url(url, university_name)
-        
-        # If URL was normalized, update the parsed URL
-        if normalized_url != url:
-            url = normalized_url
-            parsed = urlparse(url)
-
-        # Check if domain is .edu or known university domain
-        domain_verified = parsed.netloc.endswith('.edu') or any(
-            known_domain in parsed.netloc 
+    return url, _domain_verified(parsed.hostname or '', university_name)
+
+def _domain_verified(host: str, university_name: str) -> bool:
+    """Whether a host belongs to a university, and to the one named if the domain index knows both"""
+    from catalog_domains import get_domain_index
+    index = get_domain_index()
+    owner = index.owner(host) if index is not None else None
+    if owner is None:
+        # Hosts the index doesn't list (or no index): .edu or a university-looking host name
+        return host.endswith('.edu') or any(
+            known_domain in host
             for known_domain in ['university', 'college', 'institute', 'uni.']
         )
+    named = index.lookup(university_name) if university_name else None
+    return named is None or named.name == owner.name
+
+def university_domain(university_name: str) -> Optional[str]:
+    """The university's primary web domain from the local domain index, if it is listed"""
+    from catalog_domains import get_domain_index
+    index = get_domain_index()
+    match = index.lookup(university_name) if index is not None else None
+    return match.domains[0] if match is not None and match.domains else None
+
+def _analyze_content(
+    url: str,
+    text: str,
+    university_name: str,
+    domain_verified: bool,
+    is_accessible: bool
+) -> URLVerificationResult:
+    """Check fetched page text for CS course indicators and pick the best course section anchor"""
+    # Enhanced content checking for CS course indicators
+    with metrics.stage('scan'):
+        content = text.lower()
+        matches = matcher_for(university_name).scan(content, exhaustive=False)
+    return _result_from_matches(url, matches, domain_verified, is_accessible)
+
+def _result_from_matches(
+    url: str,
+    matches: IndicatorMatches,
+    domain_verified: bool,
+    is_accessible: bool
+) -> URLVerificationResult:
+    # If URL doesn't end with a course section pattern, try to find one
+    if _needs_anchor(url):
+        # Only append anchor if the base URL doesn't already point to a course listing
+        if not matches.university_pattern_matched:
+            anchor = matches.best_anchor()
+            if anchor:
+                url = f"{url.split('#')[0]}{anchor}"
+
+    return URLVerificationResult(
+        url=url,
+        is_valid=True,
+        domain_verified=domain_verified,
+        is_accessible=is_accessible,
+        contains_cs_courses=matches.contains_cs_courses
+    )
+
+def _needs_anchor(url: str) -> bool:
+    return not any(url.endswith(pattern) for pattern in COURSE_SECTION_PATTERNS)
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def _charset(content_type: Optional[str]) -> str:
+    match = re.search(r'charset=["\']?([\w.:-]+)', content_type or '', re.IGNORECASE)
+    if match:
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return 'utf-8'
+
+class _BodyDecoder:
+    """Decodes a streamed body chunk by chunk, up to max_bytes of it"""
+
+    def __init__(self, content_type: Optional[str], max_bytes: int):
+        self.decoder = codecs.getincrementaldecoder(_charset(content_type))(errors='replace')
+        self.remaining = max_bytes
+        self.read = 0
+
+    def decode(self, chunk: bytes) -> str:
+        chunk = chunk[:self.remaining]
+        self.remaining -= len(chunk)
+        self.read += len(chunk)
+        return self.decoder.decode(chunk)
+
+    @property
+    def full(self) -> bool:
+        return self.remaining <= 0
+
+    def finish(self) -> str:
+        return self.decoder.decode(b'', final=True)
+
+def _decoded_chunks(chunks: Iterable[bytes], decoder: _BodyDecoder) -> Iterator[str]:
+    """Text of a streamed body, stopping after the decoder's max_bytes"""
+    for chunk in chunks:
+        yield decoder.decode(chunk)
+        if decoder.full:
+            return
+    yield decoder.finish()
 
-        # Check if URL is accessible
-        response = requests.get(url, timeout=10, allow_redirects=True)
+async def _adecoded_chunks(chunks: AsyncIterable[bytes], decoder: _BodyDecoder) -> AsyncIterator[str]:
+    """Async form of _decoded_chunks"""
+    async for chunk in chunks:
+        yield decoder.decode(chunk)
+        if decoder.full:
+            return
+    yield decoder.finish()
+
+_page_cache: Optional["PageCache"] = None
+
+def get_page_cache() -> "PageCache":
+    """Return the process-wide page cache used for conditional revalidation, opening it on first use"""
+    global _page_cache
+    if _page_cache is None:
+        from catalog_cache import PageCache
+        _page_cache = PageCache(URLVerificationResult, path=os.getenv("CATALOG_PAGE_CACHE_PATH") or None)
+    return _page_cache
+
+def _verify_response(url: str, university_name: str, domain_verified: bool, response) -> URLVerificationResult:
+    """Analyze a fetched page, reusing the cached body and verdict when the server answers 304"""
+    page_cache = get_page_cache()
+    if response.status_code == 304:
+        page_cache.record(hit=True)
+        metrics.increment('page_cache_total', result='revalidated')
+        cached_result = page_cache.get_verdict(url, university_name)
+        if cached_result is not None:
+            return cached_result
+        text = page_cache.get_text(url)
+        if text is None:
+            raise ValueError("Server answered 304 Not Modified but the cached page is gone")
+        is_accessible = True
+    else:
         is_accessible = response.status_code == 200
+        text = response.text
+        _record_download(url, response)
 
-        # Enhanced content checking for CS course indicators
-        content = response.text.lower()
-        
-        # University-specific content patterns
-        university_content_patterns = {
-            'stanford': {
-                'course_patterns': [
-                    r'cs\s*\d{2,3}[a-z]?',  # CS 106A, CS 229, etc.
-                    r'computer science.*?units',
-                    r'bulletin.*?courses'
-                ]
-            },
-            'berkeley': {
-                'course_patterns': [
-                    r'compsci\s*\d{2,3}[a-z]?',
-                    r'cs\s*\d{2,3}[a-z]?'
-                ]
-            },
-            'mit': {
-                'course_patterns': [
-                    r'6\.\d{3,4}',  # MIT's course numbering
-                    r'course\s*6'
-                ]
-            }
-        }
-
-        # Add university-specific patterns if available
-        additional_patterns = []
-        for uni, patterns in university_content_patterns.items():
-            if uni in university_name.lower():
-                additional_patterns.extend(patterns['course_patterns'])
-
-        # Common course section anchors with priority order
-        course_section_patterns = [
-            '#coursestext',
-            '#courses',
-            '#course-list',
-            '#course-descriptions',
-            '#programrequirementstext',
-            '#curriculum'
-        ]
-        
-        # If URL doesn't end with a course section pattern, try to find one
-        if not any(url.endswith(pattern) for pattern in course_section_patterns):
-            # Only append anchor if the base URL doesn't already point to a course listing
-            if not any(re.search(pattern, content) for pattern in additional_patterns):
-                base_url = url.split('#')[0]
-                for pattern in course_section_patterns:
-                    if pattern in content:
-                        url = f"{base_url}{pattern}"
-                        break
-
-        # Enhanced CS course indicators with more specific patterns
-        cs_indicators = [
-            'computer science',
-            'course description',
-            'undergraduate courses',
-            'cs courses',
-            'course catalog',
-            'degree requirements',
-            'course number',
-            'credits',
-            'prerequisites',
-            'cs \d{3}',
-            'computer science courses'
-        ]
-        
-        # Combine common patterns with university-specific ones
-        course_listing_indicators = [
-            'cs \d{3}',
-            'comp \d{3}',
-            'computer science \d{3}',
-            'course number.*?description',
-            'credits.*?prerequisites'
-        ] + additional_patterns
-        
-        contains_cs_courses = (
-            any(indicator in content for indicator in cs_indicators) or
-            any(re.search(pattern, content, re.IGNORECASE) for pattern in course_listing_indicators)
-        )
+    result = _analyze_content(url, text, university_name, domain_verified, is_accessible)
+    if is_accessible:
+        page_cache.put_verdict(url, university_name, result)
+    return result
 
-        return URLVerificationResult(
-            url=url,
-            is_valid=True,
-            domain_verified=domain_verified,
-            is_accessible=is_accessible,
-            contains_cs_courses=contains_cs_courses
-        )
+async def _verify_response_async(
+    url: str,
+    university_name: str,
+    domain_verified: bool,
+    response
+) -> URLVerificationResult:
+    """_verify_response, with a large downloaded page analyzed on the analysis pool when one is configured"""
+    from catalog_analysis import get_analysis_pool
+    pool = get_analysis_pool()
+    if response.status_code != 200:
+        return _verify_response(url, university_name, domain_verified, response)
+    if pool is None or not pool.worth_running(response.content):
+        # Decoding, compressing into the page cache and store, and analyzing all take CPU
+        # time that would otherwise stall every other lookup on the loop
+        return await asyncio.to_thread(_verify_response, url, university_name, domain_verified, response)
+    # The page cache and store decode and compress the body while a worker analyzes it
+    recording = asyncio.ensure_future(asyncio.to_thread(_record_download, url, response))
+    try:
+        with metrics.stage('analyze'):
+            result = await pool.run(
+                analyze_page, response.content, url, response.headers.get('Content-Type'), university_name, domain_verified
+            )
+    finally:
+        await recording
+    get_page_cache().put_verdict(url, university_name, result)
+    return result
+
+def analyze_page(
+    body: bytes,
+    url: str,
+    content_type: Optional[str],
+    university_name: str,
+    domain_verified: bool,
+    is_accessible: bool = True
+) -> URLVerificationResult:
+    """
+    The analysis half of verify_url: decode a fetched body and check it for CS course indicators.
+
+    Needs no network or caches, so it can run in an AnalysisPool worker; body may be any
+    bytes-like object, such as a memoryview of shared memory.
+    """
+    text = str(body, _charset(content_type), 'replace')
+    return _analyze_content(url, text, university_name, domain_verified, is_accessible)
+
+def _record_download(url: str, response) -> None:
+    """Count a downloaded body and keep a successful one in the page cache and page store"""
+    metrics.increment('bytes_fetched_total', len(response.content))
+    if response.status_code != 200:
+        return
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if etag or last_modified:
+        page_cache = get_page_cache()
+        page_cache.record(hit=False)
+        metrics.increment('page_cache_total', result='downloaded')
+        page_cache.put(url, etag, last_modified, response.text)
+    _store_page(url, response)
+
+def _store_page(url: str, response) -> None:
+    """Keep the full body in the page store for later offline re-analysis"""
+    from catalog_store import get_page_store
+    store = get_page_store()
+    if store is None:
+        return
+    try:
+        with metrics.stage('store'):
+            store.put(url.split('#')[0], response.content, response.headers.get('Content-Type'))
+    except OSError:
+        # A full or unwritable store must not fail verification; the stage counted the error
+        pass
+
+def stored_page_text(url: str) -> Optional[str]:
+    """Decoded body of the stored copy of a URL (fragment ignored), or None"""
+    from catalog_store import get_page_store
+    store = get_page_store()
+    page = store.get(url.split('#')[0]) if store is not None else None
+    if page is None:
+        return None
+    return page.body.decode(_charset(page.content_type), errors='replace')
 
+def verify_stored(url: str, university_name: str = "") -> Optional[URLVerificationResult]:
+    """
+    Run verify_url's checks against the stored copy of a page, without touching the network.
+
+    Useful to re-analyze every stored page after the indicators or university patterns change.
+
+    Returns:
+        URLVerificationResult as verify_url would give for the stored body, or None if the
+        page store holds no copy of the (normalized) URL
+    """
+    try:
+        url, domain_verified = _prepare_url(url, university_name)
     except Exception as e:
-        return URLVerificationResult(
-            url=url,
-            is_valid=False,
-            domain_verified=False,
-            is_accessible=False,
-            contains_cs_courses=False,
-            error_message=str(e)
+        return _invalid_result(url, str(e))
+    text = stored_page_text(url)
+    if text is None:
+        return None
+    return _analyze_content(url, text, university_name, domain_verified, True)
+
+def _verify_streaming(url: str, university_name: str, domain_verified: bool, max_bytes: int) -> URLVerificationResult:
+    import catalog_fetch
+    scanner = matcher_for(university_name).scanner(need_anchor=_needs_anchor(url))
+    response = catalog_fetch.fetch(url, stream=True)
+    with response:
+        decoder = _BodyDecoder(response.headers.get('Content-Type'), max_bytes)
+        try:
+            for text in _decoded_chunks(response.iter_content(STREAM_CHUNK_SIZE), decoder):
+                # Stop reading once the verdict is decided
+                if scanner.feed(text.lower()):
+                    break
+        finally:
+            metrics.increment('bytes_fetched_total', decoder.read)
+    return _result_from_matches(url, scanner.result(), domain_verified, response.status_code == 200)
+
+async def _verify_streaming_async(
+    url: str,
+    university_name: str,
+    domain_verified: bool,
+    max_bytes: int
+) -> URLVerificationResult:
+    import catalog_fetch
+    scanner = matcher_for(university_name).scanner(need_anchor=_needs_anchor(url))
+    async with catalog_fetch.get_fetcher().stream(url) as response:
+        decoder = _BodyDecoder(response.headers.get('Content-Type'), max_bytes)
+        chunks = _adecoded_chunks(response.aiter_bytes(STREAM_CHUNK_SIZE), decoder)
+        try:
+            async for text in chunks:
+                if scanner.feed(text.lower()):
+                    break
+        finally:
+            await chunks.aclose()
+            metrics.increment('bytes_fetched_total', decoder.read)
+    return _result_from_matches(url, scanner.result(), domain_verified, response.status_code == 200)
+
+DEFAULT_VERIFY_TTL = 60.0
+DEFAULT_VERIFY_CACHE_SIZE = 1024
+
+_verification_cache: Optional[TTLCache] = None
+_verification_flights = SingleFlight()
+
+def get_verification_cache() -> TTLCache:
+    """Return the process-wide in-memory cache of recent verification results, creating it on first use"""
+    global _verification_cache
+    if _verification_cache is None:
+        _verification_cache = TTLCache(
+            max_entries=int(os.getenv("CATALOG_VERIFY_CACHE_SIZE", DEFAULT_VERIFY_CACHE_SIZE)),
+            ttl_seconds=float(os.getenv("CATALOG_VERIFY_TTL", DEFAULT_VERIFY_TTL))
         )
+    return _verification_cache
+
+VerificationKey = Tuple[str, Tuple[str, ...], bool, Optional[int]]
+
+def _verification_key(
+    url: str,
+    university_name: str,
+    domain_verified: bool,
+    stream: bool,
+    max_bytes: int
+) -> VerificationKey:
+    # The verdict depends on the page, on which university patterns apply to it, on
+    # whether the host belongs to the named university and on how much of the page was
+    # read: a streamed scan stops at max_bytes, so its verdict is only shared with
+    # streamed verifications under the same cap, never with buffered ones
+    return url, university_keys(university_name), domain_verified, max_bytes if stream else None
+
+def _cached_verification(key: VerificationKey) -> Optional[URLVerificationResult]:
+    result = get_verification_cache().get(key)
+    metrics.increment('verification_cache_total', result='hit' if result is not None else 'miss')
+    return result
+
+def _remember(key: VerificationKey, result: URLVerificationResult) -> URLVerificationResult:
+    # Only successful fetches are reused; the next caller retries a failure
+    if result.is_accessible and result.error_message is None:
+        get_verification_cache().put(key, result)
+    return result
+
+def _verify_prepared(
+    url: str,
+    university_name: str,
+    domain_verified: bool,
+    stream: bool,
+    max_bytes: int
+) -> URLVerificationResult:
+    import catalog_fetch
+    try:
+        if stream:
+            with metrics.stage('stream_verify'):
+                return _verify_streaming(url, university_name, domain_verified, max_bytes)
+
+        # Check if URL is accessible, revalidating any cached copy
+        with metrics.stage('fetch'):
+            headers = get_page_cache().revalidation_headers(url)
+            response = catalog_fetch.fetch(url, headers=headers)
+
+        return _verify_response(url, university_name, domain_verified, response)
+
+    except Exception as e:
+        return _invalid_result(url, str(e))
+
+async def _verify_prepared_async(
+    url: str,
+    university_name: str,
+    domain_verified: bool,
+    stream: bool,
+    max_bytes: int
+) -> URLVerificationResult:
+    import catalog_fetch
+    try:
+        if stream:
+            with metrics.stage('stream_verify'):
+                return await _verify_streaming_async(url, university_name, domain_verified, max_bytes)
+
+        # Check if URL is accessible, revalidating any cached copy
+        with metrics.stage('fetch'):
+            headers = get_page_cache().revalidation_headers(url)
+            response = await catalog_fetch.get_fetcher().get(url, headers=headers)
+
+        return await _verify_response_async(url, university_name, domain_verified, response)
+
+    except Exception as e:
+        return _invalid_result(url, str(e))
+
+def verify_url(
+    url: str,
+    university_name: str = "",
+    stream: bool = False,
+    max_bytes: int = DEFAULT_MAX_BYTES
+) -> URLVerificationResult:
+    """
+    Verify that a URL is an accessible university page listing CS courses.
+
+    Successful results are kept in an in-memory LRU for CATALOG_VERIFY_TTL seconds
+    (default 60), keyed by normalized URL and the university patterns that apply.
+    Streamed results are cached apart from buffered ones (and per max_bytes), since a
+    streamed scan may stop before the part of the page that would change the verdict.
+    Returned results may be shared between callers and should not be modified.
+
+    Args:
+        url: Candidate catalog URL
+        university_name: Name of the university, used for normalization and patterns
+        stream: Scan the body as it downloads and stop reading once the verdict is
+            decided, holding only one chunk in memory. Streaming skips the page cache.
+        max_bytes: Maximum number of body bytes read in streaming mode
+
+    Returns:
+        URLVerificationResult, with the best course section anchor appended to the URL
+    """
+    try:
+        with metrics.stage('normalize'):
+            url, domain_verified = _prepare_url(url, university_name)
+    except Exception as e:
+        return _invalid_result(url, str(e))
+
+    key = _verification_key(url, university_name, domain_verified, stream, max_bytes)
+    cached = _cached_verification(key)
+    if cached is not None:
+        return cached
+    return _remember(key, _verify_prepared(url, university_name, domain_verified, stream, max_bytes))
+
+async def verify_url_async(
+    url: str,
+    university_name: str = "",
+    stream: bool = False,
+    max_bytes: int = DEFAULT_MAX_BYTES
+) -> URLVerificationResult:
+    """
+    Verify a catalog URL without blocking the event loop.
+
+    Same checks, arguments and result cache as verify_url, but the page is fetched with
+    an async HTTP client so concurrent verifications overlap instead of running one after
+    another. Concurrent verifications of the same normalized URL share one fetch.
+    """
+    try:
+        with metrics.stage('normalize'):
+            url, domain_verified = _prepare_url(url, university_name)
+    except Exception as e:
+        return _invalid_result(url, str(e))
+
+    key = _verification_key(url, university_name, domain_verified, stream, max_bytes)
+    cached = _cached_verification(key)
+    if cached is not None:
+        return cached
+
+    async def verify() -> URLVerificationResult:
+        result = await _verify_prepared_async(url, university_name, domain_verified, stream, max_bytes)
+        return _remember(key, result)
+
+    return await _verification_flights.run(key, verify)
 
 class UniversityCatalogOutput(BaseModel):
     university_name: str
     catalog_url: str
     verification_status: URLVerificationResult
 
+class UniversityCatalogAnswer(BaseModel):
+    university_name: str
+    catalog_url: str
+
+class UniversityCatalogBatchOutput(BaseModel):
+    # Only the URLs: their verification status comes from verify_url, not the model
+    catalogs: List[UniversityCatalogAnswer]
+
+NO_CATALOG_FOUND = "No Computer Science catalog found"
+
 verification_instructions = """
 You are a URL verification specialist. Your task is to:
 1. Verify that the provided URL is from an official university domain
@@ -198,15 +534,25 @@ You are a URL verification specialist. Your task is to:
 4. Return detailed verification results
 """
 
-verification_agent = Agent(
-    name="URL Verification Agent",
-    instructions=verification_instructions,
-    output_type=URLVerificationResult
-)
+_verification_agent: Optional["Agent"] = None
+
+def get_verification_agent() -> "Agent":
+    """Return the URL verification agent, building it on first use"""
+    global _verification_agent
+    if _verification_agent is None:
+        _verification_agent = _agents_sdk().Agent(
+            name="URL Verification Agent",
+            instructions=verification_instructions,
+            output_type=URLVerificationResult
+        )
+    return _verification_agent
 
 async def url_verification_guardrail(ctx, agent, input_data):
+    GuardrailFunctionOutput = _agents_sdk().GuardrailFunctionOutput
     if isinstance(input_data, str) and input_data.startswith('http'):
-        result = verify_url(input_data)
+        # The tripwire only needs reachability, so stop reading as soon as that is known
+        with metrics.stage('guardrail'):
+            result = await verify_url_async(input_data, stream=True)
         return GuardrailFunctionOutput(
             output_info=result,
             tripwire_triggered=not (result.is_valid and result.domain_verified and result.is_accessible)
@@ -251,39 +597,629 @@ Response format:
 }
 """
 
-agent = Agent(
-    name="Web Scraping Agent",
-    instructions=web_scraping_instructions,
-    output_type=UniversityCatalogOutput,
-    input_guardrails=[
-        InputGuardrail(guardrail_function=url_verification_guardrail),
+# Everything but the response format is shared, so a batch is searched the same way one university is
+batch_scraping_instructions = web_scraping_instructions.split("Response format:")[0] + """Input: a numbered list of universities or colleges, one per line. Handle each one as described above.
+
+Response format:
+{
+    "catalogs": [
+        {
+            "university_name": "University Name, exactly as listed",
+            "catalog_url": "URL or 'No Computer Science catalog found'"
+        },
+        ... one entry per listed university, in list order
     ]
-)
+}
+"""
+
+# The prioritized URL patterns above double as the fast path's probe templates
+CATALOG_URL_TEMPLATES = templates_from_instructions(web_scraping_instructions)
+PROBE_BYTES = 64 * 1024
+
+async def _probe_catalog_url(url: str, university_name: str) -> Optional[Tuple[float, URLVerificationResult]]:
+    """Score the first PROBE_BYTES of a candidate page; None if it can't be fetched or left the university's domain"""
+    import catalog_fetch
+    try:
+        headers = {'Range': f'bytes=0-{PROBE_BYTES - 1}'}
+        async with catalog_fetch.get_fetcher().stream(url, headers=headers, retry=False) as response:
+            if response.status_code not in (200, 206):
+                return None
+            # Servers that ignore Range send the whole page; read only the first PROBE_BYTES
+            decoder = _BodyDecoder(response.headers.get('Content-Type'), PROBE_BYTES)
+            parts = [text async for text in _adecoded_chunks(response.aiter_bytes(STREAM_CHUNK_SIZE), decoder)]
+            final_url = str(response.url)
+        metrics.increment('bytes_fetched_total', decoder.read)
+        url, domain_verified = _prepare_url(final_url, university_name)
+    except Exception:
+        return None
+    if not domain_verified:
+        # A redirect off the university's domain (or a domain that isn't its) never qualifies
+        return None
+    with metrics.stage('scan'):
+        matches = matcher_for(university_name).scan(''.join(parts).lower())
+    return probe_score(matches), _result_from_matches(url, matches, domain_verified, True)
+
+async def resolve_catalog_fast(
+    university_name: str,
+    domain: str,
+    min_score: Optional[float] = None
+) -> Optional[UniversityCatalogOutput]:
+    """
+    Find a catalog on a known domain by probing the usual URL patterns, without the agent.
 
-async def get_university_catalog(university_name: str) -> UniversityCatalogOutput:
+    The CATALOG_URL_TEMPLATES are expanded on the domain and probed concurrently with
+    small range requests; each page start is scored with the verification indicators.
+
+    Args:
+        university_name: Name of the university
+        domain: The university's web domain, e.g. 'mit.edu'
+        min_score: Confidence required (0-1); defaults to CATALOG_FAST_PATH_MIN_SCORE or 0.8
+
+    Returns:
+        UniversityCatalogOutput for the highest-priority confident match, or None
+    """
+    if min_score is None:
+        min_score = float(os.getenv("CATALOG_FAST_PATH_MIN_SCORE", DEFAULT_MIN_SCORE))
+    found = await first_confident(
+        candidate_urls(domain, CATALOG_URL_TEMPLATES),
+        lambda url: _probe_catalog_url(url, university_name),
+        min_score
+    )
+    if found is None:
+        return None
+    _, _, verification_result = found
+    return UniversityCatalogOutput(
+        university_name=university_name,
+        catalog_url=verification_result.url,
+        verification_status=verification_result
+    )
+
+_agent: Optional["Agent"] = None
+
+def get_agent() -> "Agent":
+    """Return the catalog search agent, building it (and importing the agents SDK) on first use"""
+    global _agent
+    if _agent is None:
+        sdk = _agents_sdk()
+        _agent = sdk.Agent(
+            name="Web Scraping Agent",
+            instructions=web_scraping_instructions,
+            output_type=UniversityCatalogOutput,
+            input_guardrails=[
+                sdk.InputGuardrail(guardrail_function=url_verification_guardrail),
+            ]
+        )
+    return _agent
+
+_batch_agent: Optional["Agent"] = None
+
+def get_batch_agent() -> "Agent":
+    """Return the agent that looks up a numbered list of universities in one run, building it on first use"""
+    global _batch_agent
+    if _batch_agent is None:
+        sdk = _agents_sdk()
+        _batch_agent = sdk.Agent(
+            name="Batch Web Scraping Agent",
+            instructions=batch_scraping_instructions,
+            output_type=UniversityCatalogBatchOutput,
+            input_guardrails=[
+                sdk.InputGuardrail(guardrail_function=url_verification_guardrail),
+            ]
+        )
+    return _batch_agent
+
+def _runner():
+    # A Runner assigned on this module (e.g. a benchmark's stub) takes precedence
+    return globals().get("Runner") or _agents_sdk().Runner
+
+def __getattr__(name: str):
+    # Keep the agents and Runner importable as module attributes without building them at import
+    if name == "agent":
+        return get_agent()
+    if name == "verification_agent":
+        return get_verification_agent()
+    if name == "batch_agent":
+        return get_batch_agent()
+    if name == "Runner":
+        return _agents_sdk().Runner
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+_model_provider: Optional["ModelProvider"] = None
+
+def set_model_provider(provider: Optional["ModelProvider"]) -> None:
+    """Run the agents on a specific model provider; None restores selection by CATALOG_MODEL_PROVIDER"""
+    global _model_provider
+    _model_provider = provider
+
+def get_run_config() -> Optional["RunConfig"]:
+    """
+    RunConfig for agent runs, or None for the SDK's OpenAI default.
+
+    CATALOG_MODEL_PROVIDER=local selects the deterministic LocalModelProvider (see
+    catalog_local_model for its latency settings); runs on it are not traced.
+    """
+    global _model_provider
+    from catalog_local_model import LocalModelProvider, local_provider_from_env
+    if _model_provider is None:
+        choice = os.getenv("CATALOG_MODEL_PROVIDER", "openai").lower()
+        if choice == "local":
+            _model_provider = local_provider_from_env()
+        elif choice != "openai":
+            raise ValueError(f"Unknown CATALOG_MODEL_PROVIDER {choice!r} (expected 'openai' or 'local')")
+    if _model_provider is None:
+        return None
+    return _agents_sdk().RunConfig(
+        model_provider=_model_provider,
+        tracing_disabled=isinstance(_model_provider, LocalModelProvider)
+    )
+
+_catalog_cache: Optional["CatalogCache"] = None
+
+def get_catalog_cache() -> "CatalogCache":
+    """Return the process-wide catalog cache, opening it on first use"""
+    global _catalog_cache
+    if _catalog_cache is None:
+        from catalog_cache import CatalogCache, DEFAULT_CATALOG_TTL
+        _catalog_cache = CatalogCache(
+            UniversityCatalogOutput,
+            path=os.getenv("CATALOG_CACHE_PATH") or None,
+            ttl_seconds=float(os.getenv("CATALOG_CACHE_TTL", DEFAULT_CATALOG_TTL))
+        )
+    return _catalog_cache
+
+_catalog_flights = SingleFlight()
+
+async def get_university_catalog(
+    university_name: str,
+    refresh: bool = False,
+    domain: Optional[str] = None
+) -> UniversityCatalogOutput:
     """
     Get the computer science course catalog URL for a given university.
+
+    Concurrent calls for the same university (by canonical name) share one lookup.
     
     Args:
         university_name: Name of the university
+        refresh: Skip the catalog cache and run a fresh lookup
+        domain: The university's web domain; looked up in the local domain index if
+            omitted. Likely catalog URLs on it are probed first (see
+            resolve_catalog_fast) when CATALOG_FAST_PATH=1, and the agent only
+            runs if none qualifies.
         
     Returns:
         UniversityCatalogOutput object containing the URL and verification status
     """
-    result = await Runner.run(agent, university_name)
+    from catalog_cache import canonicalize_university_name
+    key = (canonicalize_university_name(university_name), refresh, domain)
+    return await _catalog_flights.run(key, lambda: _run_catalog_lookup(university_name, refresh, domain))
+
+def _fast_path_enabled() -> bool:
+    return os.getenv("CATALOG_FAST_PATH", "").lower() in ("1", "true", "yes")
+
+async def _cached_or_probed(
+    university_name: str,
+    refresh: bool,
+    domain: Optional[str]
+) -> Optional[UniversityCatalogOutput]:
+    """The catalog from the cache or the fast path, or None if the agent has to find it"""
+    cache = get_catalog_cache()
+    if not refresh:
+        cached = cache.get(university_name)
+        metrics.increment('catalog_cache_total', result='hit' if cached is not None else 'miss')
+        if cached is not None:
+            return cached
+
+    domain = domain or university_domain(university_name)
+    if domain and _fast_path_enabled():
+        with metrics.stage('fast_path'):
+            fast_result = await resolve_catalog_fast(university_name, domain)
+        # Only a page on the university's own domain that answered is trusted without the agent
+        status = fast_result.verification_status if fast_result is not None else None
+        accepted = status is not None and status.domain_verified and status.is_accessible
+        metrics.increment('fast_path_total', result='hit' if accepted else 'miss')
+        if accepted:
+            cache.put(university_name, fast_result)
+            return fast_result
+    return None
+
+def _record_usage(result) -> None:
+    for response in getattr(result, 'raw_responses', ()):
+        metrics.increment('agent_requests_total')
+        metrics.increment('agent_tokens_total', response.usage.input_tokens, kind='input')
+        metrics.increment('agent_tokens_total', response.usage.output_tokens, kind='output')
+
+async def _verify_agent_output(output: UniversityCatalogOutput, university_name: str) -> UniversityCatalogOutput:
+    """Verify and normalize the catalog URL an agent found, caching the catalog if it checks out"""
+    if output.catalog_url != NO_CATALOG_FOUND:
+        with metrics.stage('verify_catalog'):
+            verification_result = await verify_url_async(output.catalog_url, university_name)
+        output.verification_status = verification_result
+        output.catalog_url = verification_result.url
+
+        # Only cache verified catalogs so transient failures are retried next time
+        if verification_result.is_valid and verification_result.is_accessible:
+            get_catalog_cache().put(university_name, output)
+    return output
+
+async def _run_catalog_lookup(university_name: str, refresh: bool, domain: Optional[str]) -> UniversityCatalogOutput:
+    found = await _cached_or_probed(university_name, refresh, domain)
+    if found is not None:
+        return found
+
+    with metrics.stage('agent_run'):
+        result = await _runner().run(get_agent(), university_name, run_config=get_run_config())
+    _record_usage(result)
     
     # If we got a URL, verify and potentially normalize it
-    if hasattr(result, 'final_output') and result.final_output.catalog_url != "No Computer Science catalog found":
-        verification_result = verify_url(result.final_output.catalog_url, university_name)
-        result.final_output.verification_status = verification_result
-        result.final_output.catalog_url = verification_result.url
+    if hasattr(result, 'final_output'):
+        await _verify_agent_output(result.final_output, university_name)
     
     return result.final_output
 
+def _match_batch_answers(
+    names: List[str],
+    catalogs: List[UniversityCatalogAnswer]
+) -> List[Optional[UniversityCatalogAnswer]]:
+    """Pair each listed name with its answer, by canonical name or else by list position"""
+    from catalog_cache import canonicalize_university_name
+    by_name = {}
+    for catalog in catalogs:
+        by_name.setdefault(canonicalize_university_name(catalog.university_name), catalog)
+    answers = [by_name.pop(canonicalize_university_name(name), None) for name in names]
+    # A model may restyle a name ('MIT' for 'Massachusetts Institute of Technology'); if it
+    # answered every line, an unclaimed answer still belongs to the name at its position
+    if len(catalogs) == len(names):
+        unclaimed = {id(catalog) for catalog in by_name.values()}
+        answers = [
+            catalogs[i] if answer is None and id(catalogs[i]) in unclaimed else answer
+            for i, answer in enumerate(answers)
+        ]
+    return [
+        None if answer is None else answer.model_copy(update={'university_name': name})
+        for name, answer in zip(names, answers)
+    ]
 
-if __name__ == "__main__":
-    import asyncio
+async def get_university_catalog_batch(
+    university_names: List[str],
+    refresh: bool = False
+) -> List[Optional[UniversityCatalogOutput]]:
+    """
+    Look up several universities with a single agent run.
+
+    Cached and fast-path catalogs are served as usual. The rest go to the batch agent as
+    one numbered list, so the instructions are sent once per batch instead of once per
+    university, and its answers are matched back to the names and verified.
+
+    Args:
+        university_names: Names of the universities
+        refresh: Skip the catalog cache
+
+    Returns:
+        One entry per name, in order: the catalog, or None where the batched run gave no
+        usable answer (the name was left out, or its URL failed verification) and the
+        university should be looked up on its own
+    """
+    from catalog_cache import canonicalize_university_name
+    outputs = list(await asyncio.gather(*(_cached_or_probed(name, refresh, None) for name in university_names)))
+    # Names that are the same university (by canonical name) are listed once
+    pending = {}
+    for position, (university_name, output) in enumerate(zip(university_names, outputs)):
+        if output is None:
+            pending.setdefault(canonicalize_university_name(university_name), []).append(position)
+    if not pending:
+        return outputs
+
+    listed = [university_names[positions[0]] for positions in pending.values()]
+    prompt = '\n'.join(f"{number}. {university_name}" for number, university_name in enumerate(listed, 1))
+    with metrics.stage('agent_batch_run'):
+        result = await _runner().run(get_batch_agent(), prompt, run_config=get_run_config())
+    _record_usage(result)
+
+    async def settle(university_name: str, answer: Optional[UniversityCatalogAnswer]) -> Optional[UniversityCatalogOutput]:
+        if answer is None:
+            return None
+        output = await _verify_agent_output(UniversityCatalogOutput(
+            university_name=university_name,
+            catalog_url=answer.catalog_url,
+            verification_status=_invalid_result(answer.catalog_url, "Not verified")
+        ), university_name)
+        status = output.verification_status
+        if output.catalog_url != NO_CATALOG_FOUND and not (status.is_valid and status.is_accessible):
+            return None
+        return output
+
+    answers = _match_batch_answers(listed, result.final_output.catalogs)
+    settled = await asyncio.gather(*(settle(name, answer) for name, answer in zip(listed, answers)))
+    for positions, output in zip(pending.values(), settled):
+        for position in positions:
+            outputs[position] = output
+    return outputs
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_BATCH_SIZE = 1
+
+class CatalogLookupResult(BaseModel):
+    university_name: str
+    catalog: Optional[UniversityCatalogOutput] = None
+    error_message: Optional[str] = None
+
+async def _lookup_catalog(index: int, university_name: str, refresh: bool) -> Tuple[int, CatalogLookupResult]:
+    """Run a single lookup, turning any failure into an error result"""
+    try:
+        catalog = await get_university_catalog(university_name, refresh=refresh)
+    except Exception as e:
+        return index, CatalogLookupResult(university_name=university_name, error_message=str(e))
+    return index, CatalogLookupResult(university_name=university_name, catalog=catalog)
 
+async def _lookup_catalogs(chunk: List[Tuple[int, str]], refresh: bool) -> List[Tuple[int, CatalogLookupResult]]:
+    """Look up a chunk of universities with one batched agent run, retrying individually what it didn't settle"""
+    if len(chunk) == 1:
+        return [await _lookup_catalog(*chunk[0], refresh)]
+    try:
+        catalogs = await get_university_catalog_batch([university_name for _, university_name in chunk], refresh)
+    except Exception:
+        catalogs = [None] * len(chunk)
+    results, retry = [], []
+    for (index, university_name), catalog in zip(chunk, catalogs):
+        if catalog is None:
+            retry.append((index, university_name))
+        else:
+            results.append((index, CatalogLookupResult(university_name=university_name, catalog=catalog)))
+    metrics.increment('batch_items_total', len(results), result='settled')
+    metrics.increment('batch_items_total', len(retry), result='retried')
+    results.extend(await asyncio.gather(*(_lookup_catalog(index, university_name, refresh) for index, university_name in retry)))
+    return results
+
+async def iter_completed(awaitables: Iterable[Awaitable[T]], max_concurrency: int) -> AsyncIterator[T]:
+    """
+    Run awaitables with at most max_concurrency in flight, yielding results as they complete.
+
+    awaitables is consumed lazily, one item per free slot, so it can be a generator of
+    coroutines over an input of any size. Tasks still running when the caller stops
+    iterating are cancelled.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    awaitables = iter(awaitables)
+    pending = set()
+    try:
+        while True:
+            for awaitable in awaitables:
+                pending.add(asyncio.ensure_future(awaitable))
+                if len(pending) >= max_concurrency:
+                    break
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def iter_indexed_university_catalogs(
+    university_names: Iterable[str],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    refresh: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> AsyncIterator[Tuple[int, CatalogLookupResult]]:
+    """Like iter_university_catalogs, but yields (position in university_names, result) pairs"""
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+
+    # Pull new names lazily, so a batch of thousands never materializes thousands of tasks at once
+    names = enumerate(university_names)
+    chunks = iter(lambda: list(itertools.islice(names, batch_size)), [])
+    async for results in iter_completed((_lookup_catalogs(chunk, refresh) for chunk in chunks), max_concurrency):
+        for result in results:
+            yield result
+
+async def iter_university_catalogs(
+    university_names: Iterable[str],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    refresh: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> AsyncIterator[CatalogLookupResult]:
+    """
+    Look up catalogs for many universities concurrently, yielding results as they complete.
+
+    Args:
+        university_names: Names of the universities, consumed lazily
+        max_concurrency: Maximum number of lookups (agent run plus URL verification) in flight;
+            with batching, the number of batches in flight
+        refresh: Skip the catalog cache and run fresh lookups
+        batch_size: Universities per agent run (see get_university_catalog_batch); names
+            a batched run doesn't settle are looked up individually
+
+    Yields:
+        CatalogLookupResult for each university, in completion order. A failed lookup
+        carries error_message instead of raising, so it doesn't abort the batch.
+    """
+    async for _, result in iter_indexed_university_catalogs(university_names, max_concurrency, refresh, batch_size):
+        yield result
+
+async def get_university_catalogs(
+    university_names: Iterable[str],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    refresh: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> List[CatalogLookupResult]:
+    """
+    Look up catalogs for many universities concurrently.
+
+    Args:
+        university_names: Names of the universities
+        max_concurrency: Maximum number of lookups (agent run plus URL verification) in flight;
+            with batching, the number of batches in flight
+        refresh: Skip the catalog cache and run fresh lookups
+        batch_size: Universities per agent run (see iter_university_catalogs)
+
+    Returns:
+        CatalogLookupResult for each university, in input order
+    """
+    results = {}
+    async for index, result in iter_indexed_university_catalogs(university_names, max_concurrency, refresh, batch_size):
+        results[index] = result
+    return [results[index] for index in range(len(results))]
+
+def iter_catalog_courses(url: str, max_bytes: int = DEFAULT_MAX_BYTES) -> Iterator[CourseRecord]:
+    """
+    Stream a catalog page and extract its course records.
+
+    Args:
+        url: Verified catalog URL (any #anchor is ignored)
+        max_bytes: Maximum number of body bytes read
+
+    Returns:
+        Generator of CourseRecord in page order; only the course being parsed is held in memory
+    """
+    import catalog_fetch
+    response = catalog_fetch.fetch(url.split('#')[0], stream=True)
+    with response:
+        response.raise_for_status()
+        decoder = _BodyDecoder(response.headers.get('Content-Type'), max_bytes)
+        yield from iter_courses(_decoded_chunks(response.iter_content(STREAM_CHUNK_SIZE), decoder))
+
+async def aiter_catalog_courses(url: str, max_bytes: int = DEFAULT_MAX_BYTES) -> AsyncIterator[CourseRecord]:
+    """Async form of iter_catalog_courses"""
+    import catalog_fetch
+    async with catalog_fetch.get_fetcher().stream(url.split('#')[0]) as response:
+        response.raise_for_status()
+        decoder = _BodyDecoder(response.headers.get('Content-Type'), max_bytes)
+        async for course in aiter_courses(_adecoded_chunks(response.aiter_bytes(STREAM_CHUNK_SIZE), decoder)):
+            yield course
+
+async def get_university_courses(university_name: str, refresh: bool = False) -> AsyncIterator[CourseRecord]:
+    """
+    Find a university's CS catalog and stream the courses listed on it.
+
+    Args:
+        university_name: Name of the university
+        refresh: Skip the catalog cache and run a fresh lookup
+
+    Returns:
+        Async generator of CourseRecord; empty if no verified catalog with CS courses was found
+    """
+    catalog = await get_university_catalog(university_name, refresh=refresh)
+    status = catalog.verification_status
+    if not (status.is_valid and status.is_accessible and status.contains_cs_courses):
+        return
+    from catalog_search import get_search_index
+    search_index = get_search_index()
+    courses = []
+    async for course in aiter_catalog_courses(catalog.catalog_url):
+        if search_index is not None:
+            courses.append(course)
+        yield course
+    if search_index is not None:
+        # Only complete listings are indexed, replacing the university's earlier courses
+        try:
+            await asyncio.to_thread(search_index.add_catalog, university_name, catalog.catalog_url, courses)
+        except OSError:
+            metrics.increment('errors_total', stage='search_index')
+
+class CatalogSweepResult(BaseModel):
+    university_name: str
+    url: str
+    # 'not_modified' (304), 'unchanged' (same content), 'changed', 'new' (no earlier
+    # fingerprint) or 'failed'; the first two are skipped without re-processing
+    status: str
+    sections: int = 0
+    changed_sections: List[str] = []
+    removed_sections: List[str] = []
+    # Courses of the changed sections only
+    courses: List[CourseRecord] = []
+    verification_status: Optional[URLVerificationResult] = None
+    error_message: Optional[str] = None
+
+    @property
+    def skipped(self) -> bool:
+        return self.status in ('not_modified', 'unchanged')
+
+async def sweep_catalog(catalog: UniversityCatalogOutput, max_distance: Optional[int] = None) -> CatalogSweepResult:
+    """
+    Re-check a cached catalog page, re-processing only what changed since it was last swept.
+
+    The page is revalidated against the page cache and fingerprinted (see
+    catalog_fingerprint). A 304 answer, an identical page, or a page whose course sections
+    all match the stored fingerprint is skipped. Otherwise the page is verified again and
+    courses are extracted from the changed sections only. The new fingerprint is stored
+    next to the verdict in the page cache, and the catalog cache entry is refreshed.
+
+    Args:
+        catalog: Cached lookup result whose catalog_url is re-checked
+        max_distance: Simhash bits a section may differ by and still count as unchanged
+            (see changed_sections); None re-processes any section whose text changed
+
+    Returns:
+        CatalogSweepResult; failures are reported in it rather than raised
+    """
+    import catalog_fetch
+    from catalog_fingerprint import changed_sections, page_fingerprint, split_sections
+    university_name = catalog.university_name
+    result = CatalogSweepResult(university_name=university_name, url=catalog.catalog_url, status='failed')
+    page_cache = get_page_cache()
+    try:
+        url, domain_verified = _prepare_url(catalog.catalog_url, university_name)
+        # Keyed by the page, not the anchor verification picks, so sweeps line up
+        url = url.split('#')[0]
+        previous = page_cache.get_fingerprint(url)
+        with metrics.stage('fetch'):
+            headers = page_cache.revalidation_headers(url) if previous is not None else {}
+            response = await catalog_fetch.get_fetcher().get(url, headers=headers)
+        if response.status_code == 304 and previous is not None:
+            result.status, result.sections = 'not_modified', len(previous.sections)
+        elif response.status_code != 200:
+            result.verification_status = _verify_response(url, university_name, domain_verified, response)
+            result.error_message = f"HTTP {response.status_code}"
+        else:
+            text = response.text
+            with metrics.stage('fingerprint'):
+                current = page_fingerprint(text)
+            result.sections = len(current.sections)
+            if previous is None:
+                result.status, result.changed_sections = 'new', list(current.sections)
+            elif current.page_hash != previous.page_hash:
+                result.changed_sections, result.removed_sections = changed_sections(previous, current, max_distance)
+                result.status = 'changed' if result.changed_sections or result.removed_sections else 'unchanged'
+            else:
+                result.status = 'unchanged'
+
+            if result.skipped:
+                # Nothing to re-process, but these are the current validators and body, so the
+                # next sweep can be answered with a 304; an identical page keeps its verdict
+                verdict = None
+                if current.page_hash == previous.page_hash:
+                    verdict = page_cache.get_verdict(url, university_name)
+                await asyncio.to_thread(_record_download, url, response)
+                if verdict is not None:
+                    page_cache.put_verdict(url, university_name, verdict)
+            else:
+                verification_result = await _verify_response_async(url, university_name, domain_verified, response)
+                result.verification_status = verification_result
+                catalog = catalog.model_copy(update={
+                    'catalog_url': verification_result.url,
+                    'verification_status': verification_result
+                })
+                with metrics.stage('extract'):
+                    for name, start, end in split_sections(text):
+                        if name in result.changed_sections:
+                            result.courses.extend(iter_courses([text[start:end]]))
+            page_cache.put_fingerprint(url, current)
+    except Exception as e:
+        result.status, result.error_message = 'failed', str(e)
+
+    metrics.increment('sweep_pages_total', result=result.status)
+    status = catalog.verification_status
+    # Confirmed or re-verified catalogs stay cached for another TTL
+    if result.status != 'failed' and status.is_valid and status.is_accessible:
+        get_catalog_cache().put(university_name, catalog)
+    return result
+
+if __name__ == "__main__":
     async def main():
         # Example usage
         university_name = input("Enter university name: ")
@@ -299,6 +1235,11 @@ if __name__ == "__main__":
         if result.verification_status.error_message:
             print(f"Error: {result.verification_status.error_message}")
 
+    if len(sys.argv) > 1:
+        # python get_uni_courses.py universities.csv ... runs a bulk lookup
+        import catalog_bulk
+        sys.exit(catalog_bulk.main(sys.argv[1:]))
+
     # Run the async main function
     asyncio.run(main())
 
@@ -1,305 +1,360 @@
-from agents import Agent, Runner, InputGuardrail, GuardrailFunctionOutput
-from agents import set_default_openai_key
-from agents import set_tracing_export_api_key
-from pydantic import BaseModel
-import os
-import requests
-from typing import Optional
-from urllib.parse import urlparse
-import re
-
-set_default_openai_key(os.getenv("OPENAI_API_KEY"))
-set_tracing_export_api_key(os.getenv("OPENAI_API_KEY"))
-
-class URLVerificationResult(BaseModel):
-    url: str
-    is_valid: bool
-    domain_verified: bool
-    is_accessible: bool
-    contains_cs_courses: bool
-    error_message: Optional[str] = None
-
-class URLNormalizer:
-    @staticmethod
-    def normalize_url(url: str, university_name: str) -> str:
-        """Normalize URLs based on university-specific patterns"""
-        url_lower = url.lower()
-        university_lower = university_name.lower()
-
-        # Common URL transformations for specific universities
-        university_patterns = {
-            'stanford': {
-                'old_patterns': [
-                    'exploredegrees.stanford.edu/schoolofengineering/computerscience',
-                    'exploredegrees.stanford.edu/computerscience'
-                ],
-                'new_pattern': 'bulletin.stanford.edu/departments/COMPUTSCI/courses'
-            },
-            'berkeley': {
-                'old_patterns': ['guide.berkeley.edu/courses'],
-                'new_pattern': 'www2.eecs.berkeley.edu/Courses/CS'
-            },
-            'mit': {
-                'old_patterns': ['catalog.mit.edu'],
-                'new_pattern': 'student.mit.edu/catalog/m6a.html'
-            }
-        }
-
-        # Check for university-specific transformations
-        for uni, patterns in university_patterns.items():
-            if uni in university_lower:
-                for old_pattern in patterns['old_patterns']:
-                    if old_pattern in url_lower:
-                        return f"https://{patterns['new_pattern']}"
-
-        return url
-
-def verify_url(url: str, university_name: str = "") -> URLVerificationResult:
-    try:
-        # Parse URL
-        parsed = urlparse(url)
-        if not parsed.scheme or not parsed.netloc:
-            return URLVerificationResult(
-                url=url,
-                is_valid=False,
-                domain_verified=False,
-                is_accessible=False,
-                contains_cs_courses=False,
-                error_message="Invalid URL format"
-            )
-
-        # Normalize URL based on university patterns
-        normalized_url = URLNormalizer.normalize_url(url, university_name)
-        
-        # If URL was normalized, update the parsed URL
-        if normalized_url != url:
-            url = normalized_url
-            parsed = urlparse(url)
-
-        # Check if domain is .edu or known university domain
-        domain_verified = parsed.netloc.endswith('.edu') or any(
-            known_domain in parsed.netloc 
-            for known_domain in ['university', 'college', 'institute', 'uni.']
-        )
-
-        # Check if URL is accessible
-        response = requests.get(url, timeout=10, allow_redirects=True)
-        is_accessible = response.status_code == 200
-
-        # Enhanced content checking for CS course indicators
-        content = response.text.lower()
-        
-        # University-specific content patterns
-        university_content_patterns = {
-            'stanford': {
-                'course_patterns': [
-                    r'cs\s*\d{2,3}[a-z]?',  # CS 106A, CS 229, etc.
-                    r'computer science.*?units',
-                    r'bulletin.*?courses'
-                ]
-            },
-            'berkeley': {
-                'course_patterns': [
-                    r'compsci\s*\d{2,3}[a-z]?',
-                    r'cs\s*\d{2,3}[a-z]?'
-                ]
-            },
-            'mit': {
-                'course_patterns': [
-                    r'6\.\d{3,4}',  # MIT's course numbering
-                    r'course\s*6'
-                ]
-            }
-        }
-
-        # Add university-specific patterns if available
-        additional_patterns = []
-        for uni, patterns in university_content_patterns.items():
-            if uni in university_name.lower():
-                additional_patterns.extend(patterns['course_patterns'])
-
-        # Common course section anchors with priority order
-        course_section_patterns = [
-            '#coursestext',
-            '#courses',
-            '#course-list',
-            '#course-descriptions',
-            '#programrequirementstext',
-            '#curriculum'
-        ]
-        
-        # If URL doesn't end with a course section pattern, try to find one
-        if not any(url.endswith(pattern) for pattern in course_section_patterns):
-            # Only append anchor if the base URL doesn't already point to a course listing
-            if not any(re.search(pattern, content) for pattern in additional_patterns):
-                base_url = url.split('#')[0]
-                for pattern in course_section_patterns:
-                    if pattern in content:
-                        url = f"{base_url}{pattern}"
-                        break
-
-        # Enhanced CS course indicators with more specific patterns
-        cs_indicators = [
-            'computer science',
-            'course description',
-            'undergraduate courses',
-            'cs courses',
-            'course catalog',
-            'degree requirements',
-            'course number',
-            'credits',
-            'prerequisites',
-            'cs \d{3}',
-            'computer science courses'
-        ]
-        
-        # Combine common patterns with university-specific ones
-        course_listing_indicators = [
-            'cs \d{3}',
-            'comp \d{3}',
-            'computer science \d{3}',
-            'course number.*?description',
-            'credits.*?prerequisites'
-        ] + additional_patterns
-        
-        contains_cs_courses = (
-            any(indicator in content for indicator in cs_indicators) or
-            any(re.search(pattern, content, re.IGNORECASE) for pattern in course_listing_indicators)
-        )
-
-        return URLVerificationResult(
-            url=url,
-            is_valid=True,
-            domain_verified=domain_verified,
-            is_accessible=is_accessible,
-            contains_cs_courses=contains_cs_courses
-        )
-
-    except Exception as e:
-        return URLVerificationResult(
-            url=url,
-            is_valid=False,
-            domain_verified=False,
-            is_accessible=False,
-            contains_cs_courses=False,
-            error_message=str(e)
-        )
+"""
+Tests for verify_url and verify_url_async against pages served from a local HTTP server.
 
-class UniversityCatalogOutput(BaseModel):
-    university_name: str
-    catalog_url: str
-    verification_status: URLVerificationResult
-
-verification_instructions = """
-You are a URL verification specialist. Your task is to:
-1. Verify that the provided URL is from an official university domain
-2. Check if the URL is accessible
-3. Confirm that the page contains computer science course information
-4. Return detailed verification results
+    python -m pytest get_uni_courses_test.py
 """
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+import catalog_fetch
+import catalog_store
+import get_uni_courses
+from catalog_fetch import HostPolicy
+
+FILLER = '<p>' + 'Campus news and events. ' * 40 + '</p>\n'
+
+PAGES = {
+    '/listing': (
+        '<h1>Computer Science</h1>\n<a href="#courses">Courses</a>\n'
+        '<div id="courses"><p>CS 106A Programming Methodology. 5 units.</p></div>\n'
+    ),
+    # The only indicator sits past the first 64 KiB
+    '/late': FILLER * 100 + '<h2>Course Description</h2>\n<p>CS 229 Machine Learning</p>\n',
+    '/unrelated': FILLER * 10,
+    # Anchors before and after a Stanford pattern, across several chunks
+    '/stanford': FILLER * 60 + '<a href="#course-list">List</a>\n' + FILLER * 60 + '<p>CS 229 Machine Learning. 3 units</p>\n',
+    # Course blocks with multi-byte characters, across several chunks
+    '/courses': '<div id="coursestext">' + ''.join(
+        f'<div class="courseblock"><p class="courseblocktitle">CS {i}. Théorie des systèmes {i}. 3 Units.</p>'
+        f'<p class="courseblockdesc">Modèles et preuves, partie {i}.</p></div>'
+        for i in range(100, 1100)
+    ) + '</div>',
+}
 
-verification_agent = Agent(
-    name="URL Verification Agent",
-    instructions=verification_instructions,
-    output_type=URLVerificationResult
-)
-
-async def url_verification_guardrail(ctx, agent, input_data):
-    if isinstance(input_data, str) and input_data.startswith('http'):
-        result = verify_url(input_data)
-        return GuardrailFunctionOutput(
-            output_info=result,
-            tripwire_triggered=not (result.is_valid and result.domain_verified and result.is_accessible)
+# /sweep is served with this ETag, honoring If-None-Match
+SWEEP = {'etag': '"1"'}
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/sweep':
+            self._send_sweep_page()
+            return
+        page = PAGES.get(self.path)
+        if page is None:
+            self.send_error(404)
+            return
+        body = page.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_sweep_page(self):
+        if self.headers.get('If-None-Match') == SWEEP['etag']:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = PAGES['/listing'].encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', SWEEP['etag'])
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture(scope='module')
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """Fresh caches under tmp_path and no politeness delays for the local server"""
+    monkeypatch.setenv('CATALOG_CACHE_DIR', str(tmp_path))
+    monkeypatch.setenv('CATALOG_PAGE_STORE', '0')
+    monkeypatch.setattr(catalog_store, '_page_store', None)
+    monkeypatch.setattr(catalog_store, '_page_store_loaded', False)
+    monkeypatch.setattr(get_uni_courses, '_page_cache', None)
+    monkeypatch.setattr(get_uni_courses, '_verification_cache', None)
+    catalog_fetch.configure(HostPolicy(requests_per_second=1000, burst=1000, respect_robots=False))
+    yield
+    catalog_fetch.configure()
+
+def _verdict(result):
+    return result.url, result.is_valid, result.is_accessible, result.contains_cs_courses, result.error_message
+
+@pytest.mark.parametrize('path', sorted(PAGES))
+@pytest.mark.parametrize('university_name', ['', 'Stanford University'])
+def test_streaming_and_buffered_reach_the_same_verdict(server, path, university_name):
+    streamed = get_uni_courses.verify_url(server + path, university_name, stream=True)
+    buffered = get_uni_courses.verify_url(server + path, university_name)
+    assert streamed.error_message is None
+    assert _verdict(streamed) == _verdict(buffered)
+
+def test_async_streaming_and_buffered_reach_the_same_verdict(server):
+    async def verify_all():
+        return await asyncio.gather(*(
+            get_uni_courses.verify_url_async(server + path, 'Stanford University', stream=stream)
+            for path in sorted(PAGES) for stream in (True, False)
+        ))
+
+    results = asyncio.run(verify_all())
+    for streamed, buffered in zip(results[::2], results[1::2]):
+        assert _verdict(streamed) == _verdict(buffered)
+
+def test_sync_and_async_course_listings_agree(server):
+    async def listing(max_bytes):
+        return [course async for course in get_uni_courses.aiter_catalog_courses(server + '/courses', max_bytes)]
+
+    courses = list(get_uni_courses.iter_catalog_courses(server + '/courses'))
+    assert [course.code for course in courses] == [f'CS {i}' for i in range(100, 1100)]
+    assert courses[-1].title == 'Théorie des systèmes 1099'
+    assert asyncio.run(listing(get_uni_courses.DEFAULT_MAX_BYTES)) == courses
+    # A capped read stops partway, the same way in both
+    capped = list(get_uni_courses.iter_catalog_courses(server + '/courses', max_bytes=100_000))
+    assert 0 < len(capped) < len(courses) and capped == courses[:len(capped)]
+    assert asyncio.run(listing(100_000)) == capped
+
+def test_truncated_stream_verdict_is_not_served_to_buffered_callers(server):
+    capped = get_uni_courses.verify_url(server + '/late', stream=True, max_bytes=64 * 1024)
+    assert capped.is_accessible and not capped.contains_cs_courses
+
+    assert get_uni_courses.verify_url(server + '/late').contains_cs_courses
+    assert get_uni_courses.verify_url(server + '/late', stream=True).contains_cs_courses
+    # The capped verdict is still what a capped stream gets
+    assert get_uni_courses.verify_url(server + '/late', stream=True, max_bytes=64 * 1024) is capped
+
+def test_results_are_cached_per_mode(server):
+    first = get_uni_courses.verify_url(server + '/listing')
+    assert get_uni_courses.verify_url(server + '/listing') is first
+    assert get_uni_courses.verify_url(server + '/listing', stream=True) is not first
+
+def test_invalid_url():
+    result = get_uni_courses.verify_url('not a url')
+    assert not result.is_valid
+    assert result.error_message == 'Invalid URL format'
+
+def test_failed_fetch_counts_one_error(monkeypatch):
+    metrics = get_uni_courses.metrics
+    monkeypatch.setattr(metrics, 'enabled', True)
+    metrics.reset()
+    try:
+        result = get_uni_courses.verify_url('http://127.0.0.1:9/closed')
+        assert not result.is_accessible
+        errors = {name: value for name, value in metrics.snapshot()['counters'].items() if name.startswith('errors_total')}
+        assert errors == {'errors_total{stage="fetch"}': 1}
+    finally:
+        metrics.reset()
+
+def _fast_result(domain_verified):
+    return get_uni_courses.UniversityCatalogOutput(
+        university_name='Example University',
+        catalog_url='http://catalog.example.com/courses',
+        verification_status=get_uni_courses.URLVerificationResult(
+            url='http://catalog.example.com/courses', is_valid=True, domain_verified=domain_verified,
+            is_accessible=True, contains_cs_courses=True
         )
-    return GuardrailFunctionOutput(
-        output_info=None,
-        tripwire_triggered=False
     )
 
-web_scraping_instructions = """
-Task: Given the name of a university or college, find the official undergraduate catalog page that lists all available Computer Science courses, including course descriptions and degree requirements.
-
-Instructions:
-
-1. Search for the official undergraduate catalog or bulletin of the given institution.
-2. Locate the Computer Science (CS) program within the undergraduate catalog.
-3. Extract the direct URL that provides a comprehensive list of all undergraduate CS courses, including descriptions.
-4. If multiple links exist, prioritize the one that includes detailed course descriptions and requirements.
-5. Ensure that the URL is from an official university domain (e.g., .edu or an official subdomain).
-6. Return "No Computer Science catalog found" if no valid URL is found.
-
-URL Patterns to prioritize (in order):
-1. /catalog/*/computer-science/#coursestext
-2. /catalog/*/computer-science/#courses
-3. /catalog/*/computer-science/#programrequirementstext
-4. /catalog/*/cs/#coursestext
-5. /courses/computer-science/
-6. /cs/courses/
-7. /computerscience/undergraduate/
-
-Important URL refinements:
-- For catalog URLs, always check if there's a #coursestext or #courses anchor available
-- Verify that the page contains actual course listings with course numbers and descriptions
-- Prefer URLs that directly link to the course descriptions section
-- If a base catalog URL is found, try to append the appropriate anchor (#coursestext, #courses, etc.)
-
-Response format:
-{
-    "university_name": "University Name",
-    "catalog_url": "URL or 'No Computer Science catalog found'",
-    "verification_status": URLVerificationResult
-}
-"""
+@pytest.mark.parametrize('enabled, domain_verified, accepted', [
+    (None, True, False), ('1', False, False), ('1', True, True),
+])
+def test_fast_path_is_opt_in_and_needs_a_verified_domain(monkeypatch, enabled, domain_verified, accepted):
+    if enabled is None:
+        monkeypatch.delenv('CATALOG_FAST_PATH', raising=False)
+    else:
+        monkeypatch.setenv('CATALOG_FAST_PATH', enabled)
+    monkeypatch.setattr(get_uni_courses, '_catalog_cache', None)
+    probed = []
+
+    async def resolve(university_name, domain):
+        probed.append(domain)
+        return _fast_result(domain_verified)
+
+    monkeypatch.setattr(get_uni_courses, 'resolve_catalog_fast', resolve)
+    found = asyncio.run(get_uni_courses._cached_or_probed('Example University', False, 'example.com'))
+    assert probed == ([] if enabled is None else ['example.com'])
+    assert (found is not None) == accepted
+    assert (get_uni_courses.get_catalog_cache().get('Example University') is not None) == accepted
+
+@pytest.mark.parametrize('host, university_name, verified', [
+    ('www.washington.edu', 'University of Washington', True),
+    ('catalog.wustl.edu', 'University of Washington', False),
+    # Hosts the index doesn't list keep the original heuristic
+    ('catalog.stateuniversity.org', 'Some State University', True),
+    ('courses.example.edu', '', True),
+    ('www.example.com', 'Some State University', False),
+])
+def test_domain_verification(host, university_name, verified):
+    assert get_uni_courses._domain_verified(host, university_name) == verified
+
+def test_not_modified_page_reuses_the_stored_verdict(server, monkeypatch):
+    monkeypatch.setitem(SWEEP, 'etag', '"1"')
+    first = get_uni_courses.verify_url(server + '/sweep', 'Stanford University')
+    assert first.contains_cs_courses
+    page_cache = get_uni_courses.get_page_cache()
+    assert page_cache.revalidation_headers(server + '/sweep') == {'If-None-Match': '"1"'}
+
+    def analyze(*args):
+        raise AssertionError('a 304 answer was analyzed again')
+
+    # Past the in-memory cache, the server answers 304 and the stored verdict is served
+    monkeypatch.setattr(get_uni_courses, '_verification_cache', None)
+    monkeypatch.setattr(get_uni_courses, '_analyze_content', analyze)
+    again = get_uni_courses.verify_url(server + '/sweep', 'Stanford University')
+    assert _verdict(again) == _verdict(first)
+    monkeypatch.setattr(get_uni_courses, '_verification_cache', None)
+    again = asyncio.run(get_uni_courses.verify_url_async(server + '/sweep', 'Stanford University'))
+    assert _verdict(again) == _verdict(first)
+    assert (page_cache.hits, page_cache.misses) == (2, 1)
+
+def test_sweep_refreshes_validators_of_unchanged_pages(server, monkeypatch):
+    monkeypatch.setattr(get_uni_courses, '_catalog_cache', None)
+    monkeypatch.setitem(SWEEP, 'etag', '"1"')
+    catalog = get_uni_courses.UniversityCatalogOutput(
+        university_name='',
+        catalog_url=server + '/sweep',
+        verification_status=get_uni_courses.verify_url(server + '/sweep')
+    )
+    assert asyncio.run(get_uni_courses.sweep_catalog(catalog)).status == 'new'
+    # Same body under a new ETag: skipped, but the new validator is what gets sent next
+    SWEEP['etag'] = '"2"'
+    assert asyncio.run(get_uni_courses.sweep_catalog(catalog)).status == 'unchanged'
+    assert get_uni_courses.get_page_cache().revalidation_headers(server + '/sweep') == {'If-None-Match': '"2"'}
+    assert asyncio.run(get_uni_courses.sweep_catalog(catalog)).status == 'not_modified'
+
+def test_iter_completed_bounds_work_in_flight():
+    started, running, peak = [], [0], [0]
+
+    async def work(i):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        try:
+            await asyncio.sleep(0.001 * (i % 3))
+            return i
+        finally:
+            running[0] -= 1
+
+    def jobs(count):
+        for i in range(count):
+            started.append(i)
+            yield work(i)
+
+    async def check():
+        results = [result async for result in get_uni_courses.iter_completed(jobs(20), 4)]
+        assert sorted(results) == list(range(20)) and peak[0] == 4
+        # Stopping early pulls no more work and cancels what is still running
+        started.clear()
+        stream = get_uni_courses.iter_completed(jobs(1000), 4)
+        await stream.__anext__()
+        await stream.aclose()
+        await asyncio.sleep(0.01)
+        assert len(started) <= 5 and running[0] == 0
+
+    asyncio.run(check())
+
+class _StubRunner:
+    """Stands in for agents.Runner: answers with a page on the local server, slowest first"""
+
+    def __init__(self, catalogs, failing):
+        self.catalogs = catalogs
+        self.failing = failing
+        self.inputs = []
+
+    async def run(self, starting_agent, input, **kwargs):
+        self.inputs.append(input)
+        await asyncio.sleep(0.01 * (len(self.catalogs) - list(self.catalogs).index(input)))
+        if input == self.failing:
+            raise RuntimeError('model unavailable')
+        return SimpleNamespace(final_output=_stub_output(input, self.catalogs[input]))
+
+def _stub_output(university_name, catalog_url):
+    return get_uni_courses.UniversityCatalogOutput(
+        university_name=university_name,
+        catalog_url=catalog_url,
+        verification_status=get_uni_courses._invalid_result(catalog_url, 'Not verified')
+    )
 
-agent = Agent(
-    name="Web Scraping Agent",
-    instructions=web_scraping_instructions,
-    output_type=UniversityCatalogOutput,
-    input_guardrails=[
-        InputGuardrail(guardrail_function=url_verification_guardrail),
+def test_one_failed_lookup_leaves_the_others_in_order(server, monkeypatch):
+    monkeypatch.setattr(get_uni_courses, '_catalog_cache', None)
+    catalogs = {
+        'Alpha University': server + '/listing',
+        'Beta University': server + '/late',
+        'Gamma University': get_uni_courses.NO_CATALOG_FOUND,
+        'Delta University': server + '/listing',
+    }
+    runner = _StubRunner(catalogs, failing='Beta University')
+    monkeypatch.setattr(get_uni_courses, 'Runner', runner, raising=False)
+
+    results = asyncio.run(get_uni_courses.get_university_catalogs(list(catalogs), max_concurrency=4))
+    assert [result.university_name for result in results] == list(catalogs)
+    assert sorted(runner.inputs) == sorted(catalogs)
+    failed = results[1]
+    assert failed.catalog is None and failed.error_message == 'model unavailable'
+    for result in results[:1] + results[2:]:
+        assert result.error_message is None
+        assert result.catalog.university_name == result.university_name
+    assert results[0].catalog.verification_status.contains_cs_courses
+    assert results[2].catalog.catalog_url == get_uni_courses.NO_CATALOG_FOUND
+
+def _answer(university_name, catalog_url):
+    return get_uni_courses.UniversityCatalogAnswer(university_name=university_name, catalog_url=catalog_url)
+
+def test_batch_answers_are_matched_to_names():
+    match = get_uni_courses._match_batch_answers
+    names = ['Stanford University', 'Massachusetts Institute of Technology', 'Carnegie Mellon University']
+    # By canonical name, whatever the order
+    answers = match(names, [_answer('carnegie mellon university', 'c'), _answer('The Stanford Univ.', 's')])
+    assert [answer and (answer.university_name, answer.catalog_url) for answer in answers] == [
+        ('Stanford University', 's'), None, ('Carnegie Mellon University', 'c')
     ]
-)
-
-async def get_university_catalog(university_name: str) -> UniversityCatalogOutput:
-    """
-    Get the computer science course catalog URL for a given university.
-    
-    Args:
-        university_name: Name of the university
-        
-    Returns:
-        UniversityCatalogOutput object containing the URL and verification status
-    """
-    result = await Runner.run(agent, university_name)
-    
-    # If we got a URL, verify and potentially normalize it
-    if hasattr(result, 'final_output') and result.final_output.catalog_url != "No Computer Science catalog found":
-        verification_result = verify_url(result.final_output.catalog_url, university_name)
-        result.final_output.verification_status = verification_result
-        result.final_output.catalog_url = verification_result.url
-    
-    return result.final_output
-
-
-if __name__ == "__main__":
-    import asyncio
-
-    async def main():
-        # Example usage
-        university_name = input("Enter university name: ")
-        result = await get_university_catalog(university_name)
-        print("\nResults:")
-        print(f"University: {result.university_name}")
-        print(f"Catalog URL: {result.catalog_url}")
-
-        print("\nVerification Status:")
-        print(f"Domain Verified: {result.verification_status.domain_verified}")
-        print(f"Page Accessible: {result.verification_status.is_accessible}")
-        print(f"Contains CS Courses: {result.verification_status.contains_cs_courses}")
-        if result.verification_status.error_message:
-            print(f"Error: {result.verification_status.error_message}")
-
-    # Run the async main function
-    asyncio.run(main())
-
-
+    # A restyled name is matched by position only if every line was answered
+    answers = match(names, [_answer('Stanford University', 's'), _answer('MIT', 'm'), _answer('CMU', 'c')])
+    assert [answer.catalog_url for answer in answers] == ['s', 'm', 'c']
+    assert answers[1].university_name == 'Massachusetts Institute of Technology'
+    answers = match(names, [_answer('Stanford University', 's'), _answer('MIT', 'm')])
+    assert [answer and answer.catalog_url for answer in answers] == ['s', None, None]
+    # An answer is used for one name only
+    assert match(names[:2], [_answer('Stanford University', 's')] * 2)[1] is None
+
+class _BatchStubRunner(_StubRunner):
+    """Answers batched lookups for only some of the listed names"""
+
+    def __init__(self, catalogs, batch_catalogs):
+        super().__init__(catalogs, failing=None)
+        self.batch_catalogs = batch_catalogs
+
+    async def run(self, starting_agent, input, **kwargs):
+        if starting_agent is not get_uni_courses.get_batch_agent():
+            return await super().run(starting_agent, input, **kwargs)
+        self.inputs.append(input)
+        catalogs = [_answer(name, url) for name, url in self.batch_catalogs.items()]
+        return SimpleNamespace(final_output=get_uni_courses.UniversityCatalogBatchOutput(catalogs=catalogs))
+
+def test_names_a_batch_does_not_settle_are_retried_individually(server, monkeypatch):
+    monkeypatch.setattr(get_uni_courses, '_catalog_cache', None)
+    catalogs = {name: server + '/listing' for name in ('Alpha University', 'Beta University', 'Gamma University')}
+    # Beta is left out, and Gamma's answer fails verification
+    runner = _BatchStubRunner(catalogs, {'Alpha University': server + '/listing', 'Gamma University': server + '/missing'})
+    monkeypatch.setattr(get_uni_courses, 'Runner', runner, raising=False)
+
+    results = asyncio.run(get_uni_courses.get_university_catalogs(list(catalogs), batch_size=3))
+    assert runner.inputs[0] == '1. Alpha University\n2. Beta University\n3. Gamma University'
+    assert sorted(runner.inputs[1:]) == ['Beta University', 'Gamma University']
+    assert [result.university_name for result in results] == list(catalogs)
+    for result in results:
+        assert result.error_message is None
+        assert result.catalog.university_name == result.university_name
+        assert result.catalog.verification_status.contains_cs_courses